@@ -0,0 +1,269 @@
+import json
+import time
+import asyncio
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
+from aiogram import Bot
+from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton, MessageEntity
+from aiogram.exceptions import TelegramAPIError, TelegramRetryAfter, TelegramForbiddenError, TelegramBadRequest
+from database.models import Broadcast, BroadcastMessage
+from database.operations import (
+    create_broadcast, get_running_broadcasts, finish_broadcast, get_pending_deliveries,
+    save_delivery_results, count_deliveries, add_broadcast_message
+)
+from core.progress import progress_bus, STAGE_BROADCAST
+from core.live_stats import live_stats
+from core.send_scheduler import send_priority, PRIORITY_REPLY, PRIORITY_PROGRESS, PRIORITY_BROADCAST
+from utils.constants import (
+    DeliveryStatus, BROADCAST_CONCURRENCY, BROADCAST_PAGE_SIZE, BROADCAST_FLUSH_SIZE,
+    BROADCAST_FLUSH_INTERVAL
+)
+from utils.helpers import get_progress_bar
+from utils.i18n import i18n
+import logging
+
+logger = logging.getLogger(__name__)
+
+UNREACHABLE_ERRORS = ('chat not found', 'user is deactivated', 'bot was blocked', 'peer_id_invalid')
+
+
+class BroadcastRun:
+    def __init__(self, broadcast: Broadcast, counts: Dict[str, int]):
+        self.broadcast = broadcast
+        self.counts = {status.value: counts.get(status.value, 0) for status in DeliveryStatus}
+        self.results: List[Tuple[int, str, Optional[str]]] = []
+        self.flush_lock = asyncio.Lock()
+        self.started_at = time.monotonic()
+        self.copy_options = self._copy_options()
+
+    @property
+    def key(self) -> str:
+        return f"broadcast:{self.broadcast.id}"
+
+    @property
+    def done(self) -> int:
+        return self.broadcast.total - self.counts[DeliveryStatus.PENDING.value]
+
+    def record(self, user_id: int, status: DeliveryStatus, error: Optional[str] = None):
+        self.results.append((user_id, status.value, error))
+        self.counts[DeliveryStatus.PENDING.value] -= 1
+        self.counts[status.value] += 1
+
+    async def flush(self):
+        async with self.flush_lock:
+            if not self.results:
+                return
+            results, self.results = self.results, []
+            try:
+                await save_delivery_results(self.broadcast.id, results)
+            except Exception as e:
+                self.results[:0] = results
+                logger.error(f"Failed to save {len(results)} delivery results for broadcast {self.broadcast.id}: {e}")
+                return
+            live_stats.record_deactivated(sum(1 for _, status, _ in results if status == DeliveryStatus.BLOCKED.value))
+
+    def _copy_options(self) -> Dict[str, Any]:
+        broadcast = self.broadcast
+        options: Dict[str, Any] = {}
+
+        if broadcast.button_text and broadcast.button_url:
+            options['reply_markup'] = InlineKeyboardMarkup(inline_keyboard=[[
+                InlineKeyboardButton(text=broadcast.button_text, url=broadcast.button_url)
+            ]])
+
+        if broadcast.media_file_id:
+            options['caption'] = broadcast.text
+            options['parse_mode'] = None
+            if broadcast.caption_entities:
+                options['caption_entities'] = [
+                    MessageEntity(**entity) for entity in json.loads(broadcast.caption_entities)
+                ]
+
+        return options
+
+
+class BroadcastEngine:
+    def __init__(self, bot: Bot, concurrency: int = BROADCAST_CONCURRENCY):
+        self.bot = bot
+        self.concurrency = max(1, concurrency)
+        self.runs: Dict[int, BroadcastRun] = {}
+        self.tasks: Dict[int, asyncio.Task] = {}
+
+    async def start(self, broadcast: Broadcast) -> int:
+        broadcast.created_at = broadcast.created_at or datetime.now()
+        broadcast.id = await create_broadcast(broadcast)
+        self._launch(broadcast)
+        return broadcast.id
+
+    async def resume(self) -> int:
+        broadcasts = await get_running_broadcasts()
+        for broadcast in broadcasts:
+            logger.info(f"Resuming broadcast {broadcast.id}")
+            self._launch(broadcast)
+        return len(broadcasts)
+
+    async def stop(self):
+        tasks = list(self.tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.tasks.clear()
+
+    def stats(self) -> Dict[int, Dict[str, Any]]:
+        return {
+            broadcast_id: {**run.counts, 'total': run.broadcast.total, 'elapsed': time.monotonic() - run.started_at}
+            for broadcast_id, run in self.runs.items()
+        }
+
+    def _launch(self, broadcast: Broadcast):
+        if broadcast.id in self.tasks:
+            return
+        task = asyncio.create_task(self._run(broadcast))
+        self.tasks[broadcast.id] = task
+        task.add_done_callback(lambda _: self.tasks.pop(broadcast.id, None))
+
+    async def _run(self, broadcast: Broadcast):
+        send_priority.set(PRIORITY_BROADCAST)
+        run = BroadcastRun(broadcast, await count_deliveries(broadcast.id))
+        self.runs[broadcast.id] = run
+
+        async def render(stage: str, percent: float):
+            await self._render_progress(run)
+
+        progress_bus.subscribe(run.key, render)
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency * 2)
+        workers = [asyncio.create_task(self._worker(run, queue)) for _ in range(self.concurrency)]
+        flusher = asyncio.create_task(self._flush_periodically(run))
+
+        try:
+            after_user_id = 0
+            while True:
+                user_ids = await get_pending_deliveries(broadcast.id, after_user_id, BROADCAST_PAGE_SIZE)
+                if not user_ids:
+                    break
+                for user_id in user_ids:
+                    await queue.put(user_id)
+                after_user_id = user_ids[-1]
+
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+        finally:
+            for task in workers + [flusher]:
+                task.cancel()
+            await asyncio.gather(*workers, flusher, return_exceptions=True)
+            await run.flush()
+            progress_bus.close(run.key)
+            self.runs.pop(broadcast.id, None)
+
+        await finish_broadcast(broadcast.id)
+        await self._save_history(run)
+        await self._render_summary(run)
+        logger.info(
+            f"Broadcast {broadcast.id} finished in {time.monotonic() - run.started_at:.0f}s: "
+            f"{run.counts[DeliveryStatus.SENT.value]} sent, {run.counts[DeliveryStatus.FAILED.value]} failed, "
+            f"{run.counts[DeliveryStatus.BLOCKED.value]} blocked"
+        )
+
+    async def _worker(self, run: BroadcastRun, queue: asyncio.Queue):
+        while True:
+            user_id = await queue.get()
+            if user_id is None:
+                return
+
+            status, error = await self._deliver(run, user_id)
+            run.record(user_id, status, error)
+            progress_bus.publish(run.key, STAGE_BROADCAST, run.done * 100 / max(1, run.broadcast.total))
+
+            if len(run.results) >= BROADCAST_FLUSH_SIZE:
+                await run.flush()
+
+    async def _flush_periodically(self, run: BroadcastRun):
+        while True:
+            await asyncio.sleep(BROADCAST_FLUSH_INTERVAL)
+            await run.flush()
+
+    async def _deliver(self, run: BroadcastRun, user_id: int) -> Tuple[DeliveryStatus, Optional[str]]:
+        broadcast = run.broadcast
+
+        try:
+            await self.bot.copy_message(
+                chat_id=user_id,
+                from_chat_id=broadcast.source_chat_id,
+                message_id=broadcast.source_message_id,
+                **run.copy_options
+            )
+            return DeliveryStatus.SENT, None
+        except TelegramRetryAfter as e:
+            logger.warning(f"Flood wait retries exhausted sending broadcast {broadcast.id} to {user_id}")
+            return DeliveryStatus.FAILED, e.message[:200]
+        except TelegramForbiddenError as e:
+            return DeliveryStatus.BLOCKED, e.message[:200]
+        except TelegramBadRequest as e:
+            if any(marker in e.message.lower() for marker in UNREACHABLE_ERRORS):
+                return DeliveryStatus.BLOCKED, e.message[:200]
+            return DeliveryStatus.FAILED, e.message[:200]
+        except TelegramAPIError as e:
+            logger.warning(f"Failed to send broadcast {broadcast.id} to {user_id}: {e}")
+            return DeliveryStatus.FAILED, e.message[:200]
+        except Exception as e:
+            logger.error(f"Unexpected error sending broadcast {broadcast.id} to {user_id}: {e}")
+            return DeliveryStatus.FAILED, str(e)[:200]
+
+    async def _render_progress(self, run: BroadcastRun):
+        broadcast = run.broadcast
+        if not broadcast.admin_chat_id or not broadcast.status_message_id:
+            return
+
+        send_priority.set(PRIORITY_PROGRESS)
+        percent = run.done * 100 / max(1, broadcast.total)
+        try:
+            await self.bot.edit_message_text(
+                chat_id=broadcast.admin_chat_id,
+                message_id=broadcast.status_message_id,
+                text=i18n.get(
+                    'broadcast_progress', 'uz',
+                    sent=run.counts[DeliveryStatus.SENT.value],
+                    failed=run.counts[DeliveryStatus.FAILED.value],
+                    blocked=run.counts[DeliveryStatus.BLOCKED.value],
+                    total=broadcast.total
+                ) + "\n" + get_progress_bar(percent)
+            )
+        except Exception as e:
+            if "message is not modified" not in str(e).lower():
+                logger.debug(f"Broadcast progress update error: {e}")
+
+    async def _render_summary(self, run: BroadcastRun):
+        broadcast = run.broadcast
+        if not broadcast.admin_chat_id or not broadcast.status_message_id:
+            return
+
+        send_priority.set(PRIORITY_REPLY)
+        try:
+            await self.bot.edit_message_text(
+                chat_id=broadcast.admin_chat_id,
+                message_id=broadcast.status_message_id,
+                text=i18n.get(
+                    'broadcast_sent', 'uz',
+                    sent=run.counts[DeliveryStatus.SENT.value],
+                    failed=run.counts[DeliveryStatus.FAILED.value] + run.counts[DeliveryStatus.BLOCKED.value],
+                    total=broadcast.total
+                )
+            )
+        except Exception as e:
+            logger.warning(f"Failed to report broadcast {broadcast.id} summary: {e}")
+
+    async def _save_history(self, run: BroadcastRun):
+        broadcast = run.broadcast
+        try:
+            await add_broadcast_message(BroadcastMessage(
+                text=broadcast.text,
+                media_type=broadcast.media_type,
+                media_file_id=broadcast.media_file_id,
+                button_text=broadcast.button_text,
+                button_url=broadcast.button_url,
+                created_at=broadcast.created_at or datetime.now(),
+                sent_count=run.counts[DeliveryStatus.SENT.value]
+            ))
+        except Exception as e:
+            logger.error(f"Failed to save broadcast {broadcast.id} history: {e}")
@@ -0,0 +1,173 @@
+import asyncio
+import hashlib
+import json
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from io import BytesIO
+from typing import Dict, Any, List, Optional, Tuple
+from utils.constants import CHART_RENDER_WORKERS, CHART_CACHE_SIZE
+import logging
+
+logger = logging.getLogger(__name__)
+
+BACKGROUND = '#2b2b2b'
+COLORS = ['#ff6b6b', '#4ecdc4', '#45b7d1', '#96ceb4', '#ffeaa7']
+
+
+def _preload_worker():
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.figure
+    import matplotlib.dates
+
+
+def _save(figure) -> bytes:
+    buffer = BytesIO()
+    figure.savefig(buffer, format='png', dpi=150, bbox_inches='tight', facecolor=BACKGROUND)
+    return buffer.getvalue()
+
+
+def _style_time_axis(axes, title: str, ylabel: str):
+    import matplotlib.dates as mdates
+
+    axes.set_title(title, fontsize=16, color='white')
+    axes.set_xlabel('Date', fontsize=12, color='white')
+    axes.set_ylabel(ylabel, fontsize=12, color='white')
+    axes.xaxis.set_major_formatter(mdates.DateFormatter('%m-%d'))
+    axes.xaxis.set_major_locator(mdates.DayLocator(interval=5))
+    axes.tick_params(axis='x', labelrotation=45, colors='white')
+    axes.tick_params(axis='y', colors='white')
+    axes.grid(True, alpha=0.3)
+
+
+def render_user_growth(days: List[str], counts: List[int]) -> bytes:
+    import matplotlib.style
+    from matplotlib.figure import Figure
+
+    dates = [datetime.strptime(day, '%Y-%m-%d') for day in days]
+    with matplotlib.style.context('dark_background'):
+        figure = Figure(figsize=(12, 6))
+        axes = figure.subplots()
+        axes.plot(dates, counts, marker='o', linewidth=2, markersize=6, color='#00ff88')
+        axes.fill_between(dates, counts, alpha=0.3, color='#00ff88')
+        _style_time_axis(axes, 'User Growth (Last 30 Days)', 'New Users')
+        figure.tight_layout()
+        return _save(figure)
+
+
+def render_download_stats(days: List[str], successful: List[int], failed: List[int]) -> bytes:
+    import matplotlib.style
+    from matplotlib.figure import Figure
+
+    dates = [datetime.strptime(day, '%Y-%m-%d') for day in days]
+    with matplotlib.style.context('dark_background'):
+        figure = Figure(figsize=(12, 6))
+        axes = figure.subplots()
+        axes.bar(dates, successful, label='Successful', color='#00ff88', alpha=0.8)
+        axes.bar(dates, failed, bottom=successful, label='Failed', color='#ff4444', alpha=0.8)
+        axes.legend()
+        _style_time_axis(axes, 'Download Statistics (Last 30 Days)', 'Downloads')
+        figure.tight_layout()
+        return _save(figure)
+
+
+def render_platform_distribution(platforms: List[str], counts: List[int]) -> bytes:
+    import matplotlib.style
+    from matplotlib.figure import Figure
+
+    with matplotlib.style.context('dark_background'):
+        figure = Figure(figsize=(10, 8))
+        axes = figure.subplots()
+        _, texts, autotexts = axes.pie(
+            counts, labels=platforms, colors=COLORS[:len(platforms)], autopct='%1.1f%%', startangle=90
+        )
+
+        for text in texts:
+            text.set_color('white')
+            text.set_fontsize(12)
+
+        for autotext in autotexts:
+            autotext.set_color('black')
+            autotext.set_fontsize(10)
+            autotext.set_weight('bold')
+
+        axes.set_title('Downloads by Platform', fontsize=16, color='white', pad=20)
+        return _save(figure)
+
+
+RENDERERS = {
+    'user_growth': render_user_growth,
+    'download_stats': render_download_stats,
+    'platform_distribution': render_platform_distribution
+}
+
+
+def _pool_render(kind: str, args: Tuple) -> bytes:
+    try:
+        return RENDERERS[kind](*args)
+    except Exception as e:
+        raise RuntimeError(str(e)) from None
+
+
+class ChartRenderer:
+    def __init__(self, workers: int = CHART_RENDER_WORKERS, max_entries: int = CHART_CACHE_SIZE):
+        self.workers = max(1, workers)
+        self.max_entries = max_entries
+        self.executor: Optional[ProcessPoolExecutor] = None
+        self.cache: "OrderedDict[str, bytes]" = OrderedDict()
+        self.rendering: Dict[str, asyncio.Future] = {}
+        self.hits = 0
+        self.renders = 0
+
+    def _ensure_started(self):
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_preload_worker
+            )
+            logger.info(f"Chart render pool started with {self.workers} workers")
+
+    async def render(self, kind: str, *args) -> bytes:
+        key = hashlib.sha256(json.dumps([kind, args]).encode()).hexdigest()
+
+        if key in self.cache:
+            self.cache.move_to_end(key)
+            self.hits += 1
+            return self.cache[key]
+
+        if key in self.rendering:
+            self.hits += 1
+            return await asyncio.shield(self.rendering[key])
+
+        self._ensure_started()
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self.executor, _pool_render, kind, args)
+        self.rendering[key] = future
+        try:
+            image = await asyncio.shield(future)
+        finally:
+            self.rendering.pop(key, None)
+
+        self.renders += 1
+        self.cache[key] = image
+        while len(self.cache) > self.max_entries:
+            self.cache.popitem(last=False)
+        return image
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'entries': len(self.cache),
+            'hits': self.hits,
+            'renders': self.renders
+        }
+
+    def shutdown(self):
+        if self.executor:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+
+chart_renderer = ChartRenderer()
@@ -1,14 +1,13 @@
-import asyncio
-import aiosqlite
-from datetime import datetime
 from typing import List, Dict, Any, Optional
 from aiogram import Bot
-from aiogram.types import Message, CallbackQuery, FSInputFile
-from aiogram.exceptions import TelegramAPIError
-from database.models import User, BroadcastMessage
-from database.operations import get_user
+from aiogram.types import Message, CallbackQuery, BufferedInputFile
+from database.models import User
+from database.connection import database
 from admin.analytics import AnalyticsManager
-from utils.constants import DB_PATH, ADMIN_ID, EMOJI
+from admin.charts import chart_renderer
+from core.file_cache import file_cache
+from core.user_cache import user_cache
+from utils.constants import ADMIN_ID, EMOJI
 from utils.helpers import format_file_size
 from utils.i18n import i18n
 import logging
@@ -23,14 +22,14 @@ class AdminPanel:
     async def get_user_list(self, page: int = 1, per_page: int = 10) -> Dict[str, Any]:
         offset = (page - 1) * per_page
         
-        async with aiosqlite.connect(DB_PATH) as db:
+        async with database.read() as db:
             cursor = await db.execute('SELECT COUNT(*) FROM users')
             total_users = (await cursor.fetchone())[0]
             
             cursor = await db.execute('''
                 SELECT user_id, username, first_name, last_name, language, join_date, download_count, last_activity 
                 FROM users 
-                ORDER BY join_date DESC 
+                ORDER BY join_ts DESC 
                 LIMIT ? OFFSET ?
             ''', (per_page, offset))
             users = await cursor.fetchall()
@@ -57,109 +56,13 @@ class AdminPanel:
             'total_users': total_users
         }
     
-    async def send_broadcast(self, message_data: Dict[str, Any]) -> Dict[str, int]:
-        async with aiosqlite.connect(DB_PATH) as db:
-            cursor = await db.execute('SELECT user_id FROM users WHERE is_active = 1')
-            active_users = [row[0] for row in await cursor.fetchall()]
-        
-        sent_count = 0
-        failed_count = 0
-        
-        for user_id in active_users:
-            try:
-                if message_data.get('media_file_id'):
-                    if message_data['media_type'] == 'photo':
-                        await self.bot.send_photo(
-                            chat_id=user_id,
-                            photo=message_data['media_file_id'],
-                            caption=message_data['text'],
-                            reply_markup=self._create_broadcast_keyboard(message_data)
-                        )
-                    elif message_data['media_type'] == 'video':
-                        await self.bot.send_video(
-                            chat_id=user_id,
-                            video=message_data['media_file_id'],
-                            caption=message_data['text'],
-                            reply_markup=self._create_broadcast_keyboard(message_data)
-                        )
-                    elif message_data['media_type'] == 'animation':
-                        await self.bot.send_animation(
-                            chat_id=user_id,
-                            animation=message_data['media_file_id'],
-                            caption=message_data['text'],
-                            reply_markup=self._create_broadcast_keyboard(message_data)
-                        )
-                else:
-                    await self.bot.send_message(
-                        chat_id=user_id,
-                        text=message_data['text'],
-                        reply_markup=self._create_broadcast_keyboard(message_data)
-                    )
-                
-                sent_count += 1
-                await asyncio.sleep(0.05)
-                
-            except TelegramAPIError as e:
-                failed_count += 1
-                logger.warning(f"Failed to send broadcast to {user_id}: {e}")
-                await asyncio.sleep(0.1)
-            except Exception as e:
-                failed_count += 1
-                logger.error(f"Unexpected error sending broadcast to {user_id}: {e}")
-        
-        await self._save_broadcast_message(message_data, sent_count)
-        
-        return {
-            'sent': sent_count,
-            'failed': failed_count,
-            'total': len(active_users)
-        }
-    
-    def _create_broadcast_keyboard(self, message_data: Dict[str, Any]):
-        if message_data.get('button_text') and message_data.get('button_url'):
-            from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-            keyboard = InlineKeyboardMarkup(inline_keyboard=[[
-                InlineKeyboardButton(
-                    text=message_data['button_text'],
-                    url=message_data['button_url']
-                )
-            ]])
-            return keyboard
-        return None
-    
-    async def _save_broadcast_message(self, message_data: Dict[str, Any], sent_count: int):
-        broadcast = BroadcastMessage(
-            text=message_data['text'],
-            media_type=message_data.get('media_type'),
-            media_file_id=message_data.get('media_file_id'),
-            button_text=message_data.get('button_text'),
-            button_url=message_data.get('button_url'),
-            created_at=datetime.now(),
-            sent_count=sent_count
-        )
-        
-        async with aiosqlite.connect(DB_PATH) as db:
-            await db.execute('''
-                INSERT INTO broadcast_messages (text, media_type, media_file_id, button_text, button_url, created_at, sent_count)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                broadcast.text,
-                broadcast.media_type,
-                broadcast.media_file_id,
-                broadcast.button_text,
-                broadcast.button_url,
-                broadcast.created_at.isoformat(),
-                broadcast.sent_count
-            ))
-            await db.commit()
-    
     async def generate_and_send_stats_charts(self, chat_id: int):
         try:
             user_growth_chart = await self.analytics.generate_user_growth_chart()
             if user_growth_chart:
                 await self.bot.send_photo(
                     chat_id=chat_id,
-                    photo=FSInputFile(user_growth_chart),
+                    photo=BufferedInputFile(user_growth_chart, filename="user_growth.png"),
                     caption=f"{EMOJI['stats']} User Growth Chart"
                 )
             
@@ -167,7 +70,7 @@ class AdminPanel:
             if download_stats_chart:
                 await self.bot.send_photo(
                     chat_id=chat_id,
-                    photo=FSInputFile(download_stats_chart),
+                    photo=BufferedInputFile(download_stats_chart, filename="download_stats.png"),
                     caption=f"{EMOJI['download']} Download Statistics Chart"
                 )
             
@@ -175,7 +78,7 @@ class AdminPanel:
             if platform_chart:
                 await self.bot.send_photo(
                     chat_id=chat_id,
-                    photo=FSInputFile(platform_chart),
+                    photo=BufferedInputFile(platform_chart, filename="platform_distribution.png"),
                     caption=f"{EMOJI['stats']} Platform Distribution"
                 )
         
@@ -213,11 +116,48 @@ class AdminPanel:
         stats_text += f"""
 
 **{EMOJI['health']} System:**
-• CPU: {system_stats['cpu_percent']:.1f}%
-• Memory: {system_stats['memory_percent']:.1f}%
+• CPU: {system_stats['cpu_percent']:.1f}% {system_stats['cpu_trend']}
+• Memory: {system_stats['memory_percent']:.1f}% {system_stats['memory_trend']}
+• Event Loop Lag: {system_stats['loop_lag']:.1f}ms
+• Open Files: {system_stats['open_files']:,}
 • Disk: {system_stats['disk_percent']:.1f}%
 • Available Memory: {format_file_size(system_stats['memory_available'])}
 • Free Disk: {format_file_size(system_stats['disk_free'])}
         """
         
         return stats_text
+
+    async def get_cache_report(self, limit: int = 10) -> str:
+        stats = await file_cache.stats()
+        top_entries = await file_cache.top(limit)
+
+        report = (
+            f"{EMOJI['rocket']} File Cache\n\n"
+            f"• Entries: {stats['entries']:,}\n"
+            f"• Hits: {stats['hits']:,}\n"
+            f"• Misses: {stats['misses']:,}\n"
+            f"• Hit rate: {stats['hit_rate']:.1f}%\n"
+            f"• Invalidated: {stats['invalidations']:,}\n"
+        )
+
+        if top_entries:
+            report += f"\n{EMOJI['fire']} Hottest entries:\n"
+            for entry in top_entries:
+                report += f"• {entry.media_id} [{entry.quality}/{entry.route}] - {entry.hits:,} hits, {format_file_size(entry.file_size)}\n"
+
+        users = user_cache.stats()
+        report += (
+            f"\n{EMOJI['users']} User Cache\n\n"
+            f"• Entries: {users['entries']:,}\n"
+            f"• Hit rate: {users['hit_rate']:.1f}%\n"
+        )
+
+        charts = chart_renderer.stats()
+        report += (
+            f"\n{EMOJI['stats']} Chart Cache\n\n"
+            f"• Entries: {charts['entries']:,}\n"
+            f"• Hits: {charts['hits']:,}\n"
+            f"• Renders: {charts['renders']:,}\n"
+        )
+
+        return report
@@ -0,0 +1,110 @@
+import os
+import sys
+import time
+import random
+import asyncio
+import tempfile
+import aiosqlite
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.connection import Database
+
+USERS = 2000
+OPERATIONS = 4000
+CONCURRENCY = 50
+WRITE_RATIO = 0.2
+
+SCHEMA = '''
+    CREATE TABLE users (
+        user_id INTEGER PRIMARY KEY,
+        username TEXT,
+        language TEXT DEFAULT 'uz',
+        download_count INTEGER DEFAULT 0,
+        last_activity TEXT
+    );
+'''
+
+READ_QUERY = 'SELECT user_id, username, language, download_count, last_activity FROM users WHERE user_id = ?'
+WRITE_QUERY = 'UPDATE users SET download_count = download_count + 1, last_activity = ? WHERE user_id = ?'
+
+
+def seed(path: str):
+    import sqlite3
+    connection = sqlite3.connect(path)
+    connection.executescript(SCHEMA)
+    connection.executemany(
+        'INSERT INTO users (user_id, username, last_activity) VALUES (?, ?, ?)',
+        [(user_id, f'user{user_id}', '2025-01-01T00:00:00') for user_id in range(1, USERS + 1)]
+    )
+    connection.commit()
+    connection.close()
+
+
+async def per_query_connections(path: str, user_id: int, write: bool):
+    async with aiosqlite.connect(path) as db:
+        if write:
+            await db.execute(WRITE_QUERY, ('2025-01-02T00:00:00', user_id))
+            await db.commit()
+        else:
+            async with db.execute(READ_QUERY, (user_id,)) as cursor:
+                await cursor.fetchone()
+
+
+async def pooled_connections(database: Database, user_id: int, write: bool):
+    if write:
+        async with database.write() as db:
+            await db.execute(WRITE_QUERY, ('2025-01-02T00:00:00', user_id))
+    else:
+        async with database.read() as db:
+            async with db.execute(READ_QUERY, (user_id,)) as cursor:
+                await cursor.fetchone()
+
+
+async def run(name: str, operation, workload):
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+    latencies = []
+    errors = 0
+
+    async def timed(user_id: int, write: bool):
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                await operation(user_id, write)
+            except Exception:
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(timed(user_id, write) for user_id, write in workload))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2] * 1000
+    p99 = latencies[int(len(latencies) * 0.99)] * 1000
+    print(f"{name:<24} {elapsed:7.2f}s {len(workload) / elapsed:9.0f} ops/s  p50 {p50:7.2f}ms  p99 {p99:8.2f}ms  errors {errors}")
+
+
+async def main():
+    random.seed(42)
+    workload = [(random.randint(1, USERS), random.random() < WRITE_RATIO) for _ in range(OPERATIONS)]
+    print(f"{OPERATIONS} operations, {int(WRITE_RATIO * 100)}% writes, {CONCURRENCY} concurrent")
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'per_query.db')
+        seed(path)
+        await run('connect per query', lambda user_id, write: per_query_connections(path, user_id, write), workload)
+
+        path = os.path.join(directory, 'pooled.db')
+        seed(path)
+        database = Database(path)
+        await database.open()
+        try:
+            await run('pooled + single writer', lambda user_id, write: pooled_connections(database, user_id, write), workload)
+        finally:
+            await database.close()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
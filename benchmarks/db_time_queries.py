@@ -0,0 +1,134 @@
+import os
+import sys
+import time
+import random
+import sqlite3
+import asyncio
+import tempfile
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.connection import database
+from database.migrations import BASELINE, migrate, epoch
+
+DOWNLOADS = int(os.getenv("BENCH_DOWNLOADS", 2000000))
+USERS = int(os.getenv("BENCH_USERS", 200000))
+DAYS = 365
+RUNS = 5
+
+PLATFORMS = ('youtube', 'youtube', 'instagram', 'unknown')
+STATUSES = ('completed', 'completed', 'completed', 'failed', 'pending')
+
+now = datetime.now()
+today = datetime.combine(now.date(), datetime.min.time())
+month_ago = today - timedelta(days=30)
+week_ago = today - timedelta(days=7)
+
+BEFORE = [
+    ('downloads today', 'SELECT COUNT(*) FROM downloads WHERE date(created_at) = ?', (today.strftime('%Y-%m-%d'),)),
+    ('completed today', "SELECT COUNT(*) FROM downloads WHERE status = 'completed' AND date(created_at) = ?", (today.strftime('%Y-%m-%d'),)),
+    ('youtube last 7 days', "SELECT COUNT(*) FROM downloads WHERE platform = 'youtube' AND date(created_at) >= ?", (week_ago.strftime('%Y-%m-%d'),)),
+    ('30-day chart', '''
+        SELECT date(created_at) AS day, SUM(status = 'completed'), SUM(status = 'failed')
+        FROM downloads WHERE created_at >= date('now', '-30 days') GROUP BY day
+    ''', ()),
+    ('new users 30 days', '''
+        SELECT date(join_date) AS day, COUNT(*) FROM users
+        WHERE join_date >= date('now', '-30 days') GROUP BY day
+    ''', ()),
+]
+
+AFTER = [
+    ('downloads today', 'SELECT COUNT(*) FROM downloads WHERE created_ts >= ? AND created_ts < ?', (epoch(today), epoch(today + timedelta(days=1)))),
+    ('completed today', "SELECT COUNT(*) FROM downloads WHERE status = 'completed' AND created_ts >= ? AND created_ts < ?", (epoch(today), epoch(today + timedelta(days=1)))),
+    ('youtube last 7 days', "SELECT COUNT(*) FROM downloads WHERE platform = 'youtube' AND created_ts >= ?", (epoch(week_ago),)),
+    ('30-day chart', '''
+        SELECT date(created_ts, 'unixepoch') AS day, SUM(status = 'completed'), SUM(status = 'failed')
+        FROM downloads WHERE created_ts >= ? GROUP BY day
+    ''', (epoch(month_ago),)),
+    ('new users 30 days', '''
+        SELECT date(join_ts, 'unixepoch') AS day, COUNT(*) FROM users
+        WHERE join_ts >= ? GROUP BY day
+    ''', (epoch(month_ago),)),
+]
+
+
+def seed(path: str):
+    random.seed(42)
+    connection = sqlite3.connect(path)
+    connection.execute('PRAGMA journal_mode = WAL')
+    connection.execute('PRAGMA synchronous = OFF')
+    for statement in BASELINE:
+        connection.execute(statement)
+
+    connection.executemany(
+        'INSERT INTO users (user_id, username, join_date, last_activity) VALUES (?, ?, ?, ?)',
+        (
+            (user_id, f'user{user_id}', (now - timedelta(seconds=random.randint(0, DAYS * 86400))).isoformat(), now.isoformat())
+            for user_id in range(1, USERS + 1)
+        )
+    )
+    connection.executemany(
+        'INSERT INTO downloads (user_id, url, platform, title, quality, status, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)',
+        (
+            (
+                random.randint(1, USERS), 'https://example.com', random.choice(PLATFORMS), 'title', 'best',
+                random.choice(STATUSES), (now - timedelta(seconds=random.randint(0, DAYS * 86400))).isoformat()
+            )
+            for _ in range(DOWNLOADS)
+        )
+    )
+    connection.commit()
+    connection.execute('ANALYZE')
+    connection.close()
+
+
+def measure(path: str, queries):
+    connection = sqlite3.connect(path)
+    results = {}
+    for name, query, params in queries:
+        timings = []
+        for _ in range(RUNS):
+            started = time.perf_counter()
+            connection.execute(query, params).fetchall()
+            timings.append(time.perf_counter() - started)
+        timings.sort()
+        plan = ' / '.join(row[3] for row in connection.execute('EXPLAIN QUERY PLAN ' + query, params))
+        results[name] = (timings[len(timings) // 2] * 1000, plan)
+    connection.close()
+    return results
+
+
+async def upgrade(path: str) -> float:
+    database.path = path
+    started = time.perf_counter()
+    await migrate()
+    elapsed = time.perf_counter() - started
+    await database.close()
+    return elapsed
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'bench.db')
+
+        started = time.perf_counter()
+        seed(path)
+        print(f"Seeded {DOWNLOADS:,} downloads and {USERS:,} users in {time.perf_counter() - started:.1f}s")
+
+        before = measure(path, BEFORE)
+        print(f"Migrations applied in {asyncio.run(upgrade(path)):.1f}s")
+        after = measure(path, AFTER)
+
+        print(f"{'query':<22} {'before':>10} {'after':>10} {'speedup':>9}")
+        for name, _, _ in BEFORE:
+            old, new = before[name][0], after[name][0]
+            print(f"{name:<22} {old:8.1f}ms {new:8.1f}ms {old / max(new, 0.001):8.0f}x")
+        print()
+        for name, _, _ in BEFORE:
+            print(f"{name}:\n  before: {before[name][1]}\n  after:  {after[name][1]}")
+
+
+if __name__ == '__main__':
+    main()
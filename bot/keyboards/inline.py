@@ -1,37 +1,39 @@
+from typing import Dict, Optional
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from utils.constants import EMOJI, Quality
 from utils.i18n import i18n
+from utils.helpers import format_file_size
+
+QUALITY_BUTTONS = [
+    ('quality_best', Quality.BEST.value),
+    ('quality_high', Quality.HIGH.value),
+    ('quality_medium', Quality.MEDIUM.value),
+    ('quality_low', Quality.LOW.value),
+    ('quality_audio', Quality.AUDIO.value)
+]
+
+def get_quality_keyboard(lang: str = "uz", sizes: Optional[Dict[str, int]] = None) -> InlineKeyboardMarkup:
+    video_buttons = []
+    audio_buttons = []
+
+    for label_key, quality in QUALITY_BUTTONS:
+        if sizes is not None and quality not in sizes:
+            continue
+
+        text = i18n.get(label_key, lang)
+        if sizes is not None:
+            text = f"{text} · ~{format_file_size(sizes[quality])}"
+
+        button = InlineKeyboardButton(text=text, callback_data=f"quality:{quality}")
+        if quality == Quality.AUDIO.value:
+            audio_buttons.append(button)
+        else:
+            video_buttons.append(button)
+
+    buttons = [video_buttons[i:i + 2] for i in range(0, len(video_buttons), 2)]
+    if audio_buttons:
+        buttons.append(audio_buttons)
 
-def get_quality_keyboard(lang: str = "uz") -> InlineKeyboardMarkup:
-    buttons = [
-        [
-            InlineKeyboardButton(
-                text=i18n.get('quality_best', lang), 
-                callback_data="quality:best"
-            ),
-            InlineKeyboardButton(
-                text=i18n.get('quality_high', lang), 
-                callback_data="quality:720p"
-            )
-        ],
-        [
-            InlineKeyboardButton(
-                text=i18n.get('quality_medium', lang), 
-                callback_data="quality:480p"
-            ),
-            InlineKeyboardButton(
-                text=i18n.get('quality_low', lang), 
-                callback_data="quality:360p"
-            )
-        ],
-        [
-            InlineKeyboardButton(
-                text=i18n.get('quality_audio', lang), 
-                callback_data="quality:audio"
-            )
-        ]
-    ]
-    
     return InlineKeyboardMarkup(inline_keyboard=buttons)
 
 def get_format_keyboard(lang: str = "uz") -> InlineKeyboardMarkup:
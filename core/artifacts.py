@@ -0,0 +1,36 @@
+from typing import Dict
+from utils.helpers import cleanup_file, cleanup_workspace, get_workspace
+from core.storage import storage_manager
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class ArtifactTracker:
+    def __init__(self):
+        self.references: Dict[str, int] = {}
+
+    def acquire(self, path: str, count: int = 1):
+        self.references[path] = self.references.get(path, 0) + count
+
+    async def release(self, path: str):
+        remaining = self.references.get(path, 0) - 1
+        if remaining > 0:
+            self.references[path] = remaining
+            logger.debug(f"Artifact {path} still used by {remaining} recipients")
+            return
+
+        self.references.pop(path, None)
+
+        workspace = get_workspace(path)
+        if workspace:
+            await cleanup_workspace(workspace)
+            await storage_manager.release(workspace)
+        else:
+            await cleanup_file(path)
+
+    def in_use(self, path: str) -> bool:
+        return self.references.get(path, 0) > 0
+
+
+artifacts = ArtifactTracker()
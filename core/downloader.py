@@ -1,19 +1,100 @@
 import os
+import time
 import asyncio
-import yt_dlp
-from typing import Dict, Any, Callable, Optional
-from utils.constants import TEMP_DIR, Platform, Quality, MediaInfo
-from utils.helpers import sanitize_filename, ensure_dir, get_file_size
+import importlib.util
+from urllib.parse import urlparse, parse_qs
+from typing import Dict, Any, Optional, List, Tuple
+from utils.constants import (
+    TEMP_DIR, Platform, Quality, MediaInfo, YTDLP_EXECUTOR, INFO_REUSE_TTL, INFO_REUSE_MARGIN,
+    BOT_FILE_LIMIT, STORAGE_DEFAULT_RESERVATION
+)
+from utils.helpers import ensure_dir, get_file_size, get_media_id, create_workspace, cleanup_workspace, cleanup_file
+from core.metadata_cache import metadata_cache
+from core.artifacts import artifacts
+from core.storage import storage_manager
+from core.ytdlp_pool import YtDlpProcessPool, run_extract_info, run_download
+from core.stream_upload import StreamingUpload
+from core.format_planner import format_planner, slim_formats, FormatPlan, QUALITY_HEIGHTS
+from core.ffmpeg_pool import ffmpeg_scheduler, PRIORITY_HIGH, PRIORITY_NORMAL
+from core.transcode import transcoder
+from core.progress import progress_bus, Renderer, STAGE_DOWNLOAD, STAGE_COMPRESS
 import logging
 
 logger = logging.getLogger(__name__)
 
+MUTAGEN_AVAILABLE = importlib.util.find_spec('mutagen') is not None
+
+class OutputTracker:
+    def __init__(self):
+        self.path: Optional[str] = None
+
+    def progress_hook(self, d: Dict[str, Any]):
+        if d.get('status') in ('finished', 'postprocessed') and d.get('filename'):
+            self.path = d['filename']
+
+    def postprocessor_hook(self, d: Dict[str, Any]):
+        if d.get('status') == 'finished' and d.get('info_dict', {}).get('filepath'):
+            self.path = d['info_dict']['filepath']
+
+
+class InflightDownload:
+    def __init__(self, progress_key: str):
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self.progress_key = progress_key
+        self.recipients = 1
+
+
 class DownloadManager:
     def __init__(self):
         self.active_downloads = {}
         self.semaphore = asyncio.Semaphore(5)
+        self.inflight: Dict[Tuple[str, str], InflightDownload] = {}
+        self.process_pool = YtDlpProcessPool() if YTDLP_EXECUTOR == "process" else None
+
+    async def _extract_info(self, url: str, opts: Dict[str, Any]) -> Dict[str, Any]:
+        if self.process_pool:
+            return await self.process_pool.extract_info(url, opts)
+        return await asyncio.to_thread(run_extract_info, url, opts)
+
+    async def _run_download(self, url: str, opts: Dict[str, Any], info: Optional[Dict[str, Any]] = None):
+        if self.process_pool:
+            opts = dict(opts)
+            hooks = opts.pop('progress_hooks', None)
+            opts.pop('postprocessor_hooks', None)
+            await self.process_pool.download(url, opts, hooks, info)
+        else:
+            await asyncio.to_thread(run_download, url, opts, None, info)
+
+    def _info_expiry(self, info: Dict[str, Any]) -> float:
+        expiries = []
+        for fmt in info.get('formats') or []:
+            query = parse_qs(urlparse(fmt.get('url') or '').query)
+            if query.get('expire', [''])[0].isdigit():
+                expiries.append(int(query['expire'][0]))
+
+        expires_at = min(expiries) if expiries else time.time() + INFO_REUSE_TTL
+        return expires_at - INFO_REUSE_MARGIN
+
+    def close(self):
+        if self.process_pool:
+            self.process_pool.shutdown()
 
     async def get_video_info(self, url: str) -> MediaInfo:
+        media_id = get_media_id(url)
+        cache_key = f"ytdlp:{media_id}" if media_id else None
+
+        if cache_key:
+            cached = await metadata_cache.get(cache_key)
+            if cached:
+                return MediaInfo(
+                    title=cached['title'],
+                    duration=cached['duration'],
+                    quality_options=cached['quality_options'],
+                    file_size=cached['file_size'],
+                    platform=Platform(cached['platform']),
+                    formats=cached.get('formats')
+                )
+
         opts = {
             'quiet': True,
             'no_warnings': True,
@@ -27,46 +108,180 @@ class DownloadManager:
             'concurrent_fragment_downloads': 8
         }
 
-        with yt_dlp.YoutubeDL(opts) as ydl:
-            try:
-                info = await asyncio.to_thread(ydl.extract_info, url, download=False)
+        try:
+            info = await self._extract_info(url, opts)
 
-                platform = Platform.YOUTUBE if any(x in url.lower() for x in ['youtube.com', 'youtu.be']) else Platform.INSTAGRAM
+            platform = Platform.YOUTUBE if any(x in url.lower() for x in ['youtube.com', 'youtu.be']) else Platform.INSTAGRAM
 
-                quality_options = {}
-                if 'formats' in info:
-                    for fmt in info['formats']:
-                        if fmt.get('height') and fmt.get('vcodec') != 'none':
-                            key = f"{fmt['height']}p"
-                            quality_options[key] = {
-                                'format_id': fmt['format_id'],
-                                'filesize': fmt.get('filesize', 0) or fmt.get('filesize_approx', 0) or 0
-                            }
+            quality_options = self._collect_quality_options(info)
 
-                return MediaInfo(
-                    title=info.get('title', 'Unknown'),
-                    duration=info.get('duration', 0),
-                    quality_options=quality_options,
-                    file_size=info.get('filesize', 0) or info.get('filesize_approx', 0) or 0,
-                    platform=platform
-                )
-            except Exception as e:
-                logger.error(f"Error extracting info from {url}: {e}")
-                raise Exception(f"Failed to extract video info: {str(e)}")
+            media_info = MediaInfo(
+                title=info.get('title', 'Unknown'),
+                duration=info.get('duration', 0),
+                quality_options=quality_options,
+                file_size=info.get('filesize', 0) or info.get('filesize_approx', 0) or 0,
+                platform=platform,
+                info=info,
+                info_expires_at=self._info_expiry(info),
+                formats=slim_formats(info)
+            )
+        except Exception as e:
+            logger.error(f"Error extracting info from {url}: {e}")
+            raise Exception(f"Failed to extract video info: {str(e)}")
+
+        if cache_key:
+            await metadata_cache.set(cache_key, media_info.platform, {
+                'title': media_info.title,
+                'duration': media_info.duration,
+                'quality_options': media_info.quality_options,
+                'file_size': media_info.file_size,
+                'platform': media_info.platform.value,
+                'formats': media_info.formats
+            })
+
+        return media_info
+
+    def _collect_quality_options(self, info: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+        quality_options = {}
+        for fmt in info.get('formats') or []:
+            if fmt.get('height') and fmt.get('vcodec') != 'none':
+                key = f"{fmt['height']}p"
+                quality_options[key] = {
+                    'format_id': fmt['format_id'],
+                    'filesize': fmt.get('filesize', 0) or fmt.get('filesize_approx', 0) or 0
+                }
+        return quality_options
+
+    def quality_sizes(self, media_info: MediaInfo, size_limit: int) -> Optional[Dict[str, int]]:
+        if not media_info.formats:
+            return None
+
+        options = format_planner.options(media_info.formats, media_info.duration or 0, size_limit)
+        return {quality.value: plan.size for quality, plan in options.items()} or None
+
+    async def _load_formats(self, url: str, info: Optional[Dict[str, Any]] = None) -> Tuple[List[Dict[str, Any]], float]:
+        if info is not None:
+            return slim_formats(info), info.get('duration') or 0
+
+        media_id = get_media_id(url)
+        cached = await metadata_cache.get(f"ytdlp:{media_id}") if media_id else None
+        if cached and cached.get('formats'):
+            return cached['formats'], cached.get('duration') or 0
+        return [], 0
+
+    def _estimate_size(self, formats: List[Dict[str, Any]], duration: float, quality: Quality, size_limit: int, plan: Optional[FormatPlan]) -> int:
+        if plan:
+            return min(plan.size, storage_manager.limit)
+
+        if quality == Quality.AUDIO:
+            return int(duration * 320 * 125) or STORAGE_DEFAULT_RESERVATION
+
+        max_height = QUALITY_HEIGHTS.get(quality)
+        sizes = [
+            candidate.size for candidate in format_planner.candidates(formats, duration)
+            if max_height is None or candidate.height <= max_height
+        ]
+        estimate = max(sizes) if sizes else STORAGE_DEFAULT_RESERVATION
+
+        if estimate > size_limit:
+            estimate *= 2
+
+        return min(estimate, storage_manager.limit)
+
+    async def plan_download(self, url: str, quality: Quality, info: Optional[Dict[str, Any]] = None, size_limit: int = BOT_FILE_LIMIT) -> Optional[FormatPlan]:
+        formats, duration = await self._load_formats(url, info)
+        return format_planner.plan(formats, duration, quality, size_limit) if formats else None
 
     async def download_video(
         self,
         url: str,
         quality: Quality = Quality.BEST,
-        progress_callback: Optional[Callable] = None
+        progress_callback: Optional[Renderer] = None,
+        info: Optional[Dict[str, Any]] = None,
+        info_expires_at: float = 0,
+        stream_upload: Optional[StreamingUpload] = None,
+        size_limit: int = BOT_FILE_LIMIT,
+        plan: Optional[FormatPlan] = None
+    ) -> str:
+        key = (get_media_id(url) or url, quality.value, size_limit)
+
+        flight = self.inflight.get(key)
+        if flight:
+            flight.recipients += 1
+            if progress_callback:
+                progress_bus.subscribe(flight.progress_key, progress_callback)
+            logger.info(f"Attached to in-flight download {key} ({flight.recipients} recipients)")
+            try:
+                return await asyncio.shield(flight.future)
+            except BaseException:
+                future = flight.future
+                if future.done() and not future.cancelled() and future.exception() is None:
+                    await artifacts.release(future.result())
+                else:
+                    flight.recipients -= 1
+                raise
+            finally:
+                if progress_callback:
+                    progress_bus.unsubscribe(flight.progress_key, progress_callback)
+
+        flight = InflightDownload(f"download:{key[0]}:{key[1]}:{key[2]}")
+        if progress_callback:
+            progress_bus.subscribe(flight.progress_key, progress_callback)
+        self.inflight[key] = flight
+
+        try:
+            if info is not None and time.time() >= info_expires_at:
+                logger.info(f"Stored info for {url} expired, re-extracting")
+                info = None
+            file_path = await self._download(url, quality, flight.progress_key, info, stream_upload, size_limit, plan)
+        except asyncio.CancelledError:
+            flight.future.cancel()
+            raise
+        except Exception as e:
+            flight.future.set_exception(e)
+            flight.future.exception()
+            raise
+        finally:
+            self.inflight.pop(key, None)
+            if progress_callback:
+                progress_bus.unsubscribe(flight.progress_key, progress_callback)
+
+        artifacts.acquire(file_path, flight.recipients)
+        flight.future.set_result(file_path)
+        return file_path
+
+    async def _download(
+        self,
+        url: str,
+        quality: Quality,
+        progress_key: str,
+        info: Optional[Dict[str, Any]] = None,
+        stream_upload: Optional[StreamingUpload] = None,
+        size_limit: int = BOT_FILE_LIMIT,
+        plan: Optional[FormatPlan] = None
     ) -> str:
         await ensure_dir(TEMP_DIR)
 
-        url_hash = abs(hash(url))
-        filename = sanitize_filename(f"video_{url_hash}_{int(asyncio.get_event_loop().time())}")
-        output_path = os.path.join(TEMP_DIR, f"{filename}.%(ext)s")
+        formats, duration = await self._load_formats(url, info)
+        if plan is None and formats:
+            plan = format_planner.plan(formats, duration, quality, size_limit)
+
+        if plan:
+            format_selector = f"{plan.format_id}/{self._size_limited_selector(self._get_format_selector(quality, url), size_limit)}"
+            logger.info(f"Planned format {plan.format_id} (~{plan.size} bytes, {plan.height}p) for {url}")
+        else:
+            format_selector = self._size_limited_selector(self._get_format_selector(quality, url), size_limit)
+            logger.info(f"No format fits {size_limit} bytes for {url}, falling back to height selection")
+
+        workspace = await create_workspace()
+        try:
+            await storage_manager.reserve(workspace, self._estimate_size(formats, duration, quality, size_limit, plan))
+        except Exception:
+            await cleanup_workspace(workspace)
+            raise
 
-        format_selector = self._get_format_selector(quality, url)
+        output_path = os.path.join(workspace, "video_%(id)s.%(ext)s")
+        output = OutputTracker()
 
         opts = {
             'outtmpl': output_path,
@@ -76,8 +291,6 @@ class DownloadManager:
             'writeautomaticsub': False,
             'quiet': True,
             'no_warnings': True,
-            'extractaudio': quality == Quality.AUDIO,
-            'audioformat': 'mp3' if quality == Quality.AUDIO else None,
             'ignoreerrors': False,
             'retries': 3,
             'fragment_retries': 3,
@@ -93,6 +306,12 @@ class DownloadManager:
             'buffersize': 16384
         }
 
+        if plan and plan.merged:
+            opts['merge_output_format'] = plan.ext
+
+        if quality == Quality.AUDIO and await ffmpeg_scheduler.available():
+            opts.update(self._audio_postprocessing(plan))
+
         if any(x in url.lower() for x in ['youtube.com', 'youtu.be']):
             opts.update({
                 'http_headers': {
@@ -100,50 +319,77 @@ class DownloadManager:
                 }
             })
 
-        if progress_callback:
-            opts['progress_hooks'] = [self._progress_hook(progress_callback)]
+        hooks = [output.progress_hook, self._progress_hook(progress_key)]
+        if stream_upload:
+            hooks.append(stream_upload.hook)
+        opts['progress_hooks'] = hooks
+        opts['postprocessor_hooks'] = [output.postprocessor_hook]
 
         async with self.semaphore:
-            with yt_dlp.YoutubeDL(opts) as ydl:
-                try:
-                    logger.info(f"Starting download: {url} with quality: {quality.value}")
-                    await asyncio.to_thread(ydl.download, [url])
-
-                    downloaded_files = []
-                    for f in os.listdir(TEMP_DIR):
-                        if f.startswith(filename.split('.')[0]) and not f.endswith('.part'):
-                            downloaded_files.append(os.path.join(TEMP_DIR, f))
-
-                    if not downloaded_files:
-                        raise Exception("Download completed but no file found")
-
-                    final_file = max(downloaded_files, key=os.path.getctime)
-                    logger.info(f"Downloaded file: {final_file}")
-
-                    if quality != Quality.AUDIO and final_file.endswith(('.mp4', '.avi', '.mkv', '.mov', '.webm')):
-                        file_size = await get_file_size(final_file)
-                        if file_size > 20 * 1024 * 1024:
-                            logger.info(f"File size {file_size} bytes, compressing...")
-                            compressed_file = await self.compress_video(final_file, 19, True)
-                            if compressed_file != final_file:
-                                try:
-                                    os.remove(final_file)
-                                    logger.info("Original file removed after compression")
-                                except Exception as e:
-                                    logger.warning(f"Failed to remove original file: {e}")
-                                final_file = compressed_file
-
-                    return final_file
-
-                except Exception as e:
-                    logger.error(f"Download error for {url}: {e}")
+            try:
+                logger.info(f"Starting download: {url} with quality: {quality.value}")
+                if info is not None:
                     try:
-                        for f in os.listdir(TEMP_DIR):
-                            if f.startswith(filename.split('.')[0]):
-                                os.remove(os.path.join(TEMP_DIR, f))
-                    except:
-                        pass
-                    raise Exception(f"Download failed: {str(e)}")
+                        await self._run_download(url, opts, info)
+                    except Exception as e:
+                        logger.warning(f"Download from stored info failed, re-extracting {url}: {e}")
+                        await self._run_download(url, opts)
+                else:
+                    await self._run_download(url, opts)
+
+                final_file = output.path
+                if not final_file or not os.path.exists(final_file):
+                    raise Exception("Download completed but no file found")
+
+                logger.info(f"Downloaded file: {final_file}")
+
+                if quality == Quality.AUDIO:
+                    fitted_file = await transcoder.fit_audio(final_file, size_limit, PRIORITY_HIGH, progress=progress_bus.reporter(progress_key, STAGE_COMPRESS))
+                    if fitted_file != final_file:
+                        if stream_upload:
+                            stream_upload.abort()
+                        await cleanup_file(final_file)
+                        final_file = fitted_file
+                elif final_file.endswith(('.mp4', '.avi', '.mkv', '.mov', '.webm')):
+                    fitted_file = await transcoder.fit(final_file, size_limit, PRIORITY_HIGH, progress=progress_bus.reporter(progress_key, STAGE_COMPRESS))
+                    if fitted_file != final_file:
+                        if stream_upload:
+                            stream_upload.abort()
+                        try:
+                            os.remove(final_file)
+                            logger.info("Original file removed after remux/compression")
+                        except Exception as e:
+                            logger.warning(f"Failed to remove original file: {e}")
+                        final_file = fitted_file
+
+                return final_file
+
+            except Exception as e:
+                logger.error(f"Download error for {url}: {e}")
+                if stream_upload:
+                    stream_upload.abort()
+                await cleanup_workspace(workspace)
+                await storage_manager.release(workspace)
+                raise Exception(f"Download failed: {str(e)}")
+
+    def _audio_postprocessing(self, plan: Optional[FormatPlan]) -> Dict[str, Any]:
+        postprocessors = [
+            {'key': 'FFmpegExtractAudio', 'preferredcodec': 'best'},
+            {'key': 'FFmpegMetadata', 'add_metadata': True}
+        ]
+        opts = {'postprocessors': postprocessors}
+
+        if MUTAGEN_AVAILABLE or (plan and plan.ext in ('m4a', 'mp4')):
+            opts['writethumbnail'] = True
+            postprocessors.insert(0, {'key': 'FFmpegThumbnailsConvertor', 'format': 'jpg', 'when': 'before_dl'})
+            postprocessors.append({'key': 'EmbedThumbnail', 'already_have_thumbnail': False})
+
+        return opts
+
+    def _size_limited_selector(self, selector: str, size_limit: int) -> str:
+        alternatives = selector.split('/')
+        limited = [f"{alternative}[filesize<?{size_limit}][filesize_approx<?{size_limit}]" for alternative in alternatives]
+        return '/'.join(limited + alternatives)
 
     def _get_format_selector(self, quality: Quality, url: str) -> str:
         if any(x in url.lower() for x in ['youtube.com', 'youtu.be']):
@@ -169,12 +415,12 @@ class DownloadManager:
             else:
                 return 'best'
 
-    def _progress_hook(self, callback: Callable):
+    def _progress_hook(self, progress_key: str):
         def hook(d):
             if d['status'] == 'downloading':
-                if 'total_bytes' in d and 'downloaded_bytes' in d:
+                if d.get('total_bytes') and 'downloaded_bytes' in d:
                     progress = (d['downloaded_bytes'] / d['total_bytes']) * 100
-                elif '_total_bytes_estimate' in d and 'downloaded_bytes' in d:
+                elif d.get('_total_bytes_estimate') and 'downloaded_bytes' in d:
                     progress = (d['downloaded_bytes'] / d['_total_bytes_estimate']) * 100
                 elif '_percent_str' in d:
                     try:
@@ -184,110 +430,10 @@ class DownloadManager:
                 else:
                     progress = 0
 
-                try:
-                    loop = asyncio.get_running_loop()
-                    loop.create_task(callback(min(progress, 100)))
-                except RuntimeError:
-                    pass
+                progress_bus.publish(progress_key, STAGE_DOWNLOAD, progress)
             elif d['status'] == 'error':
                 logger.error(f"Download hook error: {d.get('error', 'Unknown error')}")
         return hook
 
-    async def compress_video(self, input_path: str, target_size_mb: int = 19, preserve_resolution: bool = True) -> str:
-        if not await self._check_ffmpeg():
-            logger.warning("FFmpeg not available, skipping compression")
-            return input_path
-
-        output_path = input_path.replace('.', '_compressed.')
-
-        try:
-            file_size = await get_file_size(input_path)
-            target_size_bytes = target_size_mb * 1024 * 1024
-
-            if file_size <= target_size_bytes:
-                return input_path
-
-            info_cmd = [
-                'ffprobe', '-v', 'quiet', '-print_format', 'json',
-                '-show_format', '-show_streams', input_path
-            ]
-
-            try:
-                info_process = await asyncio.create_subprocess_exec(
-                    *info_cmd,
-                    stdout=asyncio.subprocess.PIPE,
-                    stderr=asyncio.subprocess.PIPE
-                )
-
-                stdout, stderr = await asyncio.wait_for(info_process.communicate(), timeout=15)
-
-                if info_process.returncode != 0:
-                    logger.warning(f"FFprobe failed: {stderr.decode()}")
-                    return input_path
-
-                import json
-                info = json.loads(stdout.decode())
-                duration = float(info['format']['duration'])
-
-                target_bitrate = int((target_size_bytes * 8 * 0.8) / duration)
-
-                cmd = [
-                    'ffmpeg', '-i', input_path,
-                    '-c:v', 'libx264',
-                    '-b:v', f'{target_bitrate}',
-                    '-maxrate', f'{int(target_bitrate * 1.1)}',
-                    '-bufsize', f'{int(target_bitrate * 1.5)}',
-                    '-c:a', 'aac',
-                    '-b:a', '80k',
-                    '-preset', 'ultrafast',
-                    '-crf', '24' if preserve_resolution else '28',
-                    '-movflags', '+faststart',
-                    '-avoid_negative_ts', 'make_zero',
-                    '-threads', '0',
-                    '-y', output_path
-                ]
-
-                if not preserve_resolution:
-                    cmd.extend(['-vf', 'scale=640:480'])
-
-                process = await asyncio.create_subprocess_exec(
-                    *cmd,
-                    stdout=asyncio.subprocess.PIPE,
-                    stderr=asyncio.subprocess.PIPE
-                )
-
-                stdout, stderr = await asyncio.wait_for(process.communicate(), timeout=120)
-
-                if process.returncode == 0 and os.path.exists(output_path):
-                    compressed_size = await get_file_size(output_path)
-                    if compressed_size < file_size and compressed_size > 0:
-                        logger.info(f"Compression successful: {file_size} -> {compressed_size} bytes")
-                        return output_path
-                    else:
-                        if os.path.exists(output_path):
-                            os.remove(output_path)
-                else:
-                    logger.warning(f"FFmpeg compression failed: {stderr.decode() if stderr else 'Unknown error'}")
-
-            except asyncio.TimeoutError:
-                logger.warning("Compression timeout")
-            except Exception as e:
-                logger.warning(f"Compression process failed: {e}")
-
-            return input_path
-
-        except Exception as e:
-            logger.warning(f"Compression failed: {e}")
-            return input_path
-
-    async def _check_ffmpeg(self) -> bool:
-        try:
-            process = await asyncio.create_subprocess_exec(
-                'ffmpeg', '-version',
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
-            await asyncio.wait_for(process.communicate(), timeout=10)
-            return process.returncode == 0
-        except:
-            return False
+    async def compress_video(self, input_path: str, target_size_mb: int = 19, preserve_resolution: bool = True, priority: int = PRIORITY_NORMAL) -> str:
+        return await transcoder.transcode(input_path, target_size_mb, preserve_resolution, priority)
@@ -0,0 +1,258 @@
+import json
+import time
+import asyncio
+import itertools
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Dict, Any, Callable, List, Optional, Set, Tuple
+from utils.constants import FFMPEG_MAX_JOBS, FFMPEG_THREADS_PER_JOB, FFMPEG_PROBE_TIMEOUT, FFMPEG_ENCODE_TIMEOUT
+import logging
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 10
+PRIORITY_LOW = 20
+
+METRICS_WINDOW = 100
+
+
+@dataclass
+class FFmpegCapabilities:
+    ffmpeg: bool = False
+    ffprobe: bool = False
+    version: str = ""
+    encoders: Set[str] = field(default_factory=set)
+
+
+class FFmpegJob:
+    def __init__(self, cmd: List[str], priority: int, timeout: float, progress: Optional[Callable[[float], None]] = None):
+        self.cmd = cmd[:1] + ['-progress', 'pipe:1', '-nostats'] + cmd[1:] if progress else cmd
+        self.priority = priority
+        self.timeout = timeout
+        self.progress = progress
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self.process: Optional[asyncio.subprocess.Process] = None
+        self.cancelled = False
+        self.enqueued_at = time.monotonic()
+        self.started_at = 0.0
+
+
+async def _run_quick(*cmd: str, timeout: float = FFMPEG_PROBE_TIMEOUT) -> Tuple[int, bytes, bytes]:
+    process = await asyncio.create_subprocess_exec(
+        *cmd,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE
+    )
+    try:
+        stdout, stderr = await asyncio.wait_for(process.communicate(), timeout=timeout)
+    except asyncio.TimeoutError:
+        process.kill()
+        await process.wait()
+        raise
+    return process.returncode, stdout, stderr
+
+
+class FFmpegScheduler:
+    def __init__(self, max_jobs: int = FFMPEG_MAX_JOBS, threads_per_job: int = FFMPEG_THREADS_PER_JOB):
+        self.max_jobs = max(1, max_jobs)
+        self.threads_per_job = max(1, threads_per_job)
+        self.capabilities: Optional[FFmpegCapabilities] = None
+        self.probe_lock = asyncio.Lock()
+        self.queue: asyncio.PriorityQueue = asyncio.PriorityQueue()
+        self.sequence = itertools.count()
+        self.workers: List[asyncio.Task] = []
+        self.running: Set[FFmpegJob] = set()
+        self.wait_times: deque = deque(maxlen=METRICS_WINDOW)
+        self.encode_times: deque = deque(maxlen=METRICS_WINDOW)
+        self.completed = 0
+        self.failed = 0
+        self.cancelled = 0
+
+    async def start(self):
+        await self.probe()
+        if not self.workers:
+            self.workers = [asyncio.create_task(self._worker()) for _ in range(self.max_jobs)]
+            logger.info(f"FFmpeg scheduler started with {self.max_jobs} slots x {self.threads_per_job} threads")
+
+    async def stop(self):
+        for worker in self.workers:
+            worker.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers.clear()
+
+        while not self.queue.empty():
+            _, _, job = self.queue.get_nowait()
+            if not job.future.done():
+                job.future.cancel()
+
+    async def probe(self) -> FFmpegCapabilities:
+        async with self.probe_lock:
+            if self.capabilities is not None:
+                return self.capabilities
+
+            capabilities = FFmpegCapabilities()
+            try:
+                returncode, stdout, _ = await _run_quick('ffmpeg', '-hide_banner', '-version')
+                if returncode == 0:
+                    capabilities.ffmpeg = True
+                    capabilities.version = stdout.decode(errors='ignore').split('\n', 1)[0]
+
+                    returncode, stdout, _ = await _run_quick('ffmpeg', '-hide_banner', '-encoders')
+                    for line in stdout.decode(errors='ignore').splitlines():
+                        parts = line.split()
+                        if len(parts) >= 2 and len(parts[0]) == 6 and parts[0][0] in 'VAS':
+                            capabilities.encoders.add(parts[1])
+            except Exception as e:
+                logger.warning(f"FFmpeg probe failed: {e}")
+
+            try:
+                returncode, _, _ = await _run_quick('ffprobe', '-version')
+                capabilities.ffprobe = returncode == 0
+            except Exception as e:
+                logger.warning(f"FFprobe probe failed: {e}")
+
+            self.capabilities = capabilities
+            logger.info(
+                f"FFmpeg capabilities: ffmpeg={capabilities.ffmpeg} ffprobe={capabilities.ffprobe} "
+                f"encoders={len(capabilities.encoders)} ({capabilities.version or 'unavailable'})"
+            )
+            return capabilities
+
+    async def available(self) -> bool:
+        capabilities = await self.probe()
+        return capabilities.ffmpeg and capabilities.ffprobe
+
+    async def has_encoder(self, name: str) -> bool:
+        return name in (await self.probe()).encoders
+
+    async def probe_media(self, path: str) -> Dict[str, Any]:
+        returncode, stdout, stderr = await _run_quick(
+            'ffprobe', '-v', 'quiet', '-print_format', 'json', '-show_format', '-show_streams', path
+        )
+        if returncode != 0:
+            raise Exception(f"FFprobe failed: {stderr.decode(errors='ignore')}")
+        return json.loads(stdout.decode())
+
+    async def run(
+        self,
+        cmd: List[str],
+        priority: int = PRIORITY_NORMAL,
+        timeout: float = FFMPEG_ENCODE_TIMEOUT,
+        progress: Optional[Callable[[float], None]] = None
+    ) -> Tuple[int, bytes]:
+        if not self.workers:
+            await self.start()
+
+        job = FFmpegJob(cmd, priority, timeout, progress)
+        await self.queue.put((priority, next(self.sequence), job))
+
+        try:
+            return await job.future
+        except asyncio.CancelledError:
+            self.cancel(job)
+            raise
+
+    def cancel(self, job: FFmpegJob):
+        if job.cancelled:
+            return
+        job.cancelled = True
+        self.cancelled += 1
+        if job.process and job.process.returncode is None:
+            job.process.kill()
+            logger.info(f"Killed cancelled ffmpeg job (pid {job.process.pid})")
+        if not job.future.done():
+            job.future.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'slots': self.max_jobs,
+            'threads_per_job': self.threads_per_job,
+            'running': len(self.running),
+            'queued': self.queue.qsize(),
+            'completed': self.completed,
+            'failed': self.failed,
+            'cancelled': self.cancelled,
+            'avg_wait': sum(self.wait_times) / len(self.wait_times) if self.wait_times else 0.0,
+            'max_wait': max(self.wait_times, default=0.0),
+            'avg_encode': sum(self.encode_times) / len(self.encode_times) if self.encode_times else 0.0,
+            'max_encode': max(self.encode_times, default=0.0)
+        }
+
+    async def _kill(self, job: FFmpegJob):
+        if job.process and job.process.returncode is None:
+            job.process.kill()
+            await job.process.wait()
+
+    async def _communicate(self, job: FFmpegJob) -> bytes:
+        if not job.progress:
+            _, stderr = await job.process.communicate()
+            return stderr
+
+        async def read_progress():
+            async for line in job.process.stdout:
+                key, _, value = line.decode(errors='ignore').strip().partition('=')
+                if key == 'out_time_us' and value.isdigit():
+                    try:
+                        job.progress(int(value) / 1000000)
+                    except Exception as e:
+                        logger.debug(f"FFmpeg progress callback failed: {e}")
+
+        stderr, _ = await asyncio.gather(job.process.stderr.read(), read_progress())
+        await job.process.wait()
+        return stderr
+
+    async def _worker(self):
+        while True:
+            _, _, job = await self.queue.get()
+            if job.cancelled or job.future.done():
+                continue
+
+            job.started_at = time.monotonic()
+            self.wait_times.append(job.started_at - job.enqueued_at)
+            self.running.add(job)
+
+            try:
+                job.process = await asyncio.create_subprocess_exec(
+                    *job.cmd,
+                    stdin=asyncio.subprocess.DEVNULL,
+                    stdout=asyncio.subprocess.PIPE if job.progress else asyncio.subprocess.DEVNULL,
+                    stderr=asyncio.subprocess.PIPE
+                )
+                if job.cancelled:
+                    await self._kill(job)
+                    continue
+
+                stderr = await asyncio.wait_for(self._communicate(job), timeout=job.timeout)
+
+                if not job.future.done():
+                    job.future.set_result((job.process.returncode, stderr))
+                if job.process.returncode == 0:
+                    self.completed += 1
+                elif not job.cancelled:
+                    self.failed += 1
+            except asyncio.TimeoutError:
+                await self._kill(job)
+                self.failed += 1
+                if not job.future.done():
+                    job.future.set_exception(asyncio.TimeoutError())
+            except asyncio.CancelledError:
+                await self._kill(job)
+                if not job.future.done():
+                    job.future.cancel()
+                raise
+            except Exception as e:
+                self.failed += 1
+                if not job.future.done():
+                    job.future.set_exception(e)
+            finally:
+                self.running.discard(job)
+                elapsed = time.monotonic() - job.started_at
+                self.encode_times.append(elapsed)
+                logger.info(
+                    f"FFmpeg job finished in {elapsed:.1f}s after waiting {job.started_at - job.enqueued_at:.1f}s "
+                    f"(priority {job.priority}, {self.queue.qsize()} queued)"
+                )
+
+
+ffmpeg_scheduler = FFmpegScheduler()
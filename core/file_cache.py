@@ -0,0 +1,78 @@
+from datetime import datetime
+from typing import Optional, List, Dict, Any, Iterable
+from database.models import CachedFile
+from database.operations import (
+    get_cached_file, save_cached_file, record_cache_hit,
+    delete_cached_file, get_top_cached_files, count_cached_files
+)
+import logging
+
+logger = logging.getLogger(__name__)
+
+ROUTE_BOT = "bot"
+ROUTE_USERBOT = "userbot"
+
+
+class FileCache:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def variant(self, quality: str, size_limit: int) -> str:
+        return f"{quality}@{size_limit // (1024 * 1024)}M"
+
+    async def lookup(self, media_id: str, quality: str, routes: Iterable[str]) -> Optional[CachedFile]:
+        for route in routes:
+            try:
+                cached = await get_cached_file(media_id, quality, route)
+            except Exception as e:
+                logger.warning(f"File cache lookup failed for {media_id}: {e}")
+                cached = None
+
+            if cached:
+                self.hits += 1
+                try:
+                    await record_cache_hit(media_id, quality, route)
+                except Exception as e:
+                    logger.debug(f"Failed to record cache hit: {e}")
+                return cached
+
+        self.misses += 1
+        return None
+
+    async def store(self, media_id: str, quality: str, route: str, file_id: str, media_type: str, file_size: int = 0):
+        try:
+            await save_cached_file(CachedFile(
+                media_id=media_id,
+                quality=quality,
+                route=route,
+                file_id=file_id,
+                media_type=media_type,
+                file_size=file_size,
+                created_at=datetime.now()
+            ))
+        except Exception as e:
+            logger.warning(f"Failed to cache file_id for {media_id}: {e}")
+
+    async def invalidate(self, media_id: Optional[str] = None, quality: Optional[str] = None, route: Optional[str] = None) -> int:
+        removed = await delete_cached_file(media_id, quality, route)
+        self.invalidations += removed
+        logger.info(f"File cache invalidated {removed} entries (media={media_id}, quality={quality}, route={route})")
+        return removed
+
+    async def top(self, limit: int = 10) -> List[CachedFile]:
+        return await get_top_cached_files(limit)
+
+    async def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            'entries': await count_cached_files(),
+            'hits': self.hits,
+            'misses': self.misses,
+            'invalidations': self.invalidations,
+            'hit_rate': (self.hits / lookups * 100) if lookups else 0.0
+        }
+
+
+file_cache = FileCache()
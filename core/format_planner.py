@@ -0,0 +1,153 @@
+from dataclasses import dataclass
+from typing import Dict, Any, List, Optional
+from utils.constants import Quality
+import logging
+
+logger = logging.getLogger(__name__)
+
+FORMAT_KEYS = (
+    'format_id', 'ext', 'height', 'vcodec', 'acodec', 'filesize', 'filesize_approx', 'tbr', 'abr'
+)
+
+QUALITY_HEIGHTS = {
+    Quality.BEST: 1080,
+    Quality.HIGH: 720,
+    Quality.MEDIUM: 480,
+    Quality.LOW: 360
+}
+
+COMPATIBLE_VIDEO_EXTS = ('mp4',)
+COMPATIBLE_VIDEO_CODECS = ('avc1', 'h264')
+COMPATIBLE_AUDIO_EXTS = ('m4a', 'mp4')
+COPYABLE_AUDIO_CODECS = ('mp4a', 'opus')
+
+
+@dataclass
+class FormatPlan:
+    format_id: str
+    size: int
+    height: int = 0
+    ext: str = "mp4"
+    merged: bool = False
+    vcodec: str = ""
+
+    @property
+    def compatible(self) -> bool:
+        return self.ext in COMPATIBLE_VIDEO_EXTS and self.vcodec.startswith(COMPATIBLE_VIDEO_CODECS)
+
+    @property
+    def streamable(self) -> bool:
+        return bool(self.height) and not self.merged and self.ext in COMPATIBLE_VIDEO_EXTS
+
+
+def slim_formats(info: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [
+        {key: fmt.get(key) for key in FORMAT_KEYS}
+        for fmt in info.get('formats') or []
+        if fmt.get('format_id')
+    ]
+
+
+def estimate_format_size(fmt: Dict[str, Any], duration: float) -> int:
+    size = fmt.get('filesize') or fmt.get('filesize_approx')
+    if size:
+        return int(size)
+    if fmt.get('tbr') and duration:
+        return int(fmt['tbr'] * 125 * duration)
+    return 0
+
+
+def _has_video(fmt: Dict[str, Any]) -> bool:
+    return bool(fmt.get('height')) and fmt.get('vcodec') != 'none'
+
+
+def _has_audio(fmt: Dict[str, Any]) -> bool:
+    return fmt.get('acodec') not in (None, 'none')
+
+
+class FormatPlanner:
+    def candidates(self, formats: List[Dict[str, Any]], duration: float) -> List[FormatPlan]:
+        audio_only = [
+            fmt for fmt in formats
+            if _has_audio(fmt) and not _has_video(fmt) and estimate_format_size(fmt, duration)
+        ]
+        plans = []
+
+        for fmt in formats:
+            if not _has_video(fmt):
+                continue
+            size = estimate_format_size(fmt, duration)
+            if not size:
+                continue
+
+            if _has_audio(fmt):
+                plans.append(FormatPlan(fmt['format_id'], size, fmt['height'], fmt.get('ext') or 'mp4', vcodec=fmt.get('vcodec') or ''))
+                continue
+
+            audio = self._pick_audio(audio_only, fmt.get('ext'), duration)
+            if audio:
+                plans.append(FormatPlan(
+                    f"{fmt['format_id']}+{audio['format_id']}",
+                    size + estimate_format_size(audio, duration),
+                    fmt['height'],
+                    'mp4' if fmt.get('ext') in COMPATIBLE_VIDEO_EXTS else 'mkv',
+                    merged=True,
+                    vcodec=fmt.get('vcodec') or ''
+                ))
+
+        return plans
+
+    def plan(self, formats: List[Dict[str, Any]], duration: float, quality: Quality, size_limit: int) -> Optional[FormatPlan]:
+        if quality == Quality.AUDIO:
+            return self._plan_audio(formats, duration, size_limit)
+
+        max_height = QUALITY_HEIGHTS.get(quality)
+        fitting = [
+            plan for plan in self.candidates(formats, duration)
+            if plan.size <= size_limit and (max_height is None or plan.height <= max_height)
+        ]
+        if not fitting:
+            return None
+
+        return max(fitting, key=lambda plan: (plan.ext == 'mp4', plan.compatible, plan.height, not plan.merged, plan.size))
+
+    def options(self, formats: List[Dict[str, Any]], duration: float, size_limit: int) -> Dict[Quality, FormatPlan]:
+        options = {}
+        chosen = set()
+
+        for quality in (Quality.BEST, Quality.HIGH, Quality.MEDIUM, Quality.LOW, Quality.AUDIO):
+            plan = self.plan(formats, duration, quality, size_limit)
+            if plan and plan.format_id not in chosen:
+                options[quality] = plan
+                chosen.add(plan.format_id)
+
+        return options
+
+    def _pick_audio(self, audio_only: List[Dict[str, Any]], video_ext: Optional[str], duration: float) -> Optional[Dict[str, Any]]:
+        if not audio_only:
+            return None
+
+        compatible = COMPATIBLE_AUDIO_EXTS if video_ext in COMPATIBLE_VIDEO_EXTS else ('webm',)
+        return max(audio_only, key=lambda fmt: (
+            fmt.get('ext') in compatible,
+            fmt.get('abr') or fmt.get('tbr') or 0,
+            -estimate_format_size(fmt, duration)
+        ))
+
+    def _plan_audio(self, formats: List[Dict[str, Any]], duration: float, size_limit: int) -> Optional[FormatPlan]:
+        fitting = [
+            fmt for fmt in formats
+            if _has_audio(fmt) and not _has_video(fmt) and 0 < estimate_format_size(fmt, duration) <= size_limit
+        ]
+        if not fitting:
+            return None
+
+        best = max(fitting, key=lambda fmt: (
+            str(fmt.get('acodec') or '').startswith(COPYABLE_AUDIO_CODECS),
+            fmt.get('ext') in COMPATIBLE_AUDIO_EXTS,
+            fmt.get('abr') or fmt.get('tbr') or 0
+        ))
+        return FormatPlan(best['format_id'], estimate_format_size(best, duration), 0, best.get('ext') or 'm4a')
+
+
+format_planner = FormatPlanner()
@@ -0,0 +1,104 @@
+import asyncio
+from datetime import datetime
+from typing import Dict, Any, Callable, Awaitable, List, Optional
+from database.models import Download
+from database.operations import (
+    add_download, claim_next_download, requeue_interrupted_downloads, count_pending_downloads,
+    update_download_status
+)
+from core.write_buffer import write_buffer
+from core.live_stats import live_stats
+from utils.constants import DownloadStatus, CONCURRENT_DOWNLOADS, QUEUE_POLL_INTERVAL
+import logging
+
+logger = logging.getLogger(__name__)
+
+JobHandler = Callable[[Download, Dict[str, Any]], Awaitable[bool]]
+
+
+class DownloadQueue:
+    def __init__(self, handler: JobHandler, workers: int = CONCURRENT_DOWNLOADS):
+        self.handler = handler
+        self.worker_count = max(1, workers)
+        self.workers: List[asyncio.Task] = []
+        self.contexts: Dict[int, Dict[str, Any]] = {}
+        self.wakeup = asyncio.Event()
+        self.claim_lock = asyncio.Lock()
+        self.active_jobs = 0
+
+    async def start(self):
+        resumed, abandoned = await requeue_interrupted_downloads()
+        if resumed:
+            logger.info(f"Resuming {resumed} interrupted download jobs")
+        if abandoned:
+            logger.warning(f"Marked {abandoned} jobs interrupted during processing or upload as failed")
+
+        for index in range(self.worker_count):
+            self.workers.append(asyncio.create_task(self._worker(index)))
+        logger.info(f"Download queue started with {self.worker_count} workers")
+
+    async def stop(self):
+        for worker in self.workers:
+            worker.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers.clear()
+
+    async def enqueue(self, download: Download, context: Optional[Dict[str, Any]] = None) -> int:
+        download.status = DownloadStatus.PENDING
+        download.created_at = download.created_at or datetime.now()
+
+        async with self.claim_lock:
+            job_id = await add_download(download)
+            live_stats.record_download(download.user_id, download.platform)
+            if context:
+                self.contexts[job_id] = context
+
+        self.wakeup.set()
+        return job_id
+
+    async def depth(self) -> int:
+        return await count_pending_downloads()
+
+    async def _worker(self, index: int):
+        while True:
+            try:
+                async with self.claim_lock:
+                    job = await claim_next_download()
+            except Exception as e:
+                logger.error(f"Queue worker {index} failed to claim a job: {e}")
+                job = None
+
+            if not job:
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), timeout=QUEUE_POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+                self.wakeup.clear()
+                continue
+
+            await self._run(job)
+
+    async def _run(self, job: Download):
+        context = self.contexts.pop(job.id, {})
+        error_message = None
+        self.active_jobs += 1
+
+        try:
+            success = await self.handler(job, context)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Download job {job.id} failed: {e}")
+            success = False
+            error_message = str(e)[:500]
+        finally:
+            self.active_jobs -= 1
+
+        status = DownloadStatus.COMPLETED if success else DownloadStatus.FAILED
+        try:
+            await update_download_status(job.id, status.value, datetime.now(), error_message)
+        except Exception as e:
+            logger.error(f"Failed to record final status of download job {job.id}: {e}")
+        live_stats.record_result(status)
+        if success:
+            write_buffer.record_completed_download(job.user_id)
@@ -0,0 +1,158 @@
+import asyncio
+from datetime import datetime, timedelta
+from typing import Dict, Any, Optional, Set
+from database.operations import (
+    rollup_analytics, get_last_analytics_date, get_analytics_range, get_download_activity, get_user_counts
+)
+from core.write_buffer import write_buffer
+from utils.constants import Platform, DownloadStatus, ANALYTICS_ROLLUP_INTERVAL
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class LiveStats:
+    def __init__(self, rollup_interval: float = ANALYTICS_ROLLUP_INTERVAL):
+        self.rollup_interval = rollup_interval
+        self.day = datetime.now().date()
+        self.past: Dict[str, Any] = self._empty_downloads()
+        self.today: Dict[str, Any] = self._empty_downloads()
+        self.today_users: Set[int] = set()
+        self.users = {'total': 0, 'active': 0, 'new_today': 0}
+        self.rollups = 0
+        self.last_rollup: Optional[datetime] = None
+        self.task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        await self.rollup()
+        if self.task is None:
+            self.task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+
+    async def rollup(self):
+        await write_buffer.flush()
+        today = self._today()
+        start = await get_last_analytics_date()
+        days = await rollup_analytics(start, today + timedelta(days=1))
+        self.rollups += 1
+        self.last_rollup = datetime.now()
+        logger.info(f"Analytics rollup updated {days} days since {start.date() if start else 'the beginning'}")
+        await self.load()
+
+    async def load(self):
+        today = self._today()
+        past = self._empty_downloads()
+        for row in await get_analytics_range(datetime(1970, 1, 1), today):
+            past['total'] += row.total_downloads
+            past['successful'] += row.successful_downloads
+            past['failed'] += row.failed_downloads
+            past['platforms'][Platform.YOUTUBE.value] += row.youtube_downloads
+            past['platforms'][Platform.INSTAGRAM.value] += row.instagram_downloads
+        past['platforms'][Platform.UNKNOWN.value] = (
+            past['total'] - past['platforms'][Platform.YOUTUBE.value] - past['platforms'][Platform.INSTAGRAM.value]
+        )
+
+        current = self._empty_downloads()
+        users: Set[int] = set()
+        for user_id, platform, status in await get_download_activity(today, today + timedelta(days=1)):
+            self._count_download(current, platform)
+            self._count_result(current, status)
+            users.add(user_id)
+
+        total, active, new_today = await get_user_counts(today)
+
+        self.day = today.date()
+        self.past = past
+        self.today = current
+        self.today_users = users
+        self.users = {'total': total, 'active': active, 'new_today': new_today}
+
+    def record_user(self):
+        self._roll_day()
+        self.users['total'] += 1
+        self.users['active'] += 1
+        self.users['new_today'] += 1
+
+    def record_deactivated(self, count: int):
+        self.users['active'] = max(0, self.users['active'] - count)
+
+    def record_download(self, user_id: int, platform: Platform):
+        self._roll_day()
+        self._count_download(self.today, platform.value)
+        self.today_users.add(user_id)
+
+    def record_result(self, status: DownloadStatus):
+        self._roll_day()
+        self._count_result(self.today, status.value)
+
+    def user_stats(self) -> Dict[str, int]:
+        self._roll_day()
+        return dict(self.users)
+
+    def download_stats(self) -> Dict[str, Any]:
+        self._roll_day()
+        platforms = {
+            platform: self.past['platforms'][platform] + self.today['platforms'][platform]
+            for platform in self.past['platforms']
+        }
+        return {
+            'total': self.past['total'] + self.today['total'],
+            'successful': self.past['successful'] + self.today['successful'],
+            'failed': self.past['failed'] + self.today['failed'],
+            'today': self.today['total'],
+            'today_users': len(self.today_users),
+            'platforms': {platform: count for platform, count in platforms.items() if count}
+        }
+
+    def _roll_day(self):
+        today = datetime.now().date()
+        if today == self.day:
+            return
+
+        for key in ('total', 'successful', 'failed'):
+            self.past[key] += self.today[key]
+        for platform, count in self.today['platforms'].items():
+            self.past['platforms'][platform] += count
+        self.today = self._empty_downloads()
+        self.today_users = set()
+        self.users['new_today'] = 0
+        self.day = today
+
+    def _count_download(self, counters: Dict[str, Any], platform: str):
+        counters['total'] += 1
+        if platform not in counters['platforms']:
+            platform = Platform.UNKNOWN.value
+        counters['platforms'][platform] += 1
+
+    def _count_result(self, counters: Dict[str, Any], status: str):
+        if status == DownloadStatus.COMPLETED.value:
+            counters['successful'] += 1
+        elif status == DownloadStatus.FAILED.value:
+            counters['failed'] += 1
+
+    def _empty_downloads(self) -> Dict[str, Any]:
+        return {
+            'total': 0,
+            'successful': 0,
+            'failed': 0,
+            'platforms': {platform.value: 0 for platform in Platform}
+        }
+
+    def _today(self) -> datetime:
+        return datetime.combine(datetime.now().date(), datetime.min.time())
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.rollup_interval)
+            try:
+                await self.rollup()
+            except Exception as e:
+                logger.error(f"Analytics rollup failed: {e}")
+
+
+live_stats = LiveStats()
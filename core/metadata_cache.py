@@ -0,0 +1,85 @@
+import json
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+from utils.constants import Platform, METADATA_CACHE_SIZE, METADATA_CACHE_TTL, METADATA_CACHE_PERSIST
+from database.operations import get_cached_metadata, save_cached_metadata, delete_expired_metadata
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class MetadataCache:
+    def __init__(self, max_entries: int = METADATA_CACHE_SIZE, persist: bool = METADATA_CACHE_PERSIST):
+        self.max_entries = max_entries
+        self.persist = persist
+        self.entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+
+        entry = self.entries.get(key)
+        if entry:
+            expires_at, value = entry
+            if expires_at > now:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return value
+            del self.entries[key]
+
+        if self.persist:
+            try:
+                row = await get_cached_metadata(key)
+            except Exception as e:
+                logger.debug(f"Metadata cache read failed for {key}: {e}")
+                row = None
+
+            if row and row[1] > now:
+                value = json.loads(row[0])
+                self._remember(key, row[1], value)
+                self.hits += 1
+                return value
+
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, platform: Platform, value: Dict[str, Any]):
+        expires_at = time.time() + METADATA_CACHE_TTL.get(platform, METADATA_CACHE_TTL[Platform.UNKNOWN])
+        self._remember(key, expires_at, value)
+
+        if self.persist:
+            try:
+                await save_cached_metadata(key, platform.value, json.dumps(value, ensure_ascii=False), expires_at)
+            except Exception as e:
+                logger.debug(f"Metadata cache write failed for {key}: {e}")
+
+    async def purge_expired(self) -> int:
+        now = time.time()
+        expired = [key for key, (expires_at, _) in self.entries.items() if expires_at <= now]
+        for key in expired:
+            del self.entries[key]
+
+        removed = len(expired)
+        if self.persist:
+            removed += await delete_expired_metadata(now)
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self.entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': (self.hits / lookups * 100) if lookups else 0.0
+        }
+
+    def _remember(self, key: str, expires_at: float, value: Dict[str, Any]):
+        self.entries[key] = (expires_at, value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+
+metadata_cache = MetadataCache()
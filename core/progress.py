@@ -0,0 +1,92 @@
+import time
+import asyncio
+from typing import Dict, Callable, Awaitable, List, Optional, Tuple
+from utils.constants import PROGRESS_UPDATE_INTERVAL
+import logging
+
+logger = logging.getLogger(__name__)
+
+STAGE_DOWNLOAD = "download"
+STAGE_COMPRESS = "compress"
+STAGE_UPLOAD = "upload"
+STAGE_BROADCAST = "broadcast"
+
+Renderer = Callable[[str, float], Awaitable[None]]
+
+
+class ProgressBus:
+    def __init__(self, interval: float = PROGRESS_UPDATE_INTERVAL):
+        self.interval = interval
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.renderers: Dict[str, List[Renderer]] = {}
+        self.latest: Dict[str, Tuple[str, float]] = {}
+        self.last_render: Dict[str, float] = {}
+        self.pending: Dict[str, asyncio.TimerHandle] = {}
+        self.rendering: Dict[str, asyncio.Task] = {}
+
+    def subscribe(self, key: str, renderer: Renderer):
+        self.loop = asyncio.get_running_loop()
+        self.renderers.setdefault(key, []).append(renderer)
+
+    def unsubscribe(self, key: str, renderer: Renderer):
+        renderers = self.renderers.get(key)
+        if renderers and renderer in renderers:
+            renderers.remove(renderer)
+        if not renderers:
+            self.close(key)
+
+    def close(self, key: str):
+        self.renderers.pop(key, None)
+        self.latest.pop(key, None)
+        self.last_render.pop(key, None)
+        handle = self.pending.pop(key, None)
+        if handle:
+            handle.cancel()
+
+    def publish(self, key: str, stage: str, percent: float):
+        if self.loop is None or self.loop.is_closed():
+            return
+        self.loop.call_soon_threadsafe(self._update, key, stage, max(0.0, min(percent, 100.0)))
+
+    def reporter(self, key: str, stage: str) -> Callable[..., None]:
+        def report(current: float, total: float = 100, *args):
+            if total:
+                self.publish(key, stage, current * 100 / total)
+        return report
+
+    def _update(self, key: str, stage: str, percent: float):
+        if key not in self.renderers:
+            return
+
+        self.latest[key] = (stage, percent)
+        if key in self.pending or key in self.rendering:
+            return
+
+        delay = self.last_render.get(key, 0) + self.interval - time.monotonic()
+        self.pending[key] = self.loop.call_later(max(0.0, delay), self._flush, key)
+
+    def _flush(self, key: str):
+        self.pending.pop(key, None)
+        state = self.latest.pop(key, None)
+        if state is None or key not in self.renderers:
+            return
+
+        self.last_render[key] = time.monotonic()
+        task = self.loop.create_task(self._render(key, *state))
+        self.rendering[key] = task
+
+    async def _render(self, key: str, stage: str, percent: float):
+        try:
+            for renderer in list(self.renderers.get(key, [])):
+                try:
+                    await renderer(stage, percent)
+                except Exception as e:
+                    logger.debug(f"Progress renderer for {key} failed: {e}")
+        finally:
+            self.rendering.pop(key, None)
+            if key in self.latest and key not in self.pending:
+                delay = self.last_render.get(key, 0) + self.interval - time.monotonic()
+                self.pending[key] = self.loop.call_later(max(0.0, delay), self._flush, key)
+
+
+progress_bus = ProgressBus()
@@ -1,10 +1,16 @@
 import os
-from typing import Optional
+from typing import Optional, Tuple, Any
 from aiogram import Bot
 from aiogram.types import FSInputFile
-from pyrogram import Client
+from pyrogram import Client, raw, types as pyrogram_types, utils as pyrogram_utils
+from pyrogram.errors import FilePartMissing
 from utils.constants import BOT_FILE_LIMIT, USER_BOT_FILE_LIMIT, API_ID, API_HASH, SESSION_NAME
-from utils.helpers import get_file_size, cleanup_file
+from utils.helpers import get_file_size
+from core.file_cache import file_cache, ROUTE_BOT, ROUTE_USERBOT
+from core.artifacts import artifacts
+from core.stream_upload import StreamingUpload
+from core.format_planner import FormatPlan
+from core.transcode import transcoder
 import logging
 import asyncio
 
@@ -38,52 +44,123 @@ class FileRouter:
         chat_id: int,
         file_path: str,
         caption: str = "",
-        progress_callback: Optional[callable] = None
+        progress_callback: Optional[callable] = None,
+        cache_key: Optional[Tuple[str, str, int]] = None,
+        stream_upload: Optional[StreamingUpload] = None
     ) -> bool:
         try:
             file_size = await get_file_size(file_path)
 
+            if stream_upload and progress_callback:
+                stream_upload.progress = progress_callback
+
             if file_size <= BOT_FILE_LIMIT:
-                return await self._send_via_bot(chat_id, file_path, caption)
+                route = ROUTE_BOT
+                message = await self._send_via_bot(chat_id, file_path, caption)
             elif file_size <= USER_BOT_FILE_LIMIT and self.userbot:
-                return await self._send_via_userbot(chat_id, file_path, caption, progress_callback)
+                route = ROUTE_USERBOT
+                message = await self._send_via_userbot(chat_id, file_path, caption, progress_callback, stream_upload)
             else:
                 logger.error(f"File too large: {file_size}")
                 return False
 
+            if message is None:
+                return False
+
+            if cache_key:
+                sent_file = self._extract_sent_file(message)
+                if sent_file:
+                    media_id, quality, size_limit = cache_key
+                    await file_cache.store(media_id, file_cache.variant(quality, size_limit), route, sent_file[0], sent_file[1], file_size)
+
+            return True
+
         except Exception as e:
             logger.error(f"Error sending file: {e}")
             return False
         finally:
-            asyncio.create_task(cleanup_file(file_path))
+            if stream_upload:
+                stream_upload.abort()
+            try:
+                await artifacts.release(file_path)
+            except Exception as e:
+                logger.error(f"Failed to release {file_path}: {e}")
+
+    def size_limit(self) -> int:
+        return USER_BOT_FILE_LIMIT if self.userbot and self.userbot_connected else BOT_FILE_LIMIT
+
+    def create_stream_upload(self, plan: Optional[FormatPlan]) -> Optional[StreamingUpload]:
+        if not plan or not plan.streamable:
+            return None
+        if self.userbot and self.userbot_connected:
+            return StreamingUpload(self.userbot, BOT_FILE_LIMIT)
+        return None
+
+    async def send_cached(self, chat_id: int, media_id: str, quality: str, caption: str = "") -> bool:
+        routes = [ROUTE_BOT]
+        if self.userbot:
+            routes.append(ROUTE_USERBOT)
+
+        variant = file_cache.variant(quality, self.size_limit())
+        cached = await file_cache.lookup(media_id, variant, routes)
+        if not cached:
+            return False
+
+        try:
+            if cached.route == ROUTE_USERBOT:
+                if not await self._ensure_userbot_connected():
+                    return False
+                sender = self.userbot
+            else:
+                sender = self.bot
+
+            if cached.media_type == 'video':
+                await sender.send_video(chat_id=chat_id, video=cached.file_id, caption=caption, supports_streaming=True)
+            elif cached.media_type == 'audio':
+                await sender.send_audio(chat_id=chat_id, audio=cached.file_id, caption=caption)
+            else:
+                await sender.send_document(chat_id=chat_id, document=cached.file_id, caption=caption)
+
+            logger.info(f"Served {media_id} ({quality}) from file_id cache via {cached.route}")
+            return True
+        except Exception as e:
+            logger.warning(f"Cached file_id for {media_id} rejected, invalidating: {e}")
+            await file_cache.invalidate(media_id, variant, cached.route)
+            return False
+
+    def _extract_sent_file(self, message: Any) -> Optional[Tuple[str, str]]:
+        for media_type in ('video', 'audio', 'document', 'animation'):
+            media = getattr(message, media_type, None)
+            if media and getattr(media, 'file_id', None):
+                return media.file_id, 'video' if media_type == 'animation' else media_type
+        return None
 
-    async def _send_via_bot(self, chat_id: int, file_path: str, caption: str) -> bool:
+    async def _send_via_bot(self, chat_id: int, file_path: str, caption: str) -> Optional[Any]:
         try:
             input_file = FSInputFile(file_path)
 
             if file_path.endswith(('.mp4', '.avi', '.mkv', '.mov', '.webm')):
-                await self.bot.send_video(
+                return await self.bot.send_video(
                     chat_id=chat_id,
                     video=input_file,
                     caption=caption,
                     supports_streaming=True
                 )
-            elif file_path.endswith(('.mp3', '.wav', '.m4a', '.aac')):
-                await self.bot.send_audio(
+            elif file_path.endswith(('.mp3', '.wav', '.m4a', '.aac', '.opus', '.ogg')):
+                return await self.bot.send_audio(
                     chat_id=chat_id,
                     audio=input_file,
                     caption=caption
                 )
             else:
-                await self.bot.send_document(
+                return await self.bot.send_document(
                     chat_id=chat_id,
                     document=input_file,
                     caption=caption
                 )
-            return True
         except Exception as e:
             logger.error(f"Bot send error: {e}")
-            return False
+            return None
 
     async def _ensure_userbot_connected(self):
         async with self.connection_lock:
@@ -102,14 +179,23 @@ class FileRouter:
         chat_id: int,
         file_path: str,
         caption: str,
-        progress_callback: Optional[callable] = None
-    ) -> bool:
+        progress_callback: Optional[callable] = None,
+        stream_upload: Optional[StreamingUpload] = None
+    ) -> Optional[Any]:
         if not await self._ensure_userbot_connected():
-            return False
+            return None
+
+        if stream_upload:
+            input_file = await stream_upload.result(file_path)
+            if input_file:
+                try:
+                    return await self._send_uploaded_via_userbot(chat_id, file_path, input_file, caption)
+                except Exception as e:
+                    logger.warning(f"Sending streamed upload failed, retrying with whole-file upload: {e}")
 
         try:
             if file_path.endswith(('.mp4', '.avi', '.mkv', '.mov', '.webm')):
-                await self.userbot.send_video(
+                return await self.userbot.send_video(
                     chat_id=chat_id,
                     video=file_path,
                     caption=caption,
@@ -117,28 +203,71 @@ class FileRouter:
                     supports_streaming=True,
                     thumb=None
                 )
-            elif file_path.endswith(('.mp3', '.wav', '.m4a', '.aac')):
-                await self.userbot.send_audio(
+            elif file_path.endswith(('.mp3', '.wav', '.m4a', '.aac', '.opus', '.ogg')):
+                return await self.userbot.send_audio(
                     chat_id=chat_id,
                     audio=file_path,
                     caption=caption,
                     progress=progress_callback
                 )
             else:
-                await self.userbot.send_document(
+                return await self.userbot.send_document(
                     chat_id=chat_id,
                     document=file_path,
                     caption=caption,
                     progress=progress_callback
                 )
-
-            return True
         except Exception as e:
             logger.error(f"Userbot send error: {e}")
             if "Client is already connected" in str(e):
                 self.userbot_connected = True
                 return await self._send_via_userbot(chat_id, file_path, caption, progress_callback)
-            return False
+            return None
+
+    async def _send_uploaded_via_userbot(self, chat_id: int, file_path: str, input_file: Any, caption: str) -> Optional[Any]:
+        file_name = os.path.basename(file_path)
+        mime_type = self.userbot.guess_mime_type(file_path) or "application/octet-stream"
+        attributes = [raw.types.DocumentAttributeFilename(file_name=file_name)]
+
+        duration, width, height = 0, 0, 0
+        try:
+            probe = await transcoder.probe(file_path)
+            duration = int(probe.duration)
+            if probe.video:
+                width = int(probe.video[0].get('width') or 0)
+                height = int(probe.video[0].get('height') or 0)
+        except Exception as e:
+            logger.warning(f"Probe failed for streamed upload {file_path}, sending without dimensions: {e}")
+
+        if file_path.endswith(('.mp4', '.avi', '.mkv', '.mov', '.webm')):
+            attributes.insert(0, raw.types.DocumentAttributeVideo(supports_streaming=True, duration=duration, w=width, h=height))
+        elif file_path.endswith(('.mp3', '.wav', '.m4a', '.aac', '.opus', '.ogg')):
+            attributes.insert(0, raw.types.DocumentAttributeAudio(duration=duration))
+
+        media = raw.types.InputMediaUploadedDocument(mime_type=mime_type, file=input_file, attributes=attributes)
+
+        while True:
+            try:
+                r = await self.userbot.invoke(
+                    raw.functions.messages.SendMedia(
+                        peer=await self.userbot.resolve_peer(chat_id),
+                        media=media,
+                        random_id=self.userbot.rnd_id(),
+                        **await pyrogram_utils.parse_text_entities(self.userbot, caption, None, None)
+                    )
+                )
+            except FilePartMissing as e:
+                logger.info(f"Re-uploading missing part {e.value} of {file_name}")
+                await self.userbot.save_file(file_path, file_id=input_file.id, file_part=e.value)
+            else:
+                for update in r.updates:
+                    if isinstance(update, (raw.types.UpdateNewMessage, raw.types.UpdateNewChannelMessage)):
+                        return await pyrogram_types.Message._parse(
+                            self.userbot, update.message,
+                            {i.id: i for i in r.users},
+                            {i.id: i for i in r.chats}
+                        )
+                return None
 
     async def start_userbot(self):
         if self.userbot and not self.userbot_connected:
@@ -0,0 +1,261 @@
+import time
+import asyncio
+from collections import deque
+from contextvars import ContextVar
+from typing import Dict, Any, Deque, Optional, Set, Tuple
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import (
+    TelegramMethod, EditMessageText, EditMessageCaption, EditMessageReplyMarkup, EditMessageMedia,
+    SendVideo, SendAudio, SendDocument, SendPhoto, SendAnimation, SendVoice, SendMediaGroup,
+    SendMessage, SendSticker, SendVideoNote, SendLocation, SendVenue, SendContact, SendPoll, SendDice,
+    CopyMessage, CopyMessages, ForwardMessage, ForwardMessages
+)
+from utils.constants import SEND_GLOBAL_RATE, SEND_CHAT_RATE, SEND_CHAT_BURST, SEND_MAX_RETRIES
+import logging
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_FILE = 0
+PRIORITY_REPLY = 1
+PRIORITY_PROGRESS = 2
+PRIORITY_BROADCAST = 3
+
+CHAT_BUCKET_LIMIT = 10000
+GLOBAL_FLOOD_WINDOW = 1.0
+
+FILE_METHODS = (
+    SendVideo, SendAudio, SendDocument, SendPhoto, SendAnimation, SendVoice, SendMediaGroup,
+    CopyMessage, ForwardMessage
+)
+EDIT_METHODS = (EditMessageText, EditMessageCaption, EditMessageReplyMarkup, EditMessageMedia)
+CHAT_LIMITED_METHODS = FILE_METHODS + EDIT_METHODS + (
+    SendMessage, SendSticker, SendVideoNote, SendLocation, SendVenue, SendContact, SendPoll, SendDice,
+    CopyMessages, ForwardMessages
+)
+
+send_priority: ContextVar[Optional[int]] = ContextVar('send_priority', default=None)
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def delay(self, now: float) -> float:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def consume(self):
+        self.tokens -= 1
+
+    def block(self, seconds: float):
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+
+class QueuedRequest:
+    def __init__(self, make_request: NextRequestMiddlewareType, bot: Bot, method: TelegramMethod, chat_id: Any, priority: int):
+        self.make_request = make_request
+        self.bot = bot
+        self.method = method
+        self.chat_id = chat_id
+        self.priority = priority
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self.attempts = 0
+
+
+class SendScheduler(BaseRequestMiddleware):
+    def __init__(self, rate: float = SEND_GLOBAL_RATE, chat_rate: float = SEND_CHAT_RATE, chat_burst: int = SEND_CHAT_BURST):
+        self.global_bucket = TokenBucket(rate, rate)
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.chat_buckets: Dict[Any, TokenBucket] = {}
+        self.queues: Dict[int, Deque[QueuedRequest]] = {
+            priority: deque() for priority in (PRIORITY_FILE, PRIORITY_REPLY, PRIORITY_PROGRESS, PRIORITY_BROADCAST)
+        }
+        self.pending_edits: Dict[Tuple[Any, Any], QueuedRequest] = {}
+        self.wakeup = asyncio.Event()
+        self.dispatcher: Optional[asyncio.Task] = None
+        self.executing: Set[asyncio.Task] = set()
+        self.sent = 0
+        self.superseded = 0
+        self.flood_waits = 0
+        self.last_flood: Tuple[Any, float] = (None, 0.0)
+
+    async def __call__(self, make_request: NextRequestMiddlewareType, bot: Bot, method: TelegramMethod) -> Any:
+        chat_id = getattr(method, 'chat_id', None)
+        if chat_id is None:
+            return await make_request(bot, method)
+
+        if not isinstance(method, CHAT_LIMITED_METHODS):
+            chat_id = None
+
+        request = QueuedRequest(make_request, bot, method, chat_id, self._classify(method))
+
+        if isinstance(method, EDIT_METHODS):
+            edit_key = (chat_id, getattr(method, 'message_id', None))
+            previous = self.pending_edits.get(edit_key)
+            if previous and not previous.future.done():
+                self.superseded += 1
+                previous.future.set_result(True)
+            self.pending_edits[edit_key] = request
+
+        self.queues[request.priority].append(request)
+        self._ensure_dispatcher()
+        self.wakeup.set()
+
+        return await request.future
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'queued': sum(len(queue) for queue in self.queues.values()),
+            'queued_by_priority': {priority: len(queue) for priority, queue in self.queues.items()},
+            'sent': self.sent,
+            'superseded': self.superseded,
+            'flood_waits': self.flood_waits
+        }
+
+    async def stop(self):
+        if self.dispatcher:
+            self.dispatcher.cancel()
+            await asyncio.gather(self.dispatcher, return_exceptions=True)
+            self.dispatcher = None
+
+        for task in self.executing:
+            task.cancel()
+        await asyncio.gather(*self.executing, return_exceptions=True)
+        self.executing.clear()
+
+    def _classify(self, method: TelegramMethod) -> int:
+        priority = send_priority.get()
+        if priority is not None:
+            return priority
+        if isinstance(method, FILE_METHODS):
+            return PRIORITY_FILE
+        if isinstance(method, EDIT_METHODS):
+            return PRIORITY_PROGRESS
+        return PRIORITY_REPLY
+
+    def _ensure_dispatcher(self):
+        if self.dispatcher is None or self.dispatcher.done():
+            self.dispatcher = asyncio.create_task(self._dispatch())
+
+    def _chat_bucket(self, chat_id: Any) -> TokenBucket:
+        bucket = self.chat_buckets.get(chat_id)
+        if bucket is None:
+            if len(self.chat_buckets) >= CHAT_BUCKET_LIMIT:
+                self._prune_buckets()
+            bucket = self.chat_buckets[chat_id] = TokenBucket(self.chat_rate, self.chat_burst)
+        return bucket
+
+    def _prune_buckets(self):
+        now = time.monotonic()
+        for chat_id, bucket in list(self.chat_buckets.items()):
+            if bucket.delay(now) == 0 and bucket.tokens >= bucket.capacity:
+                del self.chat_buckets[chat_id]
+
+    def _pick(self) -> Tuple[Optional[QueuedRequest], Optional[float]]:
+        now = time.monotonic()
+        global_delay = self.global_bucket.delay(now)
+        wait = None
+
+        for priority in sorted(self.queues):
+            queue = self.queues[priority]
+            for request in list(queue):
+                if request.future.done():
+                    queue.remove(request)
+                    continue
+
+                if global_delay > 0:
+                    return None, global_delay
+
+                delay = self._chat_bucket(request.chat_id).delay(now) if request.chat_id is not None else 0.0
+                if delay == 0:
+                    queue.remove(request)
+                    return request, None
+                wait = delay if wait is None else min(wait, delay)
+
+        return None, wait
+
+    async def _dispatch(self):
+        while True:
+            request, wait = self._pick()
+            if request is None:
+                self.wakeup.clear()
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), timeout=wait)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            self.global_bucket.consume()
+            if request.chat_id is not None:
+                self._chat_bucket(request.chat_id).consume()
+            task = asyncio.create_task(self._execute(request))
+            self.executing.add(task)
+            task.add_done_callback(self.executing.discard)
+
+    async def _execute(self, request: QueuedRequest):
+        if request.future.done():
+            return
+
+        try:
+            response = await request.make_request(request.bot, request.method)
+        except asyncio.CancelledError:
+            if not request.future.done():
+                request.future.cancel()
+            raise
+        except TelegramRetryAfter as e:
+            self.flood_waits += 1
+            request.attempts += 1
+            self._block(request.chat_id, e.retry_after)
+            logger.warning(f"Flood wait {e.retry_after}s for chat {request.chat_id} (attempt {request.attempts})")
+
+            if request.attempts > SEND_MAX_RETRIES:
+                self._finish(request, error=e)
+                return
+
+            self.queues[request.priority].appendleft(request)
+            self.wakeup.set()
+            return
+        except Exception as e:
+            self._finish(request, error=e)
+            return
+
+        self.sent += 1
+        self._finish(request, response=response)
+
+    def _block(self, chat_id: Any, seconds: float):
+        now = time.monotonic()
+        previous_chat, previous_time = self.last_flood
+        self.last_flood = (chat_id, now)
+
+        if chat_id is not None:
+            self._chat_bucket(chat_id).block(seconds)
+        if chat_id is None or (previous_chat != chat_id and now - previous_time < GLOBAL_FLOOD_WINDOW):
+            self.global_bucket.block(seconds)
+
+    def _finish(self, request: QueuedRequest, response: Any = None, error: Optional[Exception] = None):
+        if isinstance(request.method, EDIT_METHODS):
+            edit_key = (request.chat_id, getattr(request.method, 'message_id', None))
+            if self.pending_edits.get(edit_key) is request:
+                del self.pending_edits[edit_key]
+
+        if request.future.done():
+            return
+        if error is not None:
+            request.future.set_exception(error)
+        else:
+            request.future.set_result(response)
+
+
+send_scheduler = SendScheduler()
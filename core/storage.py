@@ -0,0 +1,212 @@
+import os
+import time
+import shutil
+import asyncio
+from typing import Dict, Any, List, Tuple, Optional
+from utils.constants import (
+    TEMP_DIR, TEMP_DIR_QUOTA, TEMP_HIGH_WATER_MARK, STORAGE_WAIT_TIMEOUT,
+    STORAGE_SWEEP_INTERVAL, ORPHAN_MAX_AGE, EVICTION_MIN_AGE
+)
+from utils.helpers import cleanup_file, cleanup_workspace
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def _entry_size(path: str) -> int:
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+def _scan_entries(directory: str) -> List[Tuple[str, int, float]]:
+    entries = []
+    try:
+        with os.scandir(directory) as iterator:
+            for entry in iterator:
+                try:
+                    last_used = entry.stat().st_mtime
+                    entries.append((entry.path, _entry_size(entry.path), last_used))
+                except OSError:
+                    continue
+    except FileNotFoundError:
+        pass
+    return entries
+
+
+class StorageManager:
+    def __init__(self, directory: str = TEMP_DIR, quota: int = TEMP_DIR_QUOTA, high_water_mark: float = TEMP_HIGH_WATER_MARK):
+        self.directory = directory
+        self.quota = quota
+        self.high_water_mark = high_water_mark
+        self.reservations: Dict[str, int] = {}
+        self.entries: Dict[str, Tuple[int, float]] = {}
+        self.used_bytes = 0
+        self.condition = asyncio.Condition()
+        self.sweeper: Optional[asyncio.Task] = None
+
+    @property
+    def limit(self) -> int:
+        return int(self.quota * self.high_water_mark)
+
+    @property
+    def reserved_bytes(self) -> int:
+        return sum(self.reservations.values())
+
+    async def start(self):
+        await self.sweep_orphans()
+        self.sweeper = asyncio.create_task(self._sweep_loop())
+
+    async def stop(self):
+        if self.sweeper:
+            self.sweeper.cancel()
+            await asyncio.gather(self.sweeper, return_exceptions=True)
+            self.sweeper = None
+
+    async def reserve(self, key: str, size: int, timeout: float = STORAGE_WAIT_TIMEOUT):
+        if size > self.limit:
+            raise Exception("No space left in temp storage for a file of this size")
+
+        key = os.path.abspath(key)
+        deadline = time.monotonic() + timeout
+
+        async with self.condition:
+            while not await self._fits(size):
+                await self.evict(size)
+                if await self._fits(size):
+                    break
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise Exception("No space left in temp storage")
+
+                logger.info(f"Waiting for {size} bytes of temp storage ({self.used_bytes + self.reserved_bytes}/{self.limit} in use)")
+                try:
+                    await asyncio.wait_for(self.condition.wait(), timeout=min(remaining, STORAGE_SWEEP_INTERVAL))
+                except asyncio.TimeoutError:
+                    pass
+
+            self.reservations[key] = self.reservations.get(key, 0) + size
+
+    async def release(self, key: str):
+        key = os.path.abspath(key)
+        if self.reservations.pop(key, None) is None:
+            return
+
+        size = await asyncio.to_thread(_entry_size, key) if os.path.exists(key) else 0
+        if size:
+            self._track(key, size, time.time())
+
+        async with self.condition:
+            self.condition.notify_all()
+
+    async def evict(self, needed: int) -> int:
+        now = time.time()
+        overflow = self.used_bytes + self.reserved_bytes + needed - self.limit
+        freed = 0
+
+        for path, (size, last_used) in sorted(self.entries.items(), key=lambda entry: entry[1][1]):
+            if freed >= overflow:
+                break
+            if self._is_reserved(path) or now - last_used < EVICTION_MIN_AGE:
+                continue
+
+            await self._remove(path)
+            self._forget(path)
+            freed += size
+            logger.info(f"Evicted stale temp artifact {path} ({size} bytes)")
+
+        return freed
+
+    async def sweep_orphans(self, max_age: int = ORPHAN_MAX_AGE) -> int:
+        entries = await asyncio.to_thread(_scan_entries, self.directory)
+        now = time.time()
+        removed = 0
+
+        remaining = []
+
+        for path, size, last_used in entries:
+            if self._is_reserved(path) or now - last_used < max_age:
+                remaining.append((path, size, last_used))
+                continue
+            await self._remove(path)
+            removed += 1
+
+        if removed:
+            logger.info(f"Swept {removed} orphaned temp artifacts")
+        self._account(remaining)
+        return removed
+
+    async def refresh_usage(self) -> int:
+        self._account(await asyncio.to_thread(_scan_entries, self.directory))
+        return self.used_bytes
+
+    def _account(self, entries: List[Tuple[str, int, float]]):
+        reserved = {os.path.abspath(key): size for key, size in self.reservations.items()}
+        self.entries = {}
+        self.used_bytes = 0
+        for path, size, last_used in entries:
+            reservation = reserved.get(os.path.abspath(path))
+            if reservation is None:
+                self._track(path, size, last_used)
+            else:
+                self.used_bytes += max(0, size - reservation)
+
+    def _track(self, path: str, size: int, last_used: float):
+        path = os.path.abspath(path)
+        self._forget(path)
+        self.entries[path] = (size, last_used)
+        self.used_bytes += size
+
+    def _forget(self, path: str):
+        previous = self.entries.pop(os.path.abspath(path), None)
+        if previous:
+            self.used_bytes = max(0, self.used_bytes - previous[0])
+
+    def usage(self) -> Dict[str, Any]:
+        return {
+            'used': self.used_bytes,
+            'reserved': self.reserved_bytes,
+            'quota': self.quota,
+            'limit': self.limit,
+            'percent': (self.used_bytes + self.reserved_bytes) / self.quota * 100 if self.quota else 0.0
+        }
+
+    async def _fits(self, size: int) -> bool:
+        if self.used_bytes + self.reserved_bytes + size > self.limit:
+            return False
+
+        try:
+            disk = await asyncio.to_thread(shutil.disk_usage, self.directory)
+        except FileNotFoundError:
+            return True
+        return disk.free - self.reserved_bytes > size
+
+    def _is_reserved(self, path: str) -> bool:
+        path = os.path.abspath(path)
+        return any(os.path.abspath(key) == path for key in self.reservations)
+
+    async def _remove(self, path: str):
+        if os.path.isdir(path):
+            await cleanup_workspace(path)
+        else:
+            await cleanup_file(path)
+
+    async def _sweep_loop(self):
+        while True:
+            await asyncio.sleep(STORAGE_SWEEP_INTERVAL)
+            try:
+                await self.sweep_orphans()
+            except Exception as e:
+                logger.error(f"Temp storage sweep failed: {e}")
+
+
+storage_manager = StorageManager()
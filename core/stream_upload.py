@@ -0,0 +1,168 @@
+import os
+import math
+import asyncio
+from typing import Dict, Any, Callable, Optional, List
+from pyrogram import Client, raw
+from pyrogram.session import Session
+from utils.constants import USER_BOT_FILE_LIMIT
+import logging
+
+logger = logging.getLogger(__name__)
+
+PART_SIZE = 512 * 1024
+UPLOAD_WORKERS = 4
+TAIL_POLL_INTERVAL = 0.25
+
+
+class StreamingUpload:
+    def __init__(self, client: Client, min_size: int):
+        self.client = client
+        self.min_size = min_size
+        self.loop = asyncio.get_running_loop()
+        self.file_id = client.rnd_id()
+        self.source_path: Optional[str] = None
+        self.final_path: Optional[str] = None
+        self.expected_size = 0
+        self.total_parts = 0
+        self.uploaded_parts = 0
+        self.source_done = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+        self.cancelled = False
+        self.progress: Optional[Callable[[int, int], None]] = None
+
+    def hook(self, d: Dict[str, Any]):
+        event = {key: d.get(key) for key in ('status', 'total_bytes', 'tmpfilename', 'filename')}
+        self.loop.call_soon_threadsafe(self._handle, event)
+
+    def _handle(self, event: Dict[str, Any]):
+        if self.cancelled:
+            return
+
+        if event['status'] == 'downloading' and self.task is None:
+            total = event.get('total_bytes')
+            path = event.get('tmpfilename') or event.get('filename')
+            if self.final_path:
+                return
+            if path and total and self.min_size < total <= USER_BOT_FILE_LIMIT:
+                self.source_path = path
+                self.expected_size = total
+                self.total_parts = math.ceil(total / PART_SIZE)
+                self.task = self.loop.create_task(self._upload())
+                logger.info(f"Streaming upload started for {path} ({self.total_parts} parts)")
+        elif event['status'] == 'downloading':
+            path = event.get('tmpfilename') or event.get('filename')
+            if self.final_path and path != self.source_path:
+                logger.info(f"Another stream started after {self.source_path}, abandoning streaming upload")
+                self.abort()
+        elif event['status'] == 'finished':
+            self.final_path = event.get('filename')
+            self.source_done.set()
+
+    def abort(self):
+        self.cancelled = True
+        self.source_done.set()
+        if self.task and not self.task.done():
+            self.task.cancel()
+
+    async def result(self, file_path: str) -> Optional[raw.types.InputFileBig]:
+        if self.task is None:
+            return None
+
+        try:
+            input_file = await self.task
+        except asyncio.CancelledError:
+            return None
+        except Exception as e:
+            logger.warning(f"Streaming upload failed, falling back to whole-file upload: {e}")
+            return None
+
+        if not self.final_path or os.path.abspath(self.final_path) != os.path.abspath(file_path):
+            logger.info("Streamed source differs from the delivered file, falling back to whole-file upload")
+            return None
+
+        if os.path.getsize(file_path) != self.expected_size:
+            logger.info("Streamed file size changed, falling back to whole-file upload")
+            return None
+
+        return input_file
+
+    async def _open_source(self):
+        while True:
+            for path in (self.source_path, self.final_path):
+                if path and os.path.exists(path):
+                    try:
+                        return open(path, 'rb')
+                    except FileNotFoundError:
+                        continue
+            if self.source_done.is_set() and not self.final_path:
+                raise Exception("Source finished without a readable file")
+            await asyncio.sleep(TAIL_POLL_INTERVAL)
+
+    async def _upload(self) -> raw.types.InputFileBig:
+        session = Session(
+            self.client, await self.client.storage.dc_id(), await self.client.storage.auth_key(),
+            await self.client.storage.test_mode(), is_media=True
+        )
+        queue: asyncio.Queue = asyncio.Queue(UPLOAD_WORKERS)
+        errors: List[Exception] = []
+
+        async def worker():
+            while True:
+                rpc = await queue.get()
+                if rpc is None:
+                    return
+                try:
+                    await session.invoke(rpc)
+                    self.uploaded_parts += 1
+                    if self.progress:
+                        self.progress(self.uploaded_parts, self.total_parts)
+                except Exception as e:
+                    errors.append(e)
+
+        await session.start()
+        workers = [self.loop.create_task(worker()) for _ in range(UPLOAD_WORKERS)]
+        fp = None
+
+        try:
+            fp = await self._open_source()
+            part = 0
+
+            while part < self.total_parts:
+                if errors:
+                    raise errors[0]
+
+                offset = part * PART_SIZE
+                needed = min(PART_SIZE, self.expected_size - offset)
+                available = os.fstat(fp.fileno()).st_size - offset
+
+                if available < needed:
+                    if self.source_done.is_set():
+                        raise Exception("Source ended before the expected size was reached")
+                    await asyncio.sleep(TAIL_POLL_INTERVAL)
+                    continue
+
+                fp.seek(offset)
+                chunk = await asyncio.to_thread(fp.read, needed)
+                await queue.put(raw.functions.upload.SaveBigFilePart(
+                    file_id=self.file_id,
+                    file_part=part,
+                    file_total_parts=self.total_parts,
+                    bytes=chunk
+                ))
+                part += 1
+        finally:
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers, return_exceptions=True)
+            await session.stop()
+            if fp:
+                fp.close()
+
+        if errors:
+            raise errors[0]
+
+        return raw.types.InputFileBig(
+            id=self.file_id,
+            parts=self.total_parts,
+            name=os.path.basename(self.final_path or self.source_path)
+        )
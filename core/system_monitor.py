@@ -0,0 +1,91 @@
+import time
+import asyncio
+import inspect
+import psutil
+from collections import deque
+from typing import Dict, Any, Callable, List, Optional
+from utils.constants import SYSTEM_SAMPLE_INTERVAL, SYSTEM_SAMPLE_HISTORY, SPARKLINE_WIDTH
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class SystemSampler:
+    def __init__(self, interval: float = SYSTEM_SAMPLE_INTERVAL, history: int = SYSTEM_SAMPLE_HISTORY):
+        self.interval = interval
+        self.samples: deque = deque(maxlen=history)
+        self.probes: Dict[str, Callable[[], Any]] = {}
+        self.process = psutil.Process()
+        self.task: Optional[asyncio.Task] = None
+
+    def track(self, name: str, probe: Callable[[], Any]):
+        self.probes[name] = probe
+
+    async def start(self):
+        psutil.cpu_percent(interval=None)
+        await self.sample()
+        if self.task is None:
+            self.task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+
+    async def sample(self, loop_lag: float = 0.0) -> Dict[str, Any]:
+        sample = self._sample_system()
+        sample['loop_lag'] = loop_lag * 1000
+
+        for name, probe in self.probes.items():
+            try:
+                value = probe()
+                if inspect.isawaitable(value):
+                    value = await value
+            except Exception as e:
+                logger.debug(f"System probe {name} failed: {e}")
+                continue
+            sample[name] = value
+
+        self.samples.append(sample)
+        return sample
+
+    def latest(self) -> Dict[str, Any]:
+        if self.samples:
+            return self.samples[-1]
+        return self._sample_system()
+
+    def history(self, key: str, count: int = SPARKLINE_WIDTH) -> List[float]:
+        values = [sample[key] for sample in self.samples if key in sample]
+        return values[-count:]
+
+    def _sample_system(self) -> Dict[str, Any]:
+        memory = psutil.virtual_memory()
+        disk = psutil.disk_usage('.')
+        try:
+            fds = self.process.num_fds() if hasattr(self.process, 'num_fds') else self.process.num_handles()
+        except psutil.Error:
+            fds = 0
+
+        return {
+            'time': time.time(),
+            'cpu': psutil.cpu_percent(interval=None),
+            'memory': memory.percent,
+            'memory_available': memory.available,
+            'disk': disk.percent,
+            'disk_free': disk.free,
+            'fds': fds
+        }
+
+    async def _run(self):
+        while True:
+            started = time.monotonic()
+            await asyncio.sleep(self.interval)
+            loop_lag = max(0.0, time.monotonic() - started - self.interval)
+            try:
+                await self.sample(loop_lag)
+            except Exception as e:
+                logger.error(f"System sampling failed: {e}")
+
+
+system_sampler = SystemSampler()
@@ -0,0 +1,549 @@
+import os
+import glob
+import time
+import asyncio
+import aiofiles
+from dataclasses import dataclass, field
+from typing import Dict, Any, Callable, List, Optional, Tuple
+from core.ffmpeg_pool import ffmpeg_scheduler, PRIORITY_NORMAL, PRIORITY_LOW
+from utils.constants import FFMPEG_ENCODE_TIMEOUT, FFMPEG_TIMEOUT_PER_SECOND, FFMPEG_COPY_MIN_THROUGHPUT, SEGMENT_MIN_DURATION
+from utils.helpers import get_file_size, cleanup_file, cleanup_workspace
+import logging
+
+logger = logging.getLogger(__name__)
+
+MP4_VIDEO_CODECS = {'h264', 'hevc', 'av1', 'vp9', 'mpeg4'}
+MP4_AUDIO_CODECS = {'aac', 'mp3', 'opus', 'alac', 'ac3', 'eac3', 'flac'}
+
+SIZE_MARGIN = 0.97
+MIN_AUDIO_BITRATE = 48000
+MAX_AUDIO_BITRATE = 128000
+
+AUDIO_BITRATE = 80000
+MIN_AAC_BITRATE = 32000
+MIN_OPUS_BITRATE = 16000
+MONO_AUDIO_BITRATE = 64000
+MIN_VIDEO_BITRATE = 100000
+CONTAINER_OVERHEAD = 0.02
+BITS_PER_PIXEL_TARGET = 0.06
+DEFAULT_FPS = 30
+RESOLUTION_LADDER = (2160, 1440, 1080, 720, 480, 360, 240)
+
+
+@dataclass
+class MediaProbe:
+    path: str
+    size: int
+    duration: float
+    format_name: str
+    video: List[Dict[str, Any]] = field(default_factory=list)
+    audio: List[Dict[str, Any]] = field(default_factory=list)
+    other: List[Dict[str, Any]] = field(default_factory=list)
+
+    @property
+    def is_mp4(self) -> bool:
+        return self.path.lower().endswith('.mp4') and 'mp4' in self.format_name
+
+    def stream_bytes(self, streams: List[Dict[str, Any]]) -> int:
+        total = 0
+        for stream in streams:
+            bit_rate = stream.get('bit_rate') or (stream.get('tags') or {}).get('BPS') or 0
+            try:
+                total += int(int(bit_rate) * self.duration / 8)
+            except ValueError:
+                continue
+        return total
+
+
+@dataclass
+class RatePlan:
+    bitrate: int
+    scale_height: Optional[int]
+    predicted_size: int
+
+
+def _parse_rate(rate: Optional[str]) -> float:
+    try:
+        numerator, _, denominator = (rate or '').partition('/')
+        return float(numerator) / float(denominator or 1)
+    except (ValueError, ZeroDivisionError):
+        return 0.0
+
+
+def _scaled_progress(progress: Optional[Callable[[float], None]], duration: float, offset: float = 0.0, weight: float = 100.0) -> Optional[Callable[[float], None]]:
+    if not progress or not duration:
+        return None
+    return lambda seconds: progress(offset + weight * min(seconds / duration, 1.0))
+
+
+class Transcoder:
+    async def probe(self, path: str) -> MediaProbe:
+        info = await ffmpeg_scheduler.probe_media(path)
+        media = MediaProbe(
+            path=path,
+            size=await get_file_size(path),
+            duration=float(info.get('format', {}).get('duration') or 0),
+            format_name=info.get('format', {}).get('format_name', '')
+        )
+
+        for stream in info.get('streams', []):
+            codec_type = stream.get('codec_type')
+            if codec_type == 'video' and not (stream.get('disposition') or {}).get('attached_pic'):
+                media.video.append(stream)
+            elif codec_type == 'audio':
+                media.audio.append(stream)
+            else:
+                media.other.append(stream)
+
+        return media
+
+    async def fit(self, input_path: str, size_limit: int, priority: int = PRIORITY_NORMAL, progress: Optional[Callable[[float], None]] = None) -> str:
+        if not await ffmpeg_scheduler.available():
+            logger.warning("FFmpeg not available, delivering the file as downloaded")
+            return input_path
+
+        try:
+            media = await self.probe(input_path)
+        except Exception as e:
+            logger.warning(f"Probe failed for {input_path}, delivering as downloaded: {e}")
+            return input_path
+
+        if not media.video:
+            return input_path
+
+        if media.size <= size_limit and (media.is_mp4 or not self._copyable(media.video[:1], media.audio)):
+            return input_path
+
+        for step in (self._remux, self._drop_streams, self._reencode_audio):
+            output = await step(media, size_limit, priority)
+            if not output:
+                continue
+
+            output_size = await get_file_size(output)
+            if output_size <= size_limit:
+                logger.info(f"{step.__name__.strip('_')} fitted {input_path}: {media.size} -> {output_size} bytes")
+                return output
+
+            logger.info(f"{step.__name__.strip('_')} produced {output_size} bytes, over the {size_limit} byte limit")
+            await cleanup_file(output)
+
+        if media.size <= size_limit:
+            return input_path
+
+        logger.info(f"Stream copy cannot fit {input_path} into {size_limit} bytes, transcoding")
+        return await self.transcode(input_path, size_limit // (1024 * 1024) - 1, False, priority, progress)
+
+    async def fit_audio(self, input_path: str, size_limit: int, priority: int = PRIORITY_NORMAL, progress: Optional[Callable[[float], None]] = None) -> str:
+        file_size = await get_file_size(input_path)
+        if file_size <= size_limit or not await ffmpeg_scheduler.available():
+            return input_path
+
+        try:
+            media = await self.probe(input_path)
+        except Exception as e:
+            logger.warning(f"Probe failed for {input_path}, delivering as downloaded: {e}")
+            return input_path
+
+        if not media.audio or not media.duration:
+            return input_path
+
+        use_opus = media.audio[0].get('codec_name') == 'opus'
+        min_bitrate = MIN_OPUS_BITRATE if use_opus else MIN_AAC_BITRATE
+        bitrate = min(MAX_AUDIO_BITRATE, int(size_limit * SIZE_MARGIN * (1 - CONTAINER_OVERHEAD) * 8 / media.duration))
+        if bitrate < min_bitrate:
+            logger.warning(f"{input_path} would need {bitrate} bps to fit {size_limit} bytes, delivering as downloaded")
+            return input_path
+
+        output_path = f"{os.path.splitext(input_path)[0]}_fitted.{'opus' if use_opus else 'm4a'}"
+        cmd = ['ffmpeg', '-i', input_path, '-map', '0:a:0', '-map_metadata', '0']
+        if use_opus:
+            cmd.extend(['-c:a', 'libopus', '-vbr', 'constrained'])
+        else:
+            cmd.extend(['-map', '0:v?', '-c:v', 'copy', '-disposition:v', 'attached_pic', '-c:a', 'aac'])
+        cmd.extend([
+            '-b:a', str(bitrate),
+            '-ac', '1' if bitrate < MONO_AUDIO_BITRATE else '2',
+            '-threads', str(ffmpeg_scheduler.threads_per_job),
+            '-y', output_path
+        ])
+
+        try:
+            returncode, stderr = await ffmpeg_scheduler.run(cmd, priority, self._encode_timeout(media.duration), _scaled_progress(progress, media.duration))
+        except asyncio.CancelledError:
+            await cleanup_file(output_path)
+            raise
+        except Exception as e:
+            logger.warning(f"Audio re-encode failed for {input_path}: {e}")
+            await cleanup_file(output_path)
+            return input_path
+
+        if returncode != 0 or not os.path.exists(output_path):
+            logger.warning(f"Audio re-encode failed: {stderr.decode(errors='ignore')[-500:] if stderr else 'Unknown error'}")
+            await cleanup_file(output_path)
+            return input_path
+
+        output_size = await get_file_size(output_path)
+        logger.info(f"Audio re-encoded at {bitrate} bps to fit {size_limit} bytes: {file_size} -> {output_size} bytes")
+        return output_path
+
+    async def transcode(
+        self,
+        input_path: str,
+        target_size_mb: int = 19,
+        preserve_resolution: bool = True,
+        priority: int = PRIORITY_NORMAL,
+        progress: Optional[Callable[[float], None]] = None
+    ) -> str:
+        if not await ffmpeg_scheduler.available():
+            logger.warning("FFmpeg not available, skipping compression")
+            return input_path
+
+        output_path = f"{os.path.splitext(input_path)[0]}_compressed.mp4"
+
+        try:
+            file_size = await get_file_size(input_path)
+            target_size_bytes = target_size_mb * 1024 * 1024
+
+            if file_size <= target_size_bytes:
+                return input_path
+
+            try:
+                info = await ffmpeg_scheduler.probe_media(input_path)
+                duration = float(info['format']['duration'])
+
+                plan = self._plan_rate(info, duration, target_size_bytes, preserve_resolution)
+                segments = min(ffmpeg_scheduler.max_jobs, int(duration // SEGMENT_MIN_DURATION))
+                priority = max(priority, PRIORITY_LOW if segments >= 2 else PRIORITY_NORMAL)
+                logger.info(
+                    f"Rate plan for {input_path}: {plan.bitrate} bps video at "
+                    f"{f'{plan.scale_height}p' if plan.scale_height else 'source resolution'}, "
+                    f"predicted {plan.predicted_size} bytes for a {target_size_bytes} byte target"
+                )
+
+                encoded = False
+                if segments >= 2:
+                    encoded = await self._encode_segmented(input_path, output_path, duration, segments, plan, priority, progress)
+                if not encoded:
+                    encoded = await self._encode_single(input_path, output_path, duration, plan, target_size_bytes, priority, progress)
+
+                if encoded and os.path.exists(output_path):
+                    compressed_size = await get_file_size(output_path)
+                    logger.info(
+                        f"Size prediction: predicted {plan.predicted_size}, actual {compressed_size} "
+                        f"({(compressed_size - plan.predicted_size) / plan.predicted_size:+.1%}), "
+                        f"target {target_size_bytes} {'hit' if compressed_size <= target_size_bytes else 'missed'}"
+                    )
+                    if compressed_size < file_size and compressed_size > 0:
+                        logger.info(f"Compression successful: {file_size} -> {compressed_size} bytes")
+                        return output_path
+                    else:
+                        if os.path.exists(output_path):
+                            os.remove(output_path)
+
+            except asyncio.TimeoutError:
+                logger.warning("Compression timeout")
+                await cleanup_file(output_path)
+            except asyncio.CancelledError:
+                await cleanup_file(output_path)
+                raise
+            except Exception as e:
+                logger.warning(f"Compression process failed: {e}")
+
+            return input_path
+
+        except Exception as e:
+            logger.warning(f"Compression failed: {e}")
+            return input_path
+
+    def _plan_rate(self, info: Dict[str, Any], duration: float, target_size_bytes: int, preserve_resolution: bool) -> RatePlan:
+        streams = info.get('streams', [])
+        video = next((stream for stream in streams if stream.get('codec_type') == 'video'), {})
+        has_audio = any(stream.get('codec_type') == 'audio' for stream in streams)
+
+        audio_bytes = AUDIO_BITRATE * duration / 8 if has_audio else 0
+        budget = target_size_bytes * SIZE_MARGIN * (1 - CONTAINER_OVERHEAD) - audio_bytes
+        bitrate = max(MIN_VIDEO_BITRATE, int(budget * 8 / duration))
+
+        width, height = video.get('width') or 0, video.get('height') or 0
+        scale_height = None
+        if not preserve_resolution and width and height:
+            fps = _parse_rate(video.get('avg_frame_rate')) or DEFAULT_FPS
+            candidates = [candidate for candidate in RESOLUTION_LADDER if candidate <= height] or [height]
+            chosen = candidates[-1]
+            for candidate in candidates:
+                if bitrate / (width * candidate / height * candidate * fps) >= BITS_PER_PIXEL_TARGET:
+                    chosen = candidate
+                    break
+            if chosen < height:
+                scale_height = chosen
+
+        return RatePlan(bitrate, scale_height, int(bitrate * duration / 8 + audio_bytes))
+
+    def _video_args(self, plan: RatePlan) -> List[str]:
+        args = [
+            '-c:v', 'libx264',
+            '-b:v', f'{plan.bitrate}',
+            '-maxrate', f'{int(plan.bitrate * 1.5)}',
+            '-bufsize', f'{plan.bitrate * 2}',
+            '-preset', 'ultrafast'
+        ]
+        if plan.scale_height:
+            args.extend(['-vf', f'scale=-2:{plan.scale_height}'])
+        return args
+
+    def _encode_timeout(self, duration: float) -> float:
+        return max(FFMPEG_ENCODE_TIMEOUT, duration * FFMPEG_TIMEOUT_PER_SECOND)
+
+    def _copy_timeout(self, size: int, duration: float) -> float:
+        return max(self._encode_timeout(duration), size / FFMPEG_COPY_MIN_THROUGHPUT)
+
+    async def _first_pass(self, input_path: str, plan: RatePlan, passlog: str, priority: int, timeout: float, progress: Optional[Callable[[float], None]] = None) -> Tuple[int, bytes]:
+        return await ffmpeg_scheduler.run([
+            'ffmpeg', '-i', input_path,
+            *self._video_args(plan),
+            '-pass', '1', '-passlogfile', passlog, '-an',
+            '-threads', str(ffmpeg_scheduler.threads_per_job),
+            '-f', 'null', '-y', os.devnull
+        ], priority, timeout, progress)
+
+    async def _second_pass(
+        self,
+        input_path: str,
+        output_path: str,
+        plan: RatePlan,
+        passlog: str,
+        output_args: List[str],
+        priority: int,
+        timeout: float,
+        progress: Optional[Callable[[float], None]] = None
+    ) -> Tuple[int, bytes]:
+        return await ffmpeg_scheduler.run([
+            'ffmpeg', '-i', input_path,
+            *self._video_args(plan),
+            '-pass', '2', '-passlogfile', passlog,
+            *output_args,
+            '-threads', str(ffmpeg_scheduler.threads_per_job),
+            '-y', output_path
+        ], priority, timeout, progress)
+
+    async def _encode_single(
+        self,
+        input_path: str,
+        output_path: str,
+        duration: float,
+        plan: RatePlan,
+        target_size_bytes: int,
+        priority: int,
+        progress: Optional[Callable[[float], None]] = None
+    ) -> bool:
+        passlog = f"{os.path.splitext(output_path)[0]}_2pass"
+        output_args = [
+            '-c:a', 'aac',
+            '-b:a', str(AUDIO_BITRATE),
+            '-movflags', '+faststart',
+            '-avoid_negative_ts', 'make_zero'
+        ]
+        timeout = self._encode_timeout(duration)
+
+        try:
+            returncode, stderr = await self._first_pass(input_path, plan, passlog, priority, timeout, _scaled_progress(progress, duration, 0, 50))
+            if returncode == 0:
+                returncode, stderr = await self._second_pass(input_path, output_path, plan, passlog, output_args, priority, timeout, _scaled_progress(progress, duration, 50, 50))
+
+            if returncode == 0:
+                actual = await get_file_size(output_path)
+                if actual > target_size_bytes:
+                    corrected = RatePlan(int(plan.bitrate * target_size_bytes * SIZE_MARGIN / actual), plan.scale_height, plan.predicted_size)
+                    logger.info(f"Output overshot by {actual - target_size_bytes} bytes, re-running pass 2 at {corrected.bitrate} bps")
+                    returncode, stderr = await self._second_pass(input_path, output_path, corrected, passlog, output_args, priority, timeout)
+        finally:
+            for path in glob.glob(f"{glob.escape(passlog)}*"):
+                await cleanup_file(path)
+
+        if returncode != 0:
+            logger.warning(f"FFmpeg compression failed: {stderr.decode() if stderr else 'Unknown error'}")
+        return returncode == 0
+
+    async def _encode_segmented(
+        self,
+        input_path: str,
+        output_path: str,
+        duration: float,
+        segments: int,
+        plan: RatePlan,
+        priority: int,
+        progress: Optional[Callable[[float], None]] = None
+    ) -> bool:
+        segment_dir = f"{os.path.splitext(input_path)[0]}_segments"
+        segment_time = duration / segments
+        copy_timeout = self._copy_timeout(await get_file_size(input_path), duration)
+        positions: Dict[Tuple[int, int], float] = {}
+
+        def segment_progress(index: int, pass_number: int) -> Optional[Callable[[float], None]]:
+            if not progress:
+                return None
+
+            def report(seconds: float):
+                positions[(index, pass_number)] = seconds
+                progress(min(100.0, sum(positions.values()) * 50 / duration))
+            return report
+
+        try:
+            await asyncio.to_thread(os.makedirs, segment_dir, exist_ok=True)
+
+            returncode, stderr = await ffmpeg_scheduler.run([
+                'ffmpeg', '-i', input_path,
+                '-map', '0:v:0', '-c', 'copy', '-an',
+                '-f', 'segment', '-segment_time', f'{segment_time:.3f}',
+                '-segment_format', 'matroska', '-reset_timestamps', '1',
+                '-y', os.path.join(segment_dir, 'source_%03d.mkv')
+            ], priority, copy_timeout)
+            if returncode != 0:
+                logger.warning(f"Segment split failed: {stderr.decode(errors='ignore')[-500:]}")
+                return False
+
+            sources = sorted(name for name in os.listdir(segment_dir) if name.startswith('source_'))
+            encoded = [os.path.join(segment_dir, f"encoded_{index:03d}.mp4") for index in range(len(sources))]
+            started = time.monotonic()
+
+            tasks = [
+                asyncio.create_task(self._encode_segment(
+                    os.path.join(segment_dir, source), target, plan, priority, self._encode_timeout(segment_time),
+                    segment_progress(index, 1), segment_progress(index, 2)
+                ))
+                for index, (source, target) in enumerate(zip(sources, encoded))
+            ]
+            try:
+                results = await asyncio.gather(*tasks)
+            except BaseException:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+                raise
+
+            failed = [stderr for returncode, stderr in results if returncode != 0]
+            if failed:
+                logger.warning(f"{len(failed)}/{len(sources)} segment encodes failed: {failed[0].decode(errors='ignore')[-500:]}")
+                return False
+
+            logger.info(f"Encoded {len(sources)} segments in parallel in {time.monotonic() - started:.1f}s")
+
+            concat_list = os.path.join(segment_dir, 'concat.txt')
+            async with aiofiles.open(concat_list, 'w') as f:
+                await f.write(''.join(f"file '{os.path.abspath(path)}'\n" for path in encoded))
+
+            returncode, stderr = await ffmpeg_scheduler.run([
+                'ffmpeg', '-f', 'concat', '-safe', '0', '-i', concat_list, '-i', input_path,
+                '-map', '0:v:0', '-map', '1:a:0?',
+                '-c:v', 'copy', '-c:a', 'aac', '-b:a', str(AUDIO_BITRATE),
+                '-movflags', '+faststart', '-avoid_negative_ts', 'make_zero',
+                '-threads', str(ffmpeg_scheduler.threads_per_job),
+                '-y', output_path
+            ], priority, copy_timeout)
+            if returncode != 0:
+                logger.warning(f"Segment concat failed: {stderr.decode(errors='ignore')[-500:]}")
+                return False
+
+            return True
+
+        except asyncio.TimeoutError:
+            logger.warning("Segmented compression timed out, retrying as a single encode")
+            return False
+        finally:
+            await cleanup_workspace(segment_dir)
+
+    async def _encode_segment(
+        self,
+        source: str,
+        target: str,
+        plan: RatePlan,
+        priority: int,
+        timeout: float,
+        first_progress: Optional[Callable[[float], None]] = None,
+        second_progress: Optional[Callable[[float], None]] = None
+    ) -> Tuple[int, bytes]:
+        passlog = f"{os.path.splitext(target)[0]}_2pass"
+        returncode, stderr = await self._first_pass(source, plan, passlog, priority, timeout, first_progress)
+        if returncode != 0:
+            return returncode, stderr
+        return await self._second_pass(source, target, plan, passlog, ['-an'], priority, timeout, second_progress)
+
+    def _copyable(self, video: List[Dict[str, Any]], audio: List[Dict[str, Any]]) -> bool:
+        return (
+            all(stream.get('codec_name') in MP4_VIDEO_CODECS for stream in video) and
+            all(stream.get('codec_name') in MP4_AUDIO_CODECS for stream in audio)
+        )
+
+    def _predicted_too_big(self, media: MediaProbe, streams: List[Dict[str, Any]], size_limit: int) -> bool:
+        predicted = media.stream_bytes(streams)
+        return predicted > size_limit * SIZE_MARGIN
+
+    async def _remux(self, media: MediaProbe, size_limit: int, priority: int) -> Optional[str]:
+        if not self._copyable(media.video, media.audio):
+            return None
+        if media.is_mp4 and not media.other:
+            return None
+        if self._predicted_too_big(media, media.video + media.audio, size_limit):
+            return None
+
+        return await self._run_copy(media, '_remux', ['-map', '0:v', '-map', '0:a?', '-c', 'copy'], priority)
+
+    async def _drop_streams(self, media: MediaProbe, size_limit: int, priority: int) -> Optional[str]:
+        if len(media.video) <= 1 and len(media.audio) <= 1 and not media.other:
+            return None
+        if not self._copyable(media.video[:1], media.audio[:1]):
+            return None
+        if self._predicted_too_big(media, media.video[:1] + media.audio[:1], size_limit):
+            return None
+
+        return await self._run_copy(media, '_streams', ['-map', '0:v:0', '-map', '0:a:0?', '-c', 'copy'], priority)
+
+    async def _reencode_audio(self, media: MediaProbe, size_limit: int, priority: int) -> Optional[str]:
+        if not media.audio or not media.duration or not self._copyable(media.video[:1], []):
+            return None
+
+        video_bytes = media.stream_bytes(media.video[:1])
+        if not video_bytes:
+            audio_bytes = media.stream_bytes(media.audio)
+            if not audio_bytes:
+                return None
+            video_bytes = media.size - audio_bytes
+
+        audio_budget = size_limit * SIZE_MARGIN - video_bytes
+        audio_bitrate = min(MAX_AUDIO_BITRATE, int(audio_budget * 8 / media.duration))
+        if audio_bitrate < MIN_AUDIO_BITRATE:
+            return None
+
+        return await self._run_copy(media, '_audio', [
+            '-map', '0:v:0', '-map', '0:a:0',
+            '-c:v', 'copy', '-c:a', 'aac', '-b:a', str(audio_bitrate), '-ac', '2'
+        ], priority)
+
+    async def _run_copy(self, media: MediaProbe, suffix: str, args: List[str], priority: int) -> Optional[str]:
+        output_path = f"{os.path.splitext(media.path)[0]}{suffix}.mp4"
+        cmd = [
+            'ffmpeg', '-i', media.path, *args,
+            '-movflags', '+faststart',
+            '-threads', str(ffmpeg_scheduler.threads_per_job),
+            '-y', output_path
+        ]
+
+        try:
+            returncode, stderr = await ffmpeg_scheduler.run(cmd, priority, self._copy_timeout(media.size, media.duration))
+        except asyncio.CancelledError:
+            await cleanup_file(output_path)
+            raise
+        except Exception as e:
+            logger.warning(f"Stream copy {suffix} failed for {media.path}: {e}")
+            await cleanup_file(output_path)
+            return None
+
+        if returncode != 0 or not os.path.exists(output_path):
+            logger.warning(f"Stream copy {suffix} failed: {stderr.decode(errors='ignore')[-500:] if stderr else 'Unknown error'}")
+            await cleanup_file(output_path)
+            return None
+
+        return output_path
+
+
+transcoder = Transcoder()
@@ -0,0 +1,107 @@
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Any, Optional
+from database.models import User
+from database.operations import get_user, add_user, update_user_language
+from core.write_buffer import write_buffer
+from core.live_stats import live_stats
+from utils.constants import USER_CACHE_SIZE, USER_ACTIVITY_INTERVAL, DEFAULT_LANGUAGE
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class UserCache:
+    def __init__(self, max_entries: int = USER_CACHE_SIZE, activity_interval: float = USER_ACTIVITY_INTERVAL):
+        self.max_entries = max_entries
+        self.activity_interval = activity_interval
+        self.entries: "OrderedDict[int, Optional[User]]" = OrderedDict()
+        self.activity_persisted: Dict[int, float] = {}
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, user_id: int) -> Optional[User]:
+        if user_id in self.entries:
+            self.entries.move_to_end(user_id)
+            self.hits += 1
+            return self.entries[user_id]
+
+        self.misses += 1
+        user = await get_user(user_id)
+        self._remember(user_id, user)
+        if user:
+            self.activity_persisted[user_id] = time.monotonic()
+        return user
+
+    async def language(self, user_id: int) -> str:
+        try:
+            user = await self.get(user_id)
+        except Exception as e:
+            logger.debug(f"User lookup failed for {user_id}: {e}")
+            return DEFAULT_LANGUAGE
+
+        if not user:
+            return DEFAULT_LANGUAGE
+
+        self.touch(user)
+        return user.language or DEFAULT_LANGUAGE
+
+    async def add(self, user: User) -> bool:
+        if self.entries.get(user.user_id) is not None:
+            self.entries.move_to_end(user.user_id)
+            self.hits += 1
+            self.touch(self.entries[user.user_id])
+            return False
+
+        inserted = await add_user(user)
+        if inserted:
+            live_stats.record_user()
+            self._remember(user.user_id, user)
+            self.activity_persisted[user.user_id] = time.monotonic()
+        else:
+            self.entries.pop(user.user_id, None)
+        return inserted
+
+    async def set_language(self, user_id: int, language: str):
+        await update_user_language(user_id, language)
+
+        user = self.entries.get(user_id)
+        if user:
+            user.language = language
+
+    def touch(self, user: User):
+        now = time.monotonic()
+        user.last_activity = datetime.now()
+        if now - self.activity_persisted.get(user.user_id, 0) < self.activity_interval:
+            return
+
+        self.activity_persisted[user.user_id] = now
+        write_buffer.touch_user(user.user_id, user.last_activity)
+
+    def invalidate(self, user_id: Optional[int] = None):
+        if user_id is None:
+            self.entries.clear()
+            self.activity_persisted.clear()
+        else:
+            self.entries.pop(user_id, None)
+            self.activity_persisted.pop(user_id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self.entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': (self.hits / lookups * 100) if lookups else 0.0
+        }
+
+    def _remember(self, user_id: int, user: Optional[User]):
+        self.entries[user_id] = user
+        self.entries.move_to_end(user_id)
+        while len(self.entries) > self.max_entries:
+            evicted, _ = self.entries.popitem(last=False)
+            self.activity_persisted.pop(evicted, None)
+
+
+user_cache = UserCache()
@@ -0,0 +1,108 @@
+import time
+import asyncio
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
+from database.models import Download
+from database.operations import save_buffered_writes
+from utils.constants import DownloadStatus, WRITE_BUFFER_FLUSH_SIZE, WRITE_BUFFER_FLUSH_INTERVAL
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBuffer:
+    def __init__(self, flush_size: int = WRITE_BUFFER_FLUSH_SIZE, flush_interval: float = WRITE_BUFFER_FLUSH_INTERVAL):
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.downloads: List[Download] = []
+        self.users: Dict[int, Tuple[Optional[datetime], int]] = {}
+        self.flush_lock = asyncio.Lock()
+        self.wakeup = asyncio.Event()
+        self.flusher: Optional[asyncio.Task] = None
+        self.flushes = 0
+        self.rows_written = 0
+        self.last_flush_time = 0.0
+
+    @property
+    def pending(self) -> int:
+        return len(self.downloads) + len(self.users)
+
+    def start(self):
+        if self.flusher is None:
+            self.flusher = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self.flusher:
+            self.flusher.cancel()
+            await asyncio.gather(self.flusher, return_exceptions=True)
+            self.flusher = None
+        await self.flush()
+
+    def add_download(self, download: Download):
+        download.created_at = download.created_at or datetime.now()
+        if download.status in (DownloadStatus.COMPLETED, DownloadStatus.FAILED):
+            download.completed_at = download.completed_at or download.created_at
+        self.downloads.append(download)
+        self._added()
+
+    def touch_user(self, user_id: int, last_activity: Optional[datetime] = None, downloads: int = 0):
+        previous_activity, previous_downloads = self.users.get(user_id, (None, 0))
+        if previous_activity and (not last_activity or previous_activity > last_activity):
+            last_activity = previous_activity
+        self.users[user_id] = (last_activity, previous_downloads + downloads)
+        self._added()
+
+    def record_completed_download(self, user_id: int):
+        self.touch_user(user_id, datetime.now(), downloads=1)
+
+    async def flush(self):
+        async with self.flush_lock:
+            if not self.pending:
+                return
+
+            downloads, self.downloads = self.downloads, []
+            users, self.users = self.users, {}
+            started = time.monotonic()
+
+            try:
+                await save_buffered_writes(
+                    downloads,
+                    [(user_id, last_activity, count) for user_id, (last_activity, count) in users.items()]
+                )
+            except Exception as e:
+                logger.error(f"Write buffer flush failed, keeping {len(downloads) + len(users)} rows: {e}")
+                self._restore(downloads, users)
+                return
+
+            self.flushes += 1
+            self.rows_written += len(downloads) + len(users)
+            self.last_flush_time = time.monotonic() - started
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'pending': self.pending,
+            'flushes': self.flushes,
+            'rows_written': self.rows_written,
+            'last_flush_ms': self.last_flush_time * 1000
+        }
+
+    def _added(self):
+        if self.pending >= self.flush_size:
+            self.wakeup.set()
+
+    def _restore(self, downloads: List[Download], users: Dict[int, Tuple[Optional[datetime], int]]):
+        self.downloads[:0] = downloads
+        for user_id, (last_activity, count) in users.items():
+            self.touch_user(user_id, last_activity, count)
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self.wakeup.clear()
+            await asyncio.shield(self.flush())
+
+
+write_buffer = WriteBuffer()
@@ -3,7 +3,8 @@ import asyncio
 import aiohttp
 from typing import Dict, Optional, List, Any
 from googleapiclient.discovery import build
-from utils.constants import YOUTUBE_API_KEY
+from utils.constants import YOUTUBE_API_KEY, Platform
+from core.metadata_cache import metadata_cache
 import logging
 
 logger = logging.getLogger(__name__)
@@ -32,6 +33,11 @@ class YouTubeAPI:
     async def get_video_info(self, video_id: str) -> Optional[Dict[str, Any]]:
         if not self.youtube:
             return None
+
+        cache_key = f"ytapi:{video_id}"
+        cached = await metadata_cache.get(cache_key)
+        if cached:
+            return cached
             
         try:
             loop = asyncio.get_event_loop()
@@ -51,7 +57,7 @@ class YouTubeAPI:
                 duration_str = content_details['duration']
                 duration_seconds = self._parse_duration(duration_str)
                 
-                return {
+                video_info = {
                     'title': snippet['title'],
                     'description': snippet['description'][:500] + '...' if len(snippet['description']) > 500 else snippet['description'],
                     'channel': snippet['channelTitle'],
@@ -66,6 +72,9 @@ class YouTubeAPI:
                         'maxres': snippet['thumbnails'].get('maxres', {}).get('url')
                     }
                 }
+
+                await metadata_cache.set(cache_key, Platform.YOUTUBE, video_info)
+                return video_info
         except Exception as e:
             logger.error(f"YouTube API error: {e}")
         
@@ -0,0 +1,141 @@
+import time
+import asyncio
+import queue
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, Callable, Optional, List
+from utils.constants import YTDLP_PROCESS_WORKERS
+import logging
+
+logger = logging.getLogger(__name__)
+
+PROGRESS_KEYS = (
+    'status', 'downloaded_bytes', 'total_bytes', '_total_bytes_estimate',
+    '_percent_str', 'filename', 'tmpfilename', 'error'
+)
+PROGRESS_EVENT_INTERVAL = 0.25
+
+
+def run_extract_info(url: str, opts: Dict[str, Any]) -> Dict[str, Any]:
+    import yt_dlp
+
+    with yt_dlp.YoutubeDL(opts) as ydl:
+        info = ydl.extract_info(url, download=False)
+        return ydl.sanitize_info(info)
+
+
+def run_download(url: str, opts: Dict[str, Any], progress_queue=None, info: Optional[Dict[str, Any]] = None):
+    import yt_dlp
+
+    if progress_queue is not None:
+        last_sent = {'time': 0.0, 'file': None}
+
+        def forward(d):
+            now = time.monotonic()
+            current_file = d.get('tmpfilename') or d.get('filename')
+            if d.get('status') == 'downloading' and current_file == last_sent['file'] and now - last_sent['time'] < PROGRESS_EVENT_INTERVAL:
+                return
+            last_sent['time'] = now
+            last_sent['file'] = current_file
+            progress_queue.put({key: d[key] for key in PROGRESS_KEYS if key in d and isinstance(d[key], (str, int, float))})
+        def forward_postprocessor(d):
+            if d.get('status') == 'finished' and d.get('info_dict', {}).get('filepath'):
+                progress_queue.put({'status': 'postprocessed', 'filename': d['info_dict']['filepath']})
+
+        opts = dict(opts, progress_hooks=[forward], postprocessor_hooks=[forward_postprocessor])
+
+    try:
+        with yt_dlp.YoutubeDL(opts) as ydl:
+            if info is not None:
+                ydl.process_ie_result(dict(info), download=True)
+            else:
+                ydl.download([url])
+    finally:
+        if progress_queue is not None:
+            progress_queue.put(None)
+
+
+def _pool_extract_info(url: str, opts: Dict[str, Any]) -> Dict[str, Any]:
+    try:
+        return run_extract_info(url, opts)
+    except Exception as e:
+        raise RuntimeError(str(e)) from None
+
+
+def _pool_download(url: str, opts: Dict[str, Any], progress_queue=None, info: Optional[Dict[str, Any]] = None):
+    try:
+        run_download(url, opts, progress_queue, info)
+    except Exception as e:
+        raise RuntimeError(str(e)) from None
+
+
+def _preload_worker():
+    import yt_dlp
+    import yt_dlp.extractor
+    yt_dlp.extractor.gen_extractor_classes()
+
+
+class YtDlpProcessPool:
+    def __init__(self, workers: int = YTDLP_PROCESS_WORKERS):
+        self.workers = max(1, workers)
+        self.executor: Optional[ProcessPoolExecutor] = None
+        self.manager = None
+
+    def _ensure_started(self):
+        if self.executor is None:
+            context = multiprocessing.get_context('spawn')
+            self.manager = context.Manager()
+            self.executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=context,
+                initializer=_preload_worker
+            )
+            logger.info(f"yt-dlp process pool started with {self.workers} workers")
+
+    async def extract_info(self, url: str, opts: Dict[str, Any]) -> Dict[str, Any]:
+        self._ensure_started()
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, _pool_extract_info, url, opts)
+
+    async def download(self, url: str, opts: Dict[str, Any], hooks: Optional[List[Callable]] = None, info: Optional[Dict[str, Any]] = None):
+        self._ensure_started()
+        loop = asyncio.get_running_loop()
+        progress_queue = self.manager.Queue() if hooks else None
+
+        future = loop.run_in_executor(self.executor, _pool_download, url, opts, progress_queue, info)
+
+        if progress_queue is not None:
+            finished = False
+            while not finished:
+                try:
+                    events = [await asyncio.to_thread(progress_queue.get, True, 1.0)]
+                except queue.Empty:
+                    if future.done():
+                        break
+                    continue
+
+                while events[-1] is not None:
+                    try:
+                        events.append(progress_queue.get_nowait())
+                    except queue.Empty:
+                        break
+
+                for event in events:
+                    if event is None:
+                        finished = True
+                        break
+                    for hook in hooks:
+                        try:
+                            hook(event)
+                        except Exception as e:
+                            logger.debug(f"Progress hook failed: {e}")
+
+        await future
+
+    def shutdown(self):
+        if self.executor:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+        if self.manager:
+            self.manager.shutdown()
+            self.manager = None
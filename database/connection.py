@@ -0,0 +1,104 @@
+import os
+import asyncio
+import aiosqlite
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, List, Optional
+from utils.constants import DB_PATH, DB_READ_POOL_SIZE, DB_BUSY_TIMEOUT, DB_CACHED_STATEMENTS, DB_CACHE_SIZE_KB, DB_MMAP_SIZE
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class Database:
+    def __init__(self, path: str = DB_PATH, readers: int = DB_READ_POOL_SIZE):
+        self.path = path
+        self.reader_count = max(1, readers)
+        self.writer: Optional[aiosqlite.Connection] = None
+        self.readers: List[aiosqlite.Connection] = []
+        self.idle_readers: Optional[asyncio.Queue] = None
+        self.write_lock = asyncio.Lock()
+        self.open_lock = asyncio.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        return self.writer is not None
+
+    async def open(self):
+        async with self.open_lock:
+            if self.is_open:
+                return
+
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+            self.writer = await self._connect(readonly=False)
+            self.readers = [await self._connect(readonly=True) for _ in range(self.reader_count)]
+            self.idle_readers = asyncio.Queue()
+            for reader in self.readers:
+                self.idle_readers.put_nowait(reader)
+
+            logger.info(f"Database {self.path} opened with 1 writer and {self.reader_count} readers")
+
+    async def close(self):
+        async with self.open_lock:
+            if not self.is_open:
+                return
+
+            async with self.write_lock:
+                for connection in self.readers:
+                    await connection.close()
+                try:
+                    await self.writer.execute('PRAGMA optimize')
+                except Exception as e:
+                    logger.debug(f"PRAGMA optimize failed: {e}")
+                await self.writer.close()
+
+            self.writer = None
+            self.readers = []
+            self.idle_readers = None
+
+    @asynccontextmanager
+    async def read(self) -> AsyncIterator[aiosqlite.Connection]:
+        if not self.is_open:
+            await self.open()
+
+        idle_readers = self.idle_readers
+        connection = await idle_readers.get()
+        try:
+            yield connection
+        finally:
+            idle_readers.put_nowait(connection)
+
+    @asynccontextmanager
+    async def write(self) -> AsyncIterator[aiosqlite.Connection]:
+        if not self.is_open:
+            await self.open()
+
+        async with self.write_lock:
+            try:
+                yield self.writer
+            except BaseException:
+                await self.writer.rollback()
+                raise
+            await self.writer.commit()
+
+    async def _connect(self, readonly: bool) -> aiosqlite.Connection:
+        connection = await aiosqlite.connect(
+            self.path,
+            timeout=DB_BUSY_TIMEOUT / 1000,
+            cached_statements=DB_CACHED_STATEMENTS
+        )
+        await connection.execute(f'PRAGMA busy_timeout = {DB_BUSY_TIMEOUT}')
+        if not readonly:
+            await connection.execute('PRAGMA journal_mode = WAL')
+        await connection.execute('PRAGMA synchronous = NORMAL')
+        await connection.execute('PRAGMA temp_store = MEMORY')
+        await connection.execute(f'PRAGMA cache_size = -{DB_CACHE_SIZE_KB}')
+        await connection.execute(f'PRAGMA mmap_size = {DB_MMAP_SIZE}')
+        if readonly:
+            await connection.execute('PRAGMA query_only = ON')
+        return connection
+
+
+database = Database()
@@ -0,0 +1,176 @@
+import calendar
+from datetime import datetime
+from typing import List, Tuple
+from .connection import database
+import logging
+
+logger = logging.getLogger(__name__)
+
+BASELINE = [
+    '''
+        CREATE TABLE IF NOT EXISTS users (
+            user_id INTEGER PRIMARY KEY,
+            username TEXT,
+            first_name TEXT,
+            last_name TEXT,
+            language TEXT DEFAULT 'uz',
+            join_date TEXT,
+            download_count INTEGER DEFAULT 0,
+            last_activity TEXT,
+            is_active INTEGER DEFAULT 1
+        )
+    ''',
+    '''
+        CREATE TABLE IF NOT EXISTS downloads (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            url TEXT,
+            platform TEXT,
+            title TEXT,
+            file_size INTEGER,
+            quality TEXT,
+            status TEXT,
+            created_at TEXT,
+            completed_at TEXT,
+            file_path TEXT,
+            error_message TEXT,
+            FOREIGN KEY (user_id) REFERENCES users (user_id)
+        )
+    ''',
+    '''
+        CREATE TABLE IF NOT EXISTS analytics (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            date TEXT,
+            total_downloads INTEGER DEFAULT 0,
+            successful_downloads INTEGER DEFAULT 0,
+            failed_downloads INTEGER DEFAULT 0,
+            unique_users INTEGER DEFAULT 0,
+            youtube_downloads INTEGER DEFAULT 0,
+            instagram_downloads INTEGER DEFAULT 0
+        )
+    ''',
+    '''
+        CREATE TABLE IF NOT EXISTS broadcast_messages (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            text TEXT,
+            media_type TEXT,
+            media_file_id TEXT,
+            button_text TEXT,
+            button_url TEXT,
+            created_at TEXT,
+            sent_count INTEGER DEFAULT 0
+        )
+    ''',
+    '''
+        CREATE TABLE IF NOT EXISTS broadcasts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            source_chat_id INTEGER,
+            source_message_id INTEGER,
+            text TEXT,
+            caption_entities TEXT,
+            media_type TEXT,
+            media_file_id TEXT,
+            button_text TEXT,
+            button_url TEXT,
+            admin_chat_id INTEGER,
+            status_message_id INTEGER,
+            status TEXT,
+            total INTEGER DEFAULT 0,
+            created_at TEXT,
+            finished_at TEXT
+        )
+    ''',
+    '''
+        CREATE TABLE IF NOT EXISTS broadcast_deliveries (
+            broadcast_id INTEGER,
+            user_id INTEGER,
+            status TEXT,
+            error TEXT,
+            PRIMARY KEY (broadcast_id, user_id),
+            FOREIGN KEY (broadcast_id) REFERENCES broadcasts (id)
+        ) WITHOUT ROWID
+    ''',
+    '''
+        CREATE TABLE IF NOT EXISTS file_cache (
+            media_id TEXT,
+            quality TEXT,
+            route TEXT,
+            file_id TEXT,
+            media_type TEXT,
+            file_size INTEGER DEFAULT 0,
+            hits INTEGER DEFAULT 0,
+            created_at TEXT,
+            last_hit TEXT,
+            PRIMARY KEY (media_id, quality, route)
+        )
+    ''',
+    '''
+        CREATE TABLE IF NOT EXISTS metadata_cache (
+            cache_key TEXT PRIMARY KEY,
+            platform TEXT,
+            data TEXT,
+            expires_at REAL
+        )
+    ''',
+    'CREATE INDEX IF NOT EXISTS idx_users_activity ON users (last_activity)',
+    'CREATE INDEX IF NOT EXISTS idx_downloads_created ON downloads (created_at)',
+    'CREATE INDEX IF NOT EXISTS idx_downloads_status ON downloads (status)',
+    'CREATE UNIQUE INDEX IF NOT EXISTS idx_analytics_date ON analytics (date)',
+    'CREATE INDEX IF NOT EXISTS idx_broadcasts_status ON broadcasts (status)',
+    'CREATE INDEX IF NOT EXISTS idx_broadcast_deliveries_status ON broadcast_deliveries (broadcast_id, status, user_id)',
+    'CREATE INDEX IF NOT EXISTS idx_file_cache_hits ON file_cache (hits)',
+    'CREATE INDEX IF NOT EXISTS idx_metadata_cache_expires ON metadata_cache (expires_at)',
+]
+
+EPOCH_COLUMNS = [
+    "ALTER TABLE downloads ADD COLUMN created_ts INTEGER GENERATED ALWAYS AS (CAST(strftime('%s', created_at) AS INTEGER)) VIRTUAL",
+    "ALTER TABLE users ADD COLUMN join_ts INTEGER GENERATED ALWAYS AS (CAST(strftime('%s', join_date) AS INTEGER)) VIRTUAL",
+]
+
+TIME_INDEXES = [
+    'DROP INDEX IF EXISTS idx_downloads_created',
+    'DROP INDEX IF EXISTS idx_downloads_status',
+    'CREATE INDEX IF NOT EXISTS idx_downloads_created_ts ON downloads (created_ts)',
+    'CREATE INDEX IF NOT EXISTS idx_downloads_status_created ON downloads (status, created_ts)',
+    'CREATE INDEX IF NOT EXISTS idx_downloads_platform_created ON downloads (platform, created_ts)',
+    'CREATE INDEX IF NOT EXISTS idx_downloads_user_created ON downloads (user_id, created_ts)',
+    'CREATE INDEX IF NOT EXISTS idx_users_join_ts ON users (join_ts)',
+    'ANALYZE',
+]
+
+MIGRATIONS: List[Tuple[int, str, List[str]]] = [
+    (1, 'baseline schema', BASELINE),
+    (2, 'epoch timestamp columns', EPOCH_COLUMNS),
+    (3, 'composite time indexes', TIME_INDEXES),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def epoch(value: datetime) -> int:
+    return calendar.timegm(value.timetuple())
+
+
+async def get_schema_version() -> int:
+    async with database.read() as db:
+        cursor = await db.execute('PRAGMA user_version')
+        return (await cursor.fetchone())[0]
+
+
+async def migrate() -> int:
+    version = await get_schema_version()
+    applied = 0
+    for target, name, statements in MIGRATIONS:
+        if target <= version:
+            continue
+
+        async with database.write() as db:
+            await db.execute('BEGIN')
+            for statement in statements:
+                await db.execute(statement)
+            await db.execute(f'PRAGMA user_version = {target}')
+
+        logger.info(f"Applied database migration {target}: {name}")
+        applied += 1
+
+    return applied
@@ -1,7 +1,7 @@
 from dataclasses import dataclass
 from datetime import datetime
 from typing import Optional, Dict, Any
-from utils.constants import DownloadStatus, Platform
+from utils.constants import DownloadStatus, Platform, BroadcastStatus
 
 @dataclass
 class User:
@@ -51,3 +51,33 @@ class BroadcastMessage:
     button_url: Optional[str] = None
     created_at: datetime = None
     sent_count: int = 0
+
+@dataclass
+class Broadcast:
+    id: Optional[int] = None
+    source_chat_id: int = 0
+    source_message_id: int = 0
+    text: str = ""
+    caption_entities: Optional[str] = None
+    media_type: Optional[str] = None
+    media_file_id: Optional[str] = None
+    button_text: Optional[str] = None
+    button_url: Optional[str] = None
+    admin_chat_id: Optional[int] = None
+    status_message_id: Optional[int] = None
+    status: BroadcastStatus = BroadcastStatus.RUNNING
+    total: int = 0
+    created_at: datetime = None
+    finished_at: Optional[datetime] = None
+
+@dataclass
+class CachedFile:
+    media_id: str
+    quality: str
+    route: str
+    file_id: str
+    media_type: str = "video"
+    file_size: int = 0
+    hits: int = 0
+    created_at: datetime = None
+    last_hit: Optional[datetime] = None
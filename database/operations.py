@@ -1,86 +1,31 @@
-import aiosqlite
 from datetime import datetime
-from typing import List, Optional
-from .models import User, Download, Analytics, BroadcastMessage
-from utils.constants import DB_PATH, Platform, DownloadStatus
+from typing import Dict, List, Optional, Tuple
+from .connection import database
+from .migrations import migrate, epoch, SCHEMA_VERSION
+from .models import User, Download, Analytics, BroadcastMessage, Broadcast, CachedFile
+from utils.constants import Platform, DownloadStatus, BroadcastStatus, DeliveryStatus
+import logging
+
+logger = logging.getLogger(__name__)
 
 
 async def init_db():
-    async with aiosqlite.connect(DB_PATH) as db:
-        await db.executescript('''
-            CREATE TABLE IF NOT EXISTS users (
-                user_id INTEGER PRIMARY KEY,
-                username TEXT,
-                first_name TEXT,
-                last_name TEXT,
-                language TEXT DEFAULT 'uz',
-                join_date TEXT,
-                download_count INTEGER DEFAULT 0,
-                last_activity TEXT,
-                is_active INTEGER DEFAULT 1
-            );
-
-            CREATE TABLE IF NOT EXISTS downloads (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER,
-                url TEXT,
-                platform TEXT,
-                title TEXT,
-                file_size INTEGER,
-                quality TEXT,
-                status TEXT,
-                created_at TEXT,
-                completed_at TEXT,
-                file_path TEXT,
-                error_message TEXT,
-                FOREIGN KEY (user_id) REFERENCES users (user_id)
-            );
-
-            CREATE TABLE IF NOT EXISTS analytics (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                date TEXT,
-                total_downloads INTEGER DEFAULT 0,
-                successful_downloads INTEGER DEFAULT 0,
-                failed_downloads INTEGER DEFAULT 0,
-                unique_users INTEGER DEFAULT 0,
-                youtube_downloads INTEGER DEFAULT 0,
-                instagram_downloads INTEGER DEFAULT 0
-            );
-
-            CREATE TABLE IF NOT EXISTS broadcast_messages (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                text TEXT,
-                media_type TEXT,
-                media_file_id TEXT,
-                button_text TEXT,
-                button_url TEXT,
-                created_at TEXT,
-                sent_count INTEGER DEFAULT 0
-            );
-        ''')
-    await create_indices()
-
-
-async def create_indices():
-    async with aiosqlite.connect(DB_PATH) as db:
-        await db.executescript('''
-            CREATE INDEX IF NOT EXISTS idx_users_activity ON users (last_activity);
-            CREATE INDEX IF NOT EXISTS idx_downloads_created ON downloads (created_at);
-            CREATE INDEX IF NOT EXISTS idx_downloads_status ON downloads (status);
-        ''')
-
-
-async def add_user(user: User):
-    async with aiosqlite.connect(DB_PATH) as db:
-        await db.execute('''
+    applied = await migrate()
+    if applied:
+        logger.info(f"Database schema upgraded to version {SCHEMA_VERSION} ({applied} migrations applied)")
+
+
+async def add_user(user: User) -> bool:
+    async with database.write() as db:
+        cursor = await db.execute('''
             INSERT OR IGNORE INTO users (user_id, username, first_name, last_name, language, join_date, last_activity, is_active)
             VALUES (?, ?, ?, ?, ?, ?, ?, ?)
         ''', (user.user_id, user.username, user.first_name, user.last_name, user.language, user.join_date.isoformat(), user.last_activity.isoformat(), int(user.is_active)))
-        await db.commit()
+        return cursor.rowcount == 1
 
 
 async def get_user(user_id: int) -> Optional[User]:
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with database.read() as db:
         async with db.execute('SELECT user_id, username, first_name, last_name, language, join_date, download_count, last_activity, is_active FROM users WHERE user_id = ?', (user_id,)) as cursor:
             row = await cursor.fetchone()
             if row:
@@ -98,47 +43,419 @@ async def get_user(user_id: int) -> Optional[User]:
             return None
 
 
-async def add_download(download: Download):
-    async with aiosqlite.connect(DB_PATH) as db:
-        await db.execute('''
+async def update_user_language(user_id: int, language: str):
+    async with database.write() as db:
+        await db.execute('UPDATE users SET language = ? WHERE user_id = ?', (language, user_id))
+
+
+async def count_active_users() -> int:
+    async with database.read() as db:
+        cursor = await db.execute('SELECT COUNT(*) FROM users WHERE is_active = 1')
+        return (await cursor.fetchone())[0]
+
+
+async def add_download(download: Download) -> int:
+    async with database.write() as db:
+        cursor = await db.execute('''
             INSERT INTO downloads (user_id, url, platform, title, file_size, quality, status, created_at)
             VALUES (?, ?, ?, ?, ?, ?, ?, ?)
         ''', (download.user_id, download.url, download.platform.value, download.title, download.file_size, download.quality, download.status.value, download.created_at.isoformat()))
-        await db.commit()
+        return cursor.lastrowid
 
 
-async def update_download_status(download_id: int, status: str, completed_at: datetime = None):
-    async with aiosqlite.connect(DB_PATH) as db:
+async def update_download_status(download_id: int, status: str, completed_at: datetime = None, error_message: Optional[str] = None):
+    async with database.write() as db:
         await db.execute('''
             UPDATE downloads
-            SET status = ?, completed_at = ?
+            SET status = ?, completed_at = ?, error_message = ?
             WHERE id = ?
-        ''', (status, completed_at.isoformat() if completed_at else None, download_id))
-        await db.commit()
+        ''', (status, completed_at.isoformat() if completed_at else None, error_message, download_id))
+
+
+async def save_buffered_writes(
+    downloads: List[Download],
+    user_updates: List[Tuple[int, Optional[datetime], int]]
+):
+    async with database.write() as db:
+        if downloads:
+            await db.executemany('''
+                INSERT INTO downloads (user_id, url, platform, title, file_size, quality, status, created_at, completed_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', [
+                (download.user_id, download.url, download.platform.value, download.title, download.file_size, download.quality,
+                 download.status.value, download.created_at.isoformat(), download.completed_at.isoformat() if download.completed_at else None)
+                for download in downloads
+            ])
+        if user_updates:
+            await db.executemany('''
+                UPDATE users
+                SET download_count = download_count + ?, last_activity = COALESCE(?, last_activity)
+                WHERE user_id = ?
+            ''', [
+                (downloads_added, last_activity.isoformat() if last_activity else None, user_id)
+                for user_id, last_activity, downloads_added in user_updates
+            ])
+
+
+async def claim_next_download() -> Optional[Download]:
+    async with database.write() as db:
+        while True:
+            async with db.execute('SELECT id FROM downloads WHERE status = ? ORDER BY id LIMIT 1', (DownloadStatus.PENDING.value,)) as cursor:
+                row = await cursor.fetchone()
+            if not row:
+                return None
+
+            cursor = await db.execute(
+                'UPDATE downloads SET status = ? WHERE id = ? AND status = ?',
+                (DownloadStatus.DOWNLOADING.value, row[0], DownloadStatus.PENDING.value)
+            )
+            if cursor.rowcount != 1:
+                continue
+
+            async with db.execute('SELECT id, user_id, url, platform, title, file_size, quality, status, created_at FROM downloads WHERE id = ?', (row[0],)) as cursor:
+                job = await cursor.fetchone()
+            return Download(
+                id=job[0],
+                user_id=job[1],
+                url=job[2],
+                platform=Platform(job[3]) if job[3] in {p.value for p in Platform} else Platform.UNKNOWN,
+                title=job[4] or '',
+                file_size=job[5] or 0,
+                quality=job[6] or '',
+                status=DownloadStatus(job[7]),
+                created_at=datetime.fromisoformat(job[8]) if job[8] else None
+            )
+
+
+async def requeue_interrupted_downloads() -> Tuple[int, int]:
+    async with database.write() as db:
+        cursor = await db.execute(
+            'UPDATE downloads SET status = ?, completed_at = ?, error_message = ? WHERE status = ?',
+            (DownloadStatus.FAILED.value, datetime.now().isoformat(), 'Interrupted while processing or uploading', DownloadStatus.PROCESSING.value)
+        )
+        abandoned = cursor.rowcount
+        cursor = await db.execute(
+            'UPDATE downloads SET status = ? WHERE status = ?',
+            (DownloadStatus.PENDING.value, DownloadStatus.DOWNLOADING.value)
+        )
+        return cursor.rowcount, abandoned
+
+
+async def count_pending_downloads() -> int:
+    async with database.read() as db:
+        cursor = await db.execute('SELECT COUNT(*) FROM downloads WHERE status = ?', (DownloadStatus.PENDING.value,))
+        return (await cursor.fetchone())[0]
 
 
 async def add_analytics(analytics: Analytics):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with database.write() as db:
         await db.execute('''
             INSERT INTO analytics (date, total_downloads, successful_downloads, failed_downloads, unique_users, youtube_downloads, instagram_downloads)
             VALUES (?, ?, ?, ?, ?, ?, ?)
-        ''', (analytics.date.isoformat(), analytics.total_downloads, analytics.successful_downloads, analytics.failed_downloads, analytics.unique_users, analytics.youtube_downloads, analytics.instagram_downloads))
-        await db.commit()
+            ON CONFLICT (date) DO UPDATE SET
+                total_downloads = excluded.total_downloads,
+                successful_downloads = excluded.successful_downloads,
+                failed_downloads = excluded.failed_downloads,
+                unique_users = excluded.unique_users,
+                youtube_downloads = excluded.youtube_downloads,
+                instagram_downloads = excluded.instagram_downloads
+        ''', (_day(analytics.date), analytics.total_downloads, analytics.successful_downloads, analytics.failed_downloads, analytics.unique_users, analytics.youtube_downloads, analytics.instagram_downloads))
 
 
 async def get_analytics(date: datetime) -> Analytics:
-    async with aiosqlite.connect(DB_PATH) as db:
-        async with db.execute('SELECT * FROM analytics WHERE date = ?', (date.isoformat(),)) as cursor:
+    async with database.read() as db:
+        async with db.execute(f'SELECT {ANALYTICS_COLUMNS} FROM analytics WHERE date = ?', (_day(date),)) as cursor:
             row = await cursor.fetchone()
             if row:
-                return Analytics(**row)
+                return _row_to_analytics(row)
             return Analytics(date=date)
 
 
+async def get_analytics_range(start: datetime, end: Optional[datetime] = None) -> List[Analytics]:
+    query = f'SELECT {ANALYTICS_COLUMNS} FROM analytics WHERE date >= ?'
+    params = [_day(start)]
+    if end is not None:
+        query += ' AND date < ?'
+        params.append(_day(end))
+
+    async with database.read() as db:
+        async with db.execute(query + ' ORDER BY date', params) as cursor:
+            return [_row_to_analytics(row) for row in await cursor.fetchall()]
+
+
+async def get_last_analytics_date() -> Optional[datetime]:
+    async with database.read() as db:
+        cursor = await db.execute('SELECT MAX(date) FROM analytics')
+        row = await cursor.fetchone()
+        return datetime.fromisoformat(row[0]) if row and row[0] else None
+
+
+async def rollup_analytics(start: Optional[datetime], end: datetime) -> int:
+    async with database.write() as db:
+        cursor = await db.execute('''
+            INSERT INTO analytics (date, total_downloads, successful_downloads, failed_downloads, unique_users, youtube_downloads, instagram_downloads)
+            SELECT date(created_ts, 'unixepoch') AS day,
+                   COUNT(*),
+                   SUM(status = ?),
+                   SUM(status = ?),
+                   COUNT(DISTINCT user_id),
+                   SUM(platform = ?),
+                   SUM(platform = ?)
+            FROM downloads
+            WHERE created_ts >= ? AND created_ts < ?
+            GROUP BY day
+            ON CONFLICT (date) DO UPDATE SET
+                total_downloads = excluded.total_downloads,
+                successful_downloads = excluded.successful_downloads,
+                failed_downloads = excluded.failed_downloads,
+                unique_users = excluded.unique_users,
+                youtube_downloads = excluded.youtube_downloads,
+                instagram_downloads = excluded.instagram_downloads
+        ''', (
+            DownloadStatus.COMPLETED.value, DownloadStatus.FAILED.value,
+            Platform.YOUTUBE.value, Platform.INSTAGRAM.value,
+            epoch(start) if start else 0, epoch(end)
+        ))
+        return cursor.rowcount
+
+
+async def get_download_activity(start: datetime, end: datetime) -> List[Tuple[int, str, str]]:
+    async with database.read() as db:
+        cursor = await db.execute(
+            'SELECT user_id, platform, status FROM downloads WHERE created_ts >= ? AND created_ts < ?',
+            (epoch(start), epoch(end))
+        )
+        return await cursor.fetchall()
+
+
+async def get_user_counts(today: datetime) -> Tuple[int, int, int]:
+    async with database.read() as db:
+        cursor = await db.execute(
+            'SELECT COUNT(*), COALESCE(SUM(is_active = 1), 0), COALESCE(SUM(join_ts >= ?), 0) FROM users',
+            (epoch(today),)
+        )
+        return await cursor.fetchone()
+
+
 async def add_broadcast_message(message: BroadcastMessage):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with database.write() as db:
+        await db.execute('''
+            INSERT INTO broadcast_messages (text, media_type, media_file_id, button_text, button_url, created_at, sent_count)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', (message.text, message.media_type, message.media_file_id, message.button_text, message.button_url, message.created_at.isoformat(), message.sent_count))
+
+
+async def create_broadcast(broadcast: Broadcast) -> int:
+    async with database.write() as db:
+        cursor = await db.execute('''
+            INSERT INTO broadcasts (source_chat_id, source_message_id, text, caption_entities, media_type, media_file_id,
+                                    button_text, button_url, admin_chat_id, status_message_id, status, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (broadcast.source_chat_id, broadcast.source_message_id, broadcast.text, broadcast.caption_entities,
+              broadcast.media_type, broadcast.media_file_id, broadcast.button_text, broadcast.button_url,
+              broadcast.admin_chat_id, broadcast.status_message_id, broadcast.status.value,
+              (broadcast.created_at or datetime.now()).isoformat()))
+        broadcast_id = cursor.lastrowid
+
+        cursor = await db.execute('''
+            INSERT INTO broadcast_deliveries (broadcast_id, user_id, status)
+            SELECT ?, user_id, ? FROM users WHERE is_active = 1
+        ''', (broadcast_id, DeliveryStatus.PENDING.value))
+        await db.execute('UPDATE broadcasts SET total = ? WHERE id = ?', (cursor.rowcount, broadcast_id))
+        return broadcast_id
+
+
+async def get_broadcast(broadcast_id: int) -> Optional[Broadcast]:
+    async with database.read() as db:
+        async with db.execute(f'SELECT {BROADCAST_COLUMNS} FROM broadcasts WHERE id = ?', (broadcast_id,)) as cursor:
+            row = await cursor.fetchone()
+            return _row_to_broadcast(row) if row else None
+
+
+async def get_running_broadcasts() -> List[Broadcast]:
+    async with database.read() as db:
+        async with db.execute(f'SELECT {BROADCAST_COLUMNS} FROM broadcasts WHERE status = ? ORDER BY id', (BroadcastStatus.RUNNING.value,)) as cursor:
+            return [_row_to_broadcast(row) for row in await cursor.fetchall()]
+
+
+async def finish_broadcast(broadcast_id: int):
+    async with database.write() as db:
+        await db.execute(
+            'UPDATE broadcasts SET status = ?, finished_at = ? WHERE id = ?',
+            (BroadcastStatus.COMPLETED.value, datetime.now().isoformat(), broadcast_id)
+        )
+
+
+async def get_pending_deliveries(broadcast_id: int, after_user_id: int, limit: int) -> List[int]:
+    async with database.read() as db:
+        cursor = await db.execute('''
+            SELECT user_id FROM broadcast_deliveries
+            WHERE broadcast_id = ? AND status = ? AND user_id > ?
+            ORDER BY user_id
+            LIMIT ?
+        ''', (broadcast_id, DeliveryStatus.PENDING.value, after_user_id, limit))
+        return [row[0] for row in await cursor.fetchall()]
+
+
+async def save_delivery_results(broadcast_id: int, results: List[Tuple[int, str, Optional[str]]]):
+    blocked = [(user_id,) for user_id, status, _ in results if status == DeliveryStatus.BLOCKED.value]
+
+    async with database.write() as db:
+        await db.executemany(
+            'UPDATE broadcast_deliveries SET status = ?, error = ? WHERE broadcast_id = ? AND user_id = ?',
+            [(status, error, broadcast_id, user_id) for user_id, status, error in results]
+        )
+        if blocked:
+            await db.executemany('UPDATE users SET is_active = 0 WHERE user_id = ?', blocked)
+
+
+async def count_deliveries(broadcast_id: int) -> Dict[str, int]:
+    async with database.read() as db:
+        cursor = await db.execute(
+            'SELECT status, COUNT(*) FROM broadcast_deliveries WHERE broadcast_id = ? GROUP BY status',
+            (broadcast_id,)
+        )
+        return {row[0]: row[1] for row in await cursor.fetchall()}
+
+
+async def get_cached_file(media_id: str, quality: str, route: str) -> Optional[CachedFile]:
+    async with database.read() as db:
+        async with db.execute('SELECT media_id, quality, route, file_id, media_type, file_size, hits, created_at, last_hit FROM file_cache WHERE media_id = ? AND quality = ? AND route = ?', (media_id, quality, route)) as cursor:
+            row = await cursor.fetchone()
+            if row:
+                return _row_to_cached_file(row)
+            return None
+
+
+async def save_cached_file(cached: CachedFile):
+    async with database.write() as db:
+        await db.execute('''
+            INSERT INTO file_cache (media_id, quality, route, file_id, media_type, file_size, hits, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, 0, ?)
+            ON CONFLICT (media_id, quality, route) DO UPDATE SET
+                file_id = excluded.file_id,
+                media_type = excluded.media_type,
+                file_size = excluded.file_size,
+                created_at = excluded.created_at
+        ''', (cached.media_id, cached.quality, cached.route, cached.file_id, cached.media_type, cached.file_size, (cached.created_at or datetime.now()).isoformat()))
+
+
+async def record_cache_hit(media_id: str, quality: str, route: str):
+    async with database.write() as db:
+        await db.execute('''
+            UPDATE file_cache
+            SET hits = hits + 1, last_hit = ?
+            WHERE media_id = ? AND quality = ? AND route = ?
+        ''', (datetime.now().isoformat(), media_id, quality, route))
+
+
+async def delete_cached_file(media_id: Optional[str] = None, quality: Optional[str] = None, route: Optional[str] = None) -> int:
+    conditions = []
+    params = []
+    for column, value in (('media_id', media_id), ('quality', quality), ('route', route)):
+        if value is not None:
+            conditions.append(f'{column} = ?')
+            params.append(value)
+
+    query = 'DELETE FROM file_cache'
+    if conditions:
+        query += ' WHERE ' + ' AND '.join(conditions)
+
+    async with database.write() as db:
+        cursor = await db.execute(query, params)
+        return cursor.rowcount
+
+
+async def get_top_cached_files(limit: int = 10) -> List[CachedFile]:
+    async with database.read() as db:
+        async with db.execute('SELECT media_id, quality, route, file_id, media_type, file_size, hits, created_at, last_hit FROM file_cache ORDER BY hits DESC LIMIT ?', (limit,)) as cursor:
+            return [_row_to_cached_file(row) for row in await cursor.fetchall()]
+
+
+async def count_cached_files() -> int:
+    async with database.read() as db:
+        cursor = await db.execute('SELECT COUNT(*) FROM file_cache')
+        return (await cursor.fetchone())[0]
+
+
+async def get_cached_metadata(cache_key: str) -> Optional[Tuple[str, float]]:
+    async with database.read() as db:
+        async with db.execute('SELECT data, expires_at FROM metadata_cache WHERE cache_key = ?', (cache_key,)) as cursor:
+            row = await cursor.fetchone()
+            return (row[0], row[1]) if row else None
+
+
+async def save_cached_metadata(cache_key: str, platform: str, data: str, expires_at: float):
+    async with database.write() as db:
         await db.execute('''
-            INSERT INTO broadcast_messages (text, media_type, media_file_id, button_text, button_url, created_at)
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', (message.text, message.media_type, message.media_file_id, message.button_text, message.button_url, message.created_at.isoformat()))
-        await db.commit()
+            INSERT OR REPLACE INTO metadata_cache (cache_key, platform, data, expires_at)
+            VALUES (?, ?, ?, ?)
+        ''', (cache_key, platform, data, expires_at))
+
+
+async def delete_expired_metadata(now: float) -> int:
+    async with database.write() as db:
+        cursor = await db.execute('DELETE FROM metadata_cache WHERE expires_at < ?', (now,))
+        return cursor.rowcount
+
+
+ANALYTICS_COLUMNS = (
+    'id, date, total_downloads, successful_downloads, failed_downloads, unique_users, youtube_downloads, instagram_downloads'
+)
+
+
+def _day(value: datetime) -> str:
+    return value.strftime('%Y-%m-%d')
+
+
+def _row_to_analytics(row) -> Analytics:
+    return Analytics(
+        id=row[0],
+        date=datetime.fromisoformat(row[1]),
+        total_downloads=row[2] or 0,
+        successful_downloads=row[3] or 0,
+        failed_downloads=row[4] or 0,
+        unique_users=row[5] or 0,
+        youtube_downloads=row[6] or 0,
+        instagram_downloads=row[7] or 0
+    )
+
+
+BROADCAST_COLUMNS = (
+    'id, source_chat_id, source_message_id, text, caption_entities, media_type, media_file_id, '
+    'button_text, button_url, admin_chat_id, status_message_id, status, total, created_at, finished_at'
+)
+
+
+def _row_to_broadcast(row) -> Broadcast:
+    return Broadcast(
+        id=row[0],
+        source_chat_id=row[1],
+        source_message_id=row[2],
+        text=row[3] or '',
+        caption_entities=row[4],
+        media_type=row[5],
+        media_file_id=row[6],
+        button_text=row[7],
+        button_url=row[8],
+        admin_chat_id=row[9],
+        status_message_id=row[10],
+        status=BroadcastStatus(row[11]),
+        total=row[12] or 0,
+        created_at=datetime.fromisoformat(row[13]) if row[13] else None,
+        finished_at=datetime.fromisoformat(row[14]) if row[14] else None
+    )
+
+
+def _row_to_cached_file(row) -> CachedFile:
+    return CachedFile(
+        media_id=row[0],
+        quality=row[1],
+        route=row[2],
+        file_id=row[3],
+        media_type=row[4] or 'video',
+        file_size=row[5] or 0,
+        hits=row[6] or 0,
+        created_at=datetime.fromisoformat(row[7]) if row[7] else None,
+        last_hit=datetime.fromisoformat(row[8]) if row[8] else None
+    )
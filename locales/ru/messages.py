@@ -37,12 +37,21 @@ MESSAGES = {
     "stats_today": "📅 Сегодня: {count}\n",
     "health_title": "💚 Состояние бота\n\n",
     "health_uptime": "⏱️ Время работы: {time}\n",
+    "health_cpu": "🖥 Процессор: {cpu}\n",
     "health_memory": "💾 Память: {memory}\n",
     "health_disk": "💽 Диск: {disk}\n",
+    "health_loop": "🔁 Задержка event loop: {lag:.1f}мс {trend}, открытых файлов: {fds}\n",
     "health_downloads": "⬇️ Активные загрузки: {count}\n",
+    "health_queue": "📥 Загрузки в очереди: {count}\n",
+    "health_temp": "🗂 Временные файлы: {used} / {quota}\n",
+    "health_outbox": "📤 Исходящие: {queued} в очереди, {superseded} устаревших правок пропущено, {flood} flood wait\n",
+    "health_ffmpeg": "🎞 FFmpeg: {running}/{slots} в работе, {queued} в очереди, ожидание {wait:.1f}с, кодирование {encode:.1f}с\n",
     "broadcast_start": "📢 Отправка объявления\n\n1️⃣ Отправьте текст (markdown поддерживается)\n2️⃣ Медиафайл (опционально)\n3️⃣ Кнопка и ссылка (опционально)",
+    "broadcast_media_invalid": "⚠️ Отправьте фото, видео или анимацию, либо /skip.",
     "broadcast_confirm": "✅ Отправить объявление {count} пользователям?",
     "broadcast_sent": "📤 Объявление отправлено {sent}/{total} пользователям",
+    "broadcast_started": "📢 Рассылка запущена. Прогресс будет отображаться здесь.",
+    "broadcast_progress": "📤 Отправка объявления\n\n• Отправлено: {sent}\n• Ошибки: {failed}\n• Заблокировали: {blocked}\n• Всего: {total}",
     "user_new": "🆕 Новый пользователь: {name} (@{username})",
     "language_select": "🌐 Выберите язык:",
     "language_uz": "🇺🇿 O'zbek",
@@ -1,7 +1,7 @@
 MESSAGES = {
     "start": "FlashSaver Professional Video Downloader\n\nSalom! Men sizga YouTube va Instagram platformalaridan professional darajada video yuklash xizmatini taqdim etaman.\n\nAsosiy imkoniyatlar:\n\n• YouTube videolar, shorts va to'liq playlistlar\n• Instagram postlar, reels, IGTV va stories\n• Yuqori sifatli audio ajratib olish\n• Turli formatlar va sifatlarda yuklash\n• 2GB gacha fayl hajmini qo'llab-quvvatlash\n• Tezkor va xavfsiz yuklash\n\nBoshlab berish uchun video havolasini yuboring yoki /help buyrug'i bilan batafsil ma'lumot oling.",
     
-    "help": "FlashSaver - Batafsil Qo'llanma\n\nFoydalanish bo'yicha qadamlar:\n\n1. YouTube yoki Instagram video havolasini yuboring\n2. Ko'rsatilgan sifat variantlaridan birini tanlang\n3. Yuklab olish jarayonini kuzating\n4. Tayyor faylni qabul qiling\n\nQo'llab-quvvatlanadigan platformalar:\n• YouTube: videolar, shorts, playlistlar\n• Instagram: postlar, reels, IGTV, stories\n\nSifat tanlovlari:\n• Eng yuqori sifat - Orijinal sifat (eng yaxshi)\n• Yuqori sifat - 720p HD formatda\n• O'rta sifat - 480p standart sifat\n• Past sifat - 360p (tezkor yuklash uchun)\n• Faqat audio - MP3 formatda\n\nMuhim eslatmalar:\n- Katta fayllar ko'proq vaqt talab qiladi\n- Internet tezligingiz yuklash tezligiga ta'sir qiladi\n- Mualliflik huquqlariga hurmat bilan munosabat bildiring\n\nQo'shimcha yordam: {support}",
+    "help": "FlashSaver - Batafsil Qo'llanma\n\nFoydalanish bo'yicha qadamlar:\n\n1. YouTube yoki Instagram video havolasini yuboring\n2. Ko'rsatilgan sifat variantlaridan birini tanlang\n3. Yuklab olish jarayonini kuzating\n4. Tayyor faylni qabul qiling\n\nQo'llab-quvvatlanadigan platformalar:\n• YouTube: videolar, shorts, playlistlar\n• Instagram: postlar, reels, IGTV, stories\n\nSifat tanlovlari:\n• Eng yuqori sifat - Orijinal sifat (eng yaxshi)\n• Yuqori sifat - 720p HD formatda\n• O'rta sifat - 480p standart sifat\n• Past sifat - 360p (tezkor yuklash uchun)\n• Faqat audio - M4A yoki Opus formatda\n\nMuhim eslatmalar:\n- Katta fayllar ko'proq vaqt talab qiladi\n- Internet tezligingiz yuklash tezligiga ta'sir qiladi\n- Mualliflik huquqlariga hurmat bilan munosabat bildiring\n\nQo'shimcha yordam: {support}",
     
     "processing": "Video ma'lumotlari tahlil qilinmoqda va tekshirilmoqda.\nIltimos, bir oz sabr qiling...",
     
@@ -29,7 +29,7 @@ MESSAGES = {
     "quality_high": "Yuqori sifat (720p HD)",
     "quality_medium": "O'rta sifat (480p)",
     "quality_low": "Past sifat (360p)",
-    "quality_audio": "Faqat audio (MP3)",
+    "quality_audio": "Faqat audio",
     
     "video_info": "Video haqida ma'lumot\n\nNomi: {title}\nKanal: {channel}\nDavomiyligi: {duration} soniya\nKo'rishlar: {views}\nChiqarilgan: {date}\n\nKerakli sifatni tanlang:",
     
@@ -51,6 +51,8 @@ MESSAGES = {
     # Broadcast system
     "broadcast_step1": "Ommaviy xabar yuborish - 1-qadam\n\nAvval media fayl yuboring (rasm, video, animatsiya).\n\nAgar media kerak bo'lmasa, /skip buyrug'ini yuboring.",
     
+    "broadcast_media_invalid": "Faqat rasm, video yoki animatsiya yuboring yoki /skip buyrug'ini yuboring.",
+    
     "broadcast_step2": "Ommaviy xabar yuborish - 2-qadam\n\nEndi xabar matnini yuboring.\n\nMarkdown formatidan foydalanishingiz mumkin:\n• *qalin matn*\n• _kursiv matn_\n• `kod`\n• [havola matni](URL)",
     
     "broadcast_step3": "Ommaviy xabar yuborish - 3-qadam\n\nInline tugma qo'shmoqchimisiz?\n\nFormat: Tugma matni | URL\nMisol: Rasmiy kanal | https://t.me/example\n\nAgar kerak bo'lmasa, /skip yuboring.",
@@ -59,6 +61,10 @@ MESSAGES = {
     
     "broadcast_sent": "Xabar yuborish yakunlandi\n\nNatijalar:\n• Muvaffaqiyatli yuborildi: {sent}\n• Xatolik yuz berdi: {failed}\n• Jami foydalanuvchilar: {total}",
     
+    "broadcast_started": "Xabar yuborish boshlandi. Jarayon shu yerda ko'rsatiladi.",
+    
+    "broadcast_progress": "Xabar yuborilmoqda\n\n• Yuborildi: {sent}\n• Xatolik: {failed}\n• Bloklangan: {blocked}\n• Jami: {total}",
+    
     # Statistics
     "stats_title": "Bot statistikasi\n\n",
     "stats_users": "Foydalanuvchilar: {count}\n",
@@ -70,9 +76,15 @@ MESSAGES = {
     # Health status
     "health_title": "Tizim holati\n\n",
     "health_uptime": "Ishlash vaqti: {time}\n",
+    "health_cpu": "Protsessor: {cpu}\n",
     "health_memory": "Xotira ishlatilishi: {memory}\n",
     "health_disk": "Disk ishlatilishi: {disk}\n",
+    "health_loop": "Event loop kechikishi: {lag:.1f}ms {trend}, ochiq fayllar: {fds}\n",
     "health_downloads": "Faol yuklovlar: {count}\n",
+    "health_queue": "Navbatdagi yuklovlar: {count}\n",
+    "health_temp": "Vaqtinchalik fayllar: {used} / {quota}\n",
+    "health_outbox": "Chiquvchi xabarlar: {queued} navbatda, {superseded} eskirgan tahrir tashlandi, {flood} flood wait\n",
+    "health_ffmpeg": "FFmpeg: {running}/{slots} ishlamoqda, {queued} navbatda, kutish {wait:.1f}s, kodlash {encode:.1f}s\n",
     
     # Language
     "language_select": "Tilni tanlang:",
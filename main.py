@@ -1,7 +1,7 @@
 import asyncio
+import json
 import os
 import time
-import psutil
 from datetime import datetime, timedelta
 from typing import Dict, Optional
 
@@ -15,13 +15,28 @@ from aiogram.client.default import DefaultBotProperties
 from aiogram.exceptions import TelegramUnauthorizedError, TelegramBadRequest
 
 from utils.i18n import i18n
-from utils.constants import BOT_TOKEN, ADMIN_ID, SUPPORT_USERNAME
-from utils.helpers import detect_platform, validate_url, format_file_size, get_progress_bar, format_duration
-from database.operations import init_db, add_user, get_user, add_download, update_download_status
-from database.models import User, Download, BroadcastMessage
+from utils.constants import BOT_TOKEN, ADMIN_ID, SUPPORT_USERNAME, Platform, DownloadStatus, Quality
+from utils.helpers import detect_platform, validate_url, format_file_size, get_progress_bar, format_duration, get_media_id, sparkline
+from database.connection import database
+from database.operations import (
+    init_db, count_active_users, update_download_status
+)
+from database.models import User, Download, Broadcast
 from core.downloader import DownloadManager
 from core.router import FileRouter
 from core.youtube_api import YouTubeAPI
+from core.job_queue import DownloadQueue
+from core.storage import storage_manager
+from core.artifacts import artifacts
+from core.user_cache import user_cache
+from core.write_buffer import write_buffer
+from core.live_stats import live_stats
+from core.system_monitor import system_sampler
+from core.ffmpeg_pool import ffmpeg_scheduler
+from core.send_scheduler import send_scheduler
+from core.progress import progress_bus, STAGE_DOWNLOAD, STAGE_COMPRESS, STAGE_UPLOAD
+from admin.broadcast import BroadcastEngine
+from admin.charts import chart_renderer
 from bot.keyboards.inline import (
     get_quality_keyboard, get_admin_keyboard, get_language_keyboard,
     get_back_keyboard, get_pagination_keyboard, get_broadcast_confirm_keyboard
@@ -46,22 +61,29 @@ def validate_bot_token(token: str) -> bool:
     except ValueError:
         return False
 
-if not validate_bot_token(BOT_TOKEN):
-    logger.error("Invalid bot token format. Check your BOT_TOKEN in constants.py")
-    exit(1)
-
-try:
-    bot = Bot(token=BOT_TOKEN, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
-except Exception as e:
-    logger.error(f"Failed to create bot instance: {e}")
-    exit(1)
-
 storage = MemoryStorage()
 dp = Dispatcher(storage=storage)
 
-download_manager = DownloadManager()
-file_router = FileRouter(bot)
-youtube_api = YouTubeAPI()
+bot: Optional[Bot] = None
+download_manager: Optional[DownloadManager] = None
+file_router: Optional[FileRouter] = None
+broadcast_engine: Optional[BroadcastEngine] = None
+youtube_api: Optional[YouTubeAPI] = None
+download_queue: Optional[DownloadQueue] = None
+
+QUALITY_MAP = {
+    'best': Quality.BEST,
+    '720p': Quality.HIGH,
+    '480p': Quality.MEDIUM,
+    '360p': Quality.LOW,
+    'audio': Quality.AUDIO
+}
+
+PROGRESS_MESSAGES = {
+    STAGE_DOWNLOAD: 'downloading',
+    STAGE_COMPRESS: 'compressing',
+    STAGE_UPLOAD: 'uploading'
+}
 
 active_downloads: Dict[int, Dict] = {}
 start_time = time.time()
@@ -108,13 +130,10 @@ async def start_handler(message: Message):
     )
 
     try:
-        existing = await get_user(user.id)
-        if not existing:
-            await add_user(new_user)
+        if await user_cache.add(new_user):
             await notify_admin_new_user(user)
-    except:
-        await add_user(new_user)
-        await notify_admin_new_user(user)
+    except Exception as e:
+        logger.error(f"Failed to register user {user.id}: {e}")
 
     lang = new_user.language
     greeting = i18n.get('start', lang)
@@ -122,11 +141,7 @@ async def start_handler(message: Message):
     await message.answer(greeting, reply_markup=get_main_menu_keyboard(lang))
 
 async def help_handler(message: Message):
-    try:
-        user_data = await get_user(message.from_user.id)
-        lang = user_data.language
-    except:
-        lang = 'uz'
+    lang = await user_cache.language(message.from_user.id)
 
     help_text = i18n.get('help', lang, support=SUPPORT_USERNAME)
     await message.answer(help_text)
@@ -138,12 +153,37 @@ async def admin_handler(message: Message):
     admin_text = i18n.get('admin_panel', 'uz')
     await message.answer(admin_text, reply_markup=get_admin_menu_keyboard('uz'))
 
+async def cache_handler(message: Message):
+    if message.from_user.id != ADMIN_ID:
+        return
+
+    from admin.panel import AdminPanel
+    admin_panel = AdminPanel(bot)
+
+    await message.answer(await admin_panel.get_cache_report())
+
+async def cache_clear_handler(message: Message):
+    if message.from_user.id != ADMIN_ID:
+        return
+
+    from core.file_cache import file_cache
+
+    args = message.text.split(maxsplit=1)
+    if len(args) < 2:
+        await message.answer("Usage: /cache_clear <url|media_id|all>")
+        return
+
+    target = args[1].strip()
+    if target == 'all':
+        removed = await file_cache.invalidate()
+    else:
+        media_id = get_media_id(target) if validate_url(target) else target
+        removed = await file_cache.invalidate(media_id)
+
+    await message.answer(f"Cache entries removed: {removed}")
+
 async def settings_handler(message: Message):
-    try:
-        user_data = await get_user(message.from_user.id)
-        lang = user_data.language
-    except:
-        lang = 'uz'
+    lang = await user_cache.language(message.from_user.id)
 
     await message.answer(i18n.get('language_select', lang), reply_markup=get_language_keyboard())
 
@@ -169,56 +209,47 @@ Contact: @yordam_42"""
     await message.answer(about_text)
 
 async def commands_handler(message: Message):
-    try:
-        user_data = await get_user(message.from_user.id)
-        lang = user_data.language
-    except:
-        lang = 'uz'
+    lang = await user_cache.language(message.from_user.id)
 
     await message.answer(i18n.get('commands_list', lang))
 
 async def url_handler(message: Message):
     url = message.text.strip()
+    lang = await user_cache.language(message.from_user.id)
 
     if not validate_url(url):
-        try:
-            user_data = await get_user(message.from_user.id)
-            lang = user_data.language
-        except:
-            lang = 'uz'
         await message.answer(i18n.get('error_invalid_url', lang))
         return
 
     platform = detect_platform(url)
     if platform.value == "unknown":
-        try:
-            user_data = await get_user(message.from_user.id)
-            lang = user_data.language
-        except:
-            lang = 'uz'
         await message.answer(i18n.get('error_not_supported', lang))
         return
 
-    try:
-        user_data = await get_user(message.from_user.id)
-        lang = user_data.language
-    except:
-        lang = 'uz'
-
     processing_msg = await message.answer(i18n.get('processing', lang), reply_markup=remove_keyboard())
 
+    info_task = None
     try:
         if platform.value == "youtube":
             video_id = youtube_api.extract_video_id(url)
             api_info = None
 
             if video_id and youtube_api.youtube:
+                info_task = asyncio.create_task(download_manager.get_video_info(url))
                 try:
                     api_info = await youtube_api.get_video_info(video_id)
                 except Exception as e:
                     logger.warning(f"YouTube API failed, using yt-dlp: {e}")
 
             if api_info:
+                try:
+                    media_info = await info_task
+                except Exception as e:
+                    logger.warning(f"Format extraction failed for {url}: {e}")
+                    api_info = None
+
+            if api_info:
+                quality_keyboard = get_quality_keyboard(lang, download_manager.quality_sizes(media_info, file_router.size_limit()))
                 duration_formatted = format_duration(api_info['duration'])
                 views_formatted = youtube_api.format_number(api_info['views'])
 
@@ -242,7 +273,7 @@ async def url_handler(message: Message):
                             await message.answer_photo(
                                 photo=FSInputFile(thumbnail_path),
                                 caption=video_info_text,
-                                reply_markup=get_quality_keyboard(lang)
+                                reply_markup=quality_keyboard
                             )
                             try:
                                 os.remove(thumbnail_path)
@@ -250,42 +281,47 @@ async def url_handler(message: Message):
                                 pass
                         except Exception as e:
                             logger.warning(f"Failed to send photo: {e}")
-                            await processing_msg.edit_text(video_info_text, reply_markup=get_quality_keyboard(lang))
+                            await processing_msg.edit_text(video_info_text, reply_markup=quality_keyboard)
                     else:
-                        await processing_msg.edit_text(video_info_text, reply_markup=get_quality_keyboard(lang))
+                        await processing_msg.edit_text(video_info_text, reply_markup=quality_keyboard)
                 else:
-                    await processing_msg.edit_text(video_info_text, reply_markup=get_quality_keyboard(lang))
+                    await processing_msg.edit_text(video_info_text, reply_markup=quality_keyboard)
 
                 active_downloads[message.from_user.id] = {
                     'url': url,
                     'platform': platform,
                     'title': api_info['title'],
-                    'message_id': processing_msg.message_id
+                    'message_id': processing_msg.message_id,
+                    'info': media_info.info,
+                    'info_expires_at': media_info.info_expires_at
                 }
                 return
             else:
                 logger.info("Using yt-dlp for YouTube video info")
 
         try:
-            media_info = await download_manager.get_video_info(url)
+            media_info = await (info_task or download_manager.get_video_info(url))
 
             video_title = media_info.title[:100] + '...' if len(media_info.title) > 100 else media_info.title
             info_text = f"📹 {video_title}\n\n" + i18n.get('quality_select', lang)
+            quality_keyboard = get_quality_keyboard(lang, download_manager.quality_sizes(media_info, file_router.size_limit()))
 
             try:
-                await processing_msg.edit_text(info_text, reply_markup=get_quality_keyboard(lang))
+                await processing_msg.edit_text(info_text, reply_markup=quality_keyboard)
             except:
                 try:
                     await processing_msg.delete()
                 except:
                     pass
-                processing_msg = await message.answer(info_text, reply_markup=get_quality_keyboard(lang))
+                processing_msg = await message.answer(info_text, reply_markup=quality_keyboard)
 
             active_downloads[message.from_user.id] = {
                 'url': url,
                 'platform': platform,
                 'title': media_info.title,
-                'message_id': processing_msg.message_id
+                'message_id': processing_msg.message_id,
+                'info': media_info.info,
+                'info_expires_at': media_info.info_expires_at
             }
 
         except Exception as e:
@@ -311,6 +347,45 @@ async def url_handler(message: Message):
         except:
             await message.answer(i18n.get('error_processing', lang))
 
+async def build_caption(title: str, quality: str) -> str:
+    try:
+        bot_me = await bot.get_me()
+        bot_username = bot_me.username or "FlashSaver"
+    except:
+        bot_username = "FlashSaver"
+
+    title = title[:80] + '...' if len(title) > 80 else title
+    caption = f"📥 {title}\n\n🤖 @{bot_username}"
+
+    if quality != 'best':
+        caption += f" | {quality.upper()}"
+
+    return caption
+
+async def record_download(user_id: int, download_data: Dict, quality: str, success: bool):
+    try:
+        platform_value = download_data['platform']
+        if not isinstance(platform_value, Platform):
+            platform_value = detect_platform(download_data['url'])
+
+        download_record = Download(
+            user_id=user_id,
+            url=download_data['url'],
+            platform=platform_value,
+            title=download_data.get('title', ''),
+            quality=quality,
+            status=DownloadStatus.COMPLETED if success else DownloadStatus.FAILED,
+            created_at=datetime.now()
+        )
+        write_buffer.add_download(download_record)
+        live_stats.record_download(user_id, platform_value)
+        live_stats.record_result(download_record.status)
+        if success:
+            write_buffer.record_completed_download(user_id)
+    except Exception as e:
+        logger.error(f"Failed to record download: {e}")
+        logger.debug(f"Platform data: {download_data.get('platform')}, Type: {type(download_data.get('platform'))}")
+
 async def quality_callback(callback: CallbackQuery):
     quality = callback.data.split(':')[1]
     user_id = callback.from_user.id
@@ -322,11 +397,7 @@ async def quality_callback(callback: CallbackQuery):
             pass
         return
 
-    try:
-        user_data = await get_user(user_id)
-        lang = user_data.language
-    except:
-        lang = 'uz'
+    lang = await user_cache.language(user_id)
 
     download_data = active_downloads[user_id]
 
@@ -335,47 +406,93 @@ async def quality_callback(callback: CallbackQuery):
     except:
         pass
 
+    caption = await build_caption(download_data['title'], quality)
+    media_id = get_media_id(download_data['url'])
+
+    if media_id and await file_router.send_cached(user_id, media_id, quality, caption):
+        await record_download(user_id, download_data, quality, True)
+        del active_downloads[user_id]
+        return
+
     progress_msg = await callback.message.answer(i18n.get('downloading', lang, progress=0))
 
+    platform_value = download_data['platform']
+    if not isinstance(platform_value, Platform):
+        platform_value = detect_platform(download_data['url'])
+
+    job_id = await download_queue.enqueue(
+        Download(
+            user_id=user_id,
+            url=download_data['url'],
+            platform=platform_value,
+            title=download_data['title'],
+            quality=quality
+        ),
+        {
+            'progress_msg': progress_msg,
+            'lang': lang,
+            'info': download_data.get('info'),
+            'info_expires_at': download_data.get('info_expires_at', 0)
+        }
+    )
+    logger.info(f"Queued download job {job_id}: {download_data['url']} with quality: {quality}")
+
+    del active_downloads[user_id]
+
+async def process_download_job(job: Download, context: Dict) -> bool:
+    user_id = job.user_id
+    quality = job.quality
+
+    lang = context.get('lang')
+    if not lang:
+        lang = await user_cache.language(user_id)
+
+    progress_msg = context.get('progress_msg')
+    if not progress_msg:
+        progress_msg = await bot.send_message(user_id, i18n.get('downloading', lang, progress=0))
+
+    caption = await build_caption(job.title, quality)
+    media_id = get_media_id(job.url)
+    file_path = None
+    stream_upload = None
+    handed_off = False
+
     try:
         download_start_time = time.time()
-        last_update_time = 0
 
-        async def progress_callback(progress):
-            nonlocal last_update_time
-            current_time = time.time()
+        async def render_progress(stage, progress):
+            try:
+                await progress_msg.edit_text(
+                    i18n.get(PROGRESS_MESSAGES[stage], lang, progress=int(progress)) + "\n" +
+                    get_progress_bar(progress)
+                )
+            except Exception as e:
+                if "message is not modified" not in str(e).lower():
+                    logger.debug(f"Progress update error: {e}")
 
-            if current_time - last_update_time > 2 or int(progress) % 10 == 0:
-                try:
-                    await progress_msg.edit_text(
-                        i18n.get('downloading', lang, progress=int(progress)) + "\n" +
-                        get_progress_bar(progress)
-                    )
-                    last_update_time = current_time
-                except Exception as e:
-                    if "message is not modified" not in str(e).lower():
-                        logger.debug(f"Progress update error: {e}")
-
-        from utils.constants import Quality
-        quality_map = {
-            'best': Quality.BEST,
-            '720p': Quality.HIGH,
-            '480p': Quality.MEDIUM,
-            '360p': Quality.LOW,
-            'audio': Quality.AUDIO
-        }
+        logger.info(f"Starting download job {job.id}: {job.url} with quality: {quality}")
 
-        logger.info(f"Starting download: {download_data['url']} with quality: {quality}")
+        download_quality = QUALITY_MAP.get(quality, Quality.BEST)
+        size_limit = file_router.size_limit()
+        plan = await download_manager.plan_download(job.url, download_quality, context.get('info'), size_limit)
+        stream_upload = file_router.create_stream_upload(plan)
 
         file_path = await download_manager.download_video(
-            download_data['url'],
-            quality_map.get(quality, Quality.BEST),
-            progress_callback
+            job.url,
+            download_quality,
+            render_progress,
+            info=context.get('info'),
+            info_expires_at=context.get('info_expires_at', 0),
+            stream_upload=stream_upload,
+            size_limit=size_limit,
+            plan=plan
         )
 
         download_time = time.time() - download_start_time
         logger.info(f"Download completed in {download_time:.2f} seconds")
 
+        await update_download_status(job.id, DownloadStatus.PROCESSING.value)
+
         try:
             await progress_msg.edit_text(i18n.get('uploading', lang))
         except:
@@ -383,22 +500,21 @@ async def quality_callback(callback: CallbackQuery):
                 await progress_msg.delete()
             except:
                 pass
-            progress_msg = await callback.message.answer(i18n.get('uploading', lang))
-
-        try:
-            bot_me = await bot.get_me()
-            bot_username = bot_me.username or "FlashSaver"
-        except:
-            bot_username = "FlashSaver"
-
-        title = download_data['title'][:80] + '...' if len(download_data['title']) > 80 else download_data['title']
-        caption = f"📥 {title}\n\n🤖 @{bot_username}"
-
-        if quality != 'best':
-            caption += f" | {quality.upper()}"
+            progress_msg = await bot.send_message(user_id, i18n.get('uploading', lang))
 
+        upload_key = f"upload:{job.id}"
+        progress_bus.subscribe(upload_key, render_progress)
         upload_start_time = time.time()
-        success = await file_router.send_file(user_id, file_path, caption)
+        handed_off = True
+        try:
+            success = await file_router.send_file(
+                user_id, file_path, caption,
+                progress_callback=progress_bus.reporter(upload_key, STAGE_UPLOAD),
+                cache_key=(media_id, quality, size_limit) if media_id else None,
+                stream_upload=stream_upload
+            )
+        finally:
+            progress_bus.close(upload_key)
         upload_time = time.time() - upload_start_time
 
         if success:
@@ -408,42 +524,17 @@ async def quality_callback(callback: CallbackQuery):
                     f"\n⏱ Download: {download_time:.1f}s | Upload: {upload_time:.1f}s"
                 )
             except:
-                await callback.message.answer(i18n.get('completed', lang))
+                await bot.send_message(user_id, i18n.get('completed', lang))
         else:
             try:
                 await progress_msg.edit_text(i18n.get('error_processing', lang))
             except:
-                await callback.message.answer(i18n.get('error_processing', lang))
-
-        try:
-            from database.operations import add_download
-            from database.models import Download
-
-            platform_value = download_data['platform']
-            if hasattr(platform_value, 'value'):
-                platform_str = platform_value.value
-            elif hasattr(platform_value, 'name'):
-                platform_str = platform_value.name.lower()
-            else:
-                platform_str = str(platform_value).lower()
-
-            download_record = Download(
-                user_id=user_id,
-                url=download_data['url'],
-                platform=platform_str,
-                quality=quality,
-                status="completed" if success else "failed",
-                created_at=datetime.now()
-            )
-            await add_download(download_record)
-        except Exception as e:
-            logger.error(f"Failed to record download: {e}")
-            logger.debug(f"Platform data: {download_data.get('platform')}, Type: {type(download_data.get('platform'))}")
+                await bot.send_message(user_id, i18n.get('error_processing', lang))
 
-        del active_downloads[user_id]
+        return success
 
     except Exception as e:
-        logger.error(f"Download error for {download_data['url']}: {e}")
+        logger.error(f"Download error for {job.url}: {e}")
 
         error_msg = i18n.get('error_download_failed', lang)
         if "HTTP Error 403" in str(e):
@@ -462,20 +553,21 @@ async def quality_callback(callback: CallbackQuery):
         try:
             await progress_msg.edit_text(error_msg)
         except:
-            await callback.message.answer(error_msg)
+            await bot.send_message(user_id, error_msg)
 
-        if user_id in active_downloads:
-            del active_downloads[user_id]
+        raise
+    finally:
+        if not handed_off:
+            if stream_upload:
+                stream_upload.abort()
+            if file_path:
+                await artifacts.release(file_path)
 
 async def reply_menu_handler(message: Message):
     text = message.text
     user_id = message.from_user.id
 
-    try:
-        user_data = await get_user(user_id)
-        lang = user_data.language
-    except:
-        lang = 'uz'
+    lang = await user_cache.language(user_id)
 
     if "Statistics" in text and user_id == ADMIN_ID:
         await show_stats_inline(message)
@@ -518,15 +610,18 @@ async def broadcast_media_handler(message: Message, state: FSMContext):
         await message.answer("Broadcast cancelled", reply_markup=get_admin_menu_keyboard())
         return
     else:
-        media_data = {}
         if message.photo:
-            media_data = {'type': 'photo', 'file_id': message.photo[-1].file_id}
+            file_id = message.photo[-1].file_id
         elif message.video:
-            media_data = {'type': 'video', 'file_id': message.video.file_id}
+            file_id = message.video.file_id
         elif message.animation:
-            media_data = {'type': 'animation', 'file_id': message.animation.file_id}
+            file_id = message.animation.file_id
+        else:
+            await message.answer(i18n.get('broadcast_media_invalid', 'uz'))
+            return
 
-        broadcast_data[ADMIN_ID] = {'media': media_data}
+        media_data = {'type': message.content_type, 'file_id': file_id}
+        broadcast_data[ADMIN_ID] = {'media': media_data, 'source': (message.chat.id, message.message_id)}
 
     await message.answer(i18n.get('broadcast_step2', 'uz'))
     await state.set_state(BroadcastStates.waiting_text)
@@ -544,6 +639,8 @@ async def broadcast_text_handler(message: Message, state: FSMContext):
         broadcast_data[ADMIN_ID] = {}
 
     broadcast_data[ADMIN_ID]['text'] = message.text
+    broadcast_data[ADMIN_ID]['entities'] = [entity.model_dump(exclude_none=True) for entity in message.entities or []]
+    broadcast_data[ADMIN_ID].setdefault('source', (message.chat.id, message.message_id))
 
     await message.answer(i18n.get('broadcast_step3', 'uz'))
     await state.set_state(BroadcastStates.waiting_button)
@@ -569,10 +666,7 @@ async def broadcast_button_handler(message: Message, state: FSMContext):
         except:
             broadcast_data[ADMIN_ID]['button'] = None
 
-    import aiosqlite
-    async with aiosqlite.connect('database/flash_saver.db') as db:
-        cursor = await db.execute('SELECT COUNT(*) FROM users WHERE is_active = 1')
-        user_count = (await cursor.fetchone())[0]
+    user_count = await count_active_users()
 
     confirm_text = i18n.get('broadcast_confirm', 'uz', count=user_count)
     await message.answer(confirm_text, reply_markup=get_broadcast_confirm_keyboard())
@@ -583,64 +677,66 @@ async def broadcast_confirm_callback(callback: CallbackQuery, state: FSMContext)
         return
 
     if callback.data == "broadcast:confirm":
-        from admin.panel import AdminPanel
-        admin_panel = AdminPanel(bot)
-
         message_data = broadcast_data.get(ADMIN_ID, {})
-        result = await admin_panel.send_broadcast(message_data)
-
-        await callback.message.edit_text(
-            i18n.get('broadcast_sent', 'uz',
-                    sent=result['sent'],
-                    failed=result['failed'],
-                    total=result['total']),
-            reply_markup=None
-        )
-
-        await callback.message.answer("Broadcast completed", reply_markup=get_admin_menu_keyboard())
+        media = message_data.get('media') or {}
+        button = message_data.get('button') or {}
+        source_chat_id, source_message_id = message_data['source']
+
+        await callback.message.edit_text(i18n.get('broadcast_started', 'uz'), reply_markup=None)
+
+        broadcast_id = await broadcast_engine.start(Broadcast(
+            source_chat_id=source_chat_id,
+            source_message_id=source_message_id,
+            text=message_data.get('text', ''),
+            caption_entities=json.dumps(message_data['entities']) if message_data.get('entities') else None,
+            media_type=media.get('type'),
+            media_file_id=media.get('file_id'),
+            button_text=button.get('text'),
+            button_url=button.get('url'),
+            admin_chat_id=callback.message.chat.id,
+            status_message_id=callback.message.message_id
+        ))
+        logger.info(f"Broadcast {broadcast_id} started")
+
+        await callback.message.answer("Broadcast started", reply_markup=get_admin_menu_keyboard())
 
     await state.clear()
     if ADMIN_ID in broadcast_data:
         del broadcast_data[ADMIN_ID]
 
 async def show_stats_inline(message: Message):
-    import aiosqlite
-
-    async with aiosqlite.connect('database/flash_saver.db') as db:
-        cursor = await db.execute('SELECT COUNT(*) FROM users')
-        total_users = (await cursor.fetchone())[0]
-
-        cursor = await db.execute('SELECT COUNT(*) FROM downloads')
-        total_downloads = (await cursor.fetchone())[0]
-
-        cursor = await db.execute('SELECT COUNT(*) FROM downloads WHERE status="completed"')
-        successful = (await cursor.fetchone())[0]
-
-        today = datetime.now().date()
-        cursor = await db.execute('SELECT COUNT(*) FROM downloads WHERE date(created_at) = ?', (today,))
-        today_downloads = (await cursor.fetchone())[0]
+    users = live_stats.user_stats()
+    downloads = live_stats.download_stats()
 
     stats_text = (
         i18n.get('stats_title', 'uz') +
-        i18n.get('stats_users', 'uz', count=total_users) +
-        i18n.get('stats_downloads', 'uz', count=total_downloads) +
-        i18n.get('stats_success', 'uz', count=successful) +
-        i18n.get('stats_today', 'uz', count=today_downloads)
+        i18n.get('stats_users', 'uz', count=users['total']) +
+        i18n.get('stats_downloads', 'uz', count=downloads['total']) +
+        i18n.get('stats_success', 'uz', count=downloads['successful']) +
+        i18n.get('stats_today', 'uz', count=downloads['today'])
     )
 
     await message.answer(stats_text)
 
 async def show_health_inline(message: Message):
     uptime = str(timedelta(seconds=int(time.time() - start_time)))
-    memory = psutil.virtual_memory()
-    disk = psutil.disk_usage('.')
+    sample = system_sampler.latest()
+    temp = storage_manager.usage()
+    ffmpeg = ffmpeg_scheduler.stats()
+    outbox = send_scheduler.stats()
 
     health_text = (
         i18n.get('health_title', 'uz') +
         i18n.get('health_uptime', 'uz', time=uptime) +
-        i18n.get('health_memory', 'uz', memory=f"{memory.percent:.1f}%") +
-        i18n.get('health_disk', 'uz', disk=f"{disk.percent:.1f}%") +
-        i18n.get('health_downloads', 'uz', count=len(active_downloads))
+        i18n.get('health_cpu', 'uz', cpu=f"{sample['cpu']:.1f}% {sparkline(system_sampler.history('cpu'))}") +
+        i18n.get('health_memory', 'uz', memory=f"{sample['memory']:.1f}% {sparkline(system_sampler.history('memory'))}") +
+        i18n.get('health_disk', 'uz', disk=f"{sample['disk']:.1f}%") +
+        i18n.get('health_loop', 'uz', lag=sample.get('loop_lag', 0.0), fds=sample['fds'], trend=sparkline(system_sampler.history('loop_lag'))) +
+        i18n.get('health_downloads', 'uz', count=download_queue.active_jobs) +
+        i18n.get('health_queue', 'uz', count=f"{sample.get('queue', 0)} {sparkline(system_sampler.history('queue'))}") +
+        i18n.get('health_temp', 'uz', used=format_file_size(temp['used'] + temp['reserved']), quota=format_file_size(temp['quota'])) +
+        i18n.get('health_ffmpeg', 'uz', running=ffmpeg['running'], slots=ffmpeg['slots'], queued=ffmpeg['queued'], wait=ffmpeg['avg_wait'], encode=ffmpeg['avg_encode']) +
+        i18n.get('health_outbox', 'uz', queued=outbox['queued'], superseded=outbox['superseded'], flood=outbox['flood_waits'])
     )
 
     await message.answer(health_text)
@@ -663,18 +759,37 @@ async def language_callback(callback: CallbackQuery):
     lang = callback.data.split(':')[1]
     user_id = callback.from_user.id
 
-    import aiosqlite
-    async with aiosqlite.connect('database/flash_saver.db') as db:
-        await db.execute('UPDATE users SET language = ? WHERE user_id = ?', (lang, user_id))
-        await db.commit()
+    await user_cache.set_language(user_id, lang)
 
     await callback.message.edit_text(i18n.get('language_changed', lang))
     await callback.answer()
 
+def create_services():
+    global bot, download_manager, file_router, broadcast_engine, youtube_api, download_queue
+
+    if not validate_bot_token(BOT_TOKEN):
+        logger.error("Invalid bot token format. Check your BOT_TOKEN in constants.py")
+        exit(1)
+
+    try:
+        bot = Bot(token=BOT_TOKEN, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
+        bot.session.middleware(send_scheduler)
+    except Exception as e:
+        logger.error(f"Failed to create bot instance: {e}")
+        exit(1)
+
+    download_manager = DownloadManager()
+    file_router = FileRouter(bot)
+    broadcast_engine = BroadcastEngine(bot)
+    youtube_api = YouTubeAPI()
+    download_queue = DownloadQueue(process_download_job)
+
 def register_handlers():
     dp.message.register(start_handler, F.text.startswith('/start'))
     dp.message.register(help_handler, F.text.startswith('/help'))
     dp.message.register(admin_handler, F.text.startswith('/admin'))
+    dp.message.register(cache_clear_handler, F.text.startswith('/cache_clear'))
+    dp.message.register(cache_handler, F.text.startswith('/cache'))
     dp.message.register(settings_handler, F.text.startswith('/settings'))
     dp.message.register(about_handler, F.text.startswith('/about'))
     dp.message.register(commands_handler, F.text.startswith('/commands'))
@@ -721,8 +836,19 @@ async def on_startup(dp):
         logger.error(f"Error setting bot commands: {e}")
 
     try:
+        await database.open()
         await init_db()
+        write_buffer.start()
+        await live_stats.start()
         logger.info("Database initialized successfully")
+
+        from core.metadata_cache import metadata_cache
+        purged = await metadata_cache.purge_expired()
+        logger.info(f"Metadata cache ready ({purged} expired entries purged)")
+
+        resumed = await broadcast_engine.resume()
+        if resumed:
+            logger.info(f"Resumed {resumed} interrupted broadcasts")
     except Exception as e:
         logger.error(f"Database initialization failed: {e}")
         return False
@@ -733,6 +859,33 @@ async def on_startup(dp):
     except Exception as e:
         logger.error(f"Failed to create temp directory: {e}")
 
+    try:
+        await storage_manager.start()
+        logger.info("Temp storage manager started")
+    except Exception as e:
+        logger.error(f"Failed to start temp storage manager: {e}")
+
+    try:
+        await ffmpeg_scheduler.start()
+    except Exception as e:
+        logger.error(f"Failed to start ffmpeg scheduler: {e}")
+
+    try:
+        await download_queue.start()
+    except Exception as e:
+        logger.error(f"Failed to start download queue: {e}")
+        return False
+
+    try:
+        system_sampler.track('temp', lambda: sum(storage_manager.usage()[key] for key in ('used', 'reserved')))
+        system_sampler.track('queue', download_queue.depth)
+        system_sampler.track('active_downloads', lambda: download_queue.active_jobs)
+        system_sampler.track('ffmpeg_queue', lambda: ffmpeg_scheduler.stats()['queued'])
+        system_sampler.track('outbox', lambda: send_scheduler.stats()['queued'])
+        await system_sampler.start()
+    except Exception as e:
+        logger.error(f"Failed to start system sampler: {e}")
+
     try:
         userbot_started = await file_router.start_userbot()
         if userbot_started:
@@ -749,12 +902,70 @@ async def on_startup(dp):
 async def on_shutdown(dp):
     logger.info("Shutting down bot...")
 
+    try:
+        await system_sampler.stop()
+    except Exception as e:
+        logger.error(f"Error stopping system sampler: {e}")
+
+    try:
+        await download_queue.stop()
+        logger.info("Download queue stopped")
+    except Exception as e:
+        logger.error(f"Error stopping download queue: {e}")
+
+    try:
+        await broadcast_engine.stop()
+    except Exception as e:
+        logger.error(f"Error stopping broadcast engine: {e}")
+
+    try:
+        await send_scheduler.stop()
+    except Exception as e:
+        logger.error(f"Error stopping send scheduler: {e}")
+
+    try:
+        await ffmpeg_scheduler.stop()
+    except Exception as e:
+        logger.error(f"Error stopping ffmpeg scheduler: {e}")
+
+    try:
+        await storage_manager.stop()
+    except Exception as e:
+        logger.error(f"Error stopping temp storage manager: {e}")
+
+    try:
+        download_manager.close()
+    except Exception as e:
+        logger.error(f"Error closing download manager: {e}")
+
+    try:
+        chart_renderer.shutdown()
+    except Exception as e:
+        logger.error(f"Error stopping chart render pool: {e}")
+
     try:
         await file_router.stop_userbot()
         logger.info("Userbot stopped")
     except Exception as e:
         logger.error(f"Error stopping userbot: {e}")
 
+    try:
+        await live_stats.stop()
+    except Exception as e:
+        logger.error(f"Error stopping analytics rollup: {e}")
+
+    try:
+        await write_buffer.stop()
+        logger.info("Write buffer flushed")
+    except Exception as e:
+        logger.error(f"Error flushing write buffer: {e}")
+
+    try:
+        await database.close()
+        logger.info("Database closed")
+    except Exception as e:
+        logger.error(f"Error closing database: {e}")
+
     try:
         await bot.session.close()
         logger.info("Bot session closed")
@@ -782,6 +993,7 @@ async def main():
         await on_shutdown(dp)
 
 if __name__ == '__main__':
+    create_services()
     try:
         asyncio.run(main())
     except KeyboardInterrupt:
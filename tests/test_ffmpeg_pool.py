@@ -0,0 +1,31 @@
+import sys
+import asyncio
+from core.ffmpeg_pool import FFmpegScheduler, FFmpegCapabilities, PRIORITY_HIGH, PRIORITY_LOW
+
+
+def sleeper(seconds: float):
+    return [sys.executable, '-c', f'import time; time.sleep({seconds})']
+
+
+def test_high_priority_job_takes_the_next_free_slot():
+    async def scenario():
+        scheduler = FFmpegScheduler(max_jobs=1)
+        scheduler.capabilities = FFmpegCapabilities(ffmpeg=True, ffprobe=True)
+        await scheduler.start()
+        finished = []
+
+        async def submit(name: str, priority: int, seconds: float):
+            await scheduler.run(sleeper(seconds), priority)
+            finished.append(name)
+
+        running = asyncio.create_task(submit('running', PRIORITY_LOW, 0.5))
+        await asyncio.sleep(0.1)
+        queued = [asyncio.create_task(submit(f'low-{index}', PRIORITY_LOW, 0)) for index in range(3)]
+        await asyncio.sleep(0)
+        urgent = asyncio.create_task(submit('high', PRIORITY_HIGH, 0))
+
+        await asyncio.wait_for(asyncio.gather(running, urgent, *queued), timeout=30)
+        await scheduler.stop()
+        return finished
+
+    assert asyncio.run(scenario()) == ['running', 'high', 'low-0', 'low-1', 'low-2']
@@ -0,0 +1,74 @@
+from core.format_planner import FormatPlanner, FormatPlan
+from utils.constants import Quality
+
+MB = 1024 * 1024
+DURATION = 600
+
+FORMATS = [
+    {'format_id': '18', 'ext': 'mp4', 'height': 360, 'vcodec': 'avc1.42001E', 'acodec': 'mp4a.40.2', 'filesize': 30 * MB},
+    {'format_id': '22', 'ext': 'mp4', 'height': 720, 'vcodec': 'avc1.64001F', 'acodec': 'mp4a.40.2', 'filesize': 90 * MB},
+    {'format_id': '137', 'ext': 'mp4', 'height': 1080, 'vcodec': 'avc1.640028', 'acodec': 'none', 'filesize': 200 * MB},
+    {'format_id': '248', 'ext': 'webm', 'height': 1080, 'vcodec': 'vp9', 'acodec': 'none', 'filesize': 150 * MB},
+    {'format_id': '313', 'ext': 'webm', 'height': 2160, 'vcodec': 'vp9', 'acodec': 'none', 'filesize': 900 * MB},
+    {'format_id': '401', 'ext': 'mp4', 'height': 2160, 'vcodec': 'av01.0.12M.08', 'acodec': 'none', 'filesize': 800 * MB},
+    {'format_id': '140', 'ext': 'm4a', 'height': None, 'vcodec': 'none', 'acodec': 'mp4a.40.2', 'abr': 128, 'filesize': 10 * MB},
+    {'format_id': '251', 'ext': 'webm', 'height': None, 'vcodec': 'none', 'acodec': 'opus', 'abr': 160, 'filesize': 12 * MB},
+]
+
+planner = FormatPlanner()
+
+
+def test_best_is_capped_at_1080_and_prefers_h264_mp4():
+    plan = planner.plan(FORMATS, DURATION, Quality.BEST, 2048 * MB)
+
+    assert plan.format_id == '137+140'
+    assert plan.height == 1080
+    assert plan.ext == 'mp4'
+    assert plan.compatible
+
+
+def test_mp4_h264_ranks_before_height():
+    formats = [fmt for fmt in FORMATS if fmt['format_id'] in ('22', '248', '251')]
+    plan = planner.plan(formats, DURATION, Quality.BEST, 2048 * MB)
+
+    assert plan.format_id == '22'
+
+
+def test_progressive_format_wins_at_equal_height():
+    formats = FORMATS + [
+        {'format_id': '136', 'ext': 'mp4', 'height': 720, 'vcodec': 'avc1.4d401f', 'acodec': 'none', 'filesize': 60 * MB}
+    ]
+    plan = planner.plan(formats, DURATION, Quality.HIGH, 2048 * MB)
+
+    assert plan.format_id == '22'
+    assert plan.streamable
+
+
+def test_size_limit_drops_to_smaller_plan():
+    plan = planner.plan(FORMATS, DURATION, Quality.BEST, 50 * MB)
+
+    assert plan.format_id == '18'
+
+
+def test_no_plan_when_nothing_fits():
+    assert planner.plan(FORMATS, DURATION, Quality.LOW, 5 * MB) is None
+
+
+def test_audio_prefers_copyable_m4a():
+    plan = planner.plan(FORMATS, DURATION, Quality.AUDIO, 2048 * MB)
+
+    assert plan.format_id == '140'
+    assert not plan.streamable
+
+
+def test_options_skip_duplicate_plans():
+    options = planner.options(FORMATS, DURATION, 100 * MB)
+
+    assert options[Quality.BEST].format_id == '22'
+    assert Quality.HIGH not in options
+    assert options[Quality.MEDIUM].format_id == '18'
+    assert Quality.LOW not in options
+
+
+def test_merged_plan_is_not_streamable():
+    assert FormatPlan('137+140', 210 * MB, 1080, 'mp4', merged=True, vcodec='avc1').streamable is False
@@ -0,0 +1,127 @@
+import asyncio
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import SendMessage, EditMessageText, SendChatAction
+from core.send_scheduler import SendScheduler
+
+
+class FakeSession:
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.calls = []
+
+    async def __call__(self, bot, method):
+        self.calls.append(method)
+        await asyncio.sleep(self.delay)
+        if isinstance(method, EditMessageText):
+            return f"edited:{method.text}"
+        return f"sent:{type(method).__name__}"
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_superseded_edit_resolves_with_unwrapped_result():
+    async def scenario():
+        scheduler = SendScheduler(rate=1000, chat_rate=1, chat_burst=1)
+        session = FakeSession()
+
+        first = await scheduler(session, None, SendMessage(chat_id=1, text="hello"))
+        older = asyncio.create_task(scheduler(session, None, EditMessageText(chat_id=1, message_id=5, text="10%")))
+        await asyncio.sleep(0)
+        newer = asyncio.create_task(scheduler(session, None, EditMessageText(chat_id=1, message_id=5, text="20%")))
+
+        results = await asyncio.wait_for(asyncio.gather(older, newer), timeout=5)
+        await scheduler.stop()
+        return first, results, session.calls, scheduler.stats()
+
+    first, (older, newer), calls, stats = run(scenario())
+
+    assert first == "sent:SendMessage"
+    assert older is True
+    assert newer == "edited:20%"
+    assert [method.text for method in calls if isinstance(method, EditMessageText)] == ["20%"]
+    assert stats['superseded'] == 1
+
+
+def test_chat_bucket_only_throttles_outgoing_messages():
+    async def scenario():
+        scheduler = SendScheduler(rate=1000, chat_rate=0.1, chat_burst=1)
+        session = FakeSession()
+
+        await scheduler(session, None, SendMessage(chat_id=1, text="hello"))
+        result = await asyncio.wait_for(scheduler(session, None, SendChatAction(chat_id=1, action="typing")), timeout=1)
+        await scheduler.stop()
+        return result, scheduler.chat_buckets
+
+    result, buckets = run(scenario())
+
+    assert result == "sent:SendChatAction"
+    assert list(buckets) == [1]
+
+
+def test_flood_wait_without_chat_scope_blocks_global_bucket():
+    async def scenario():
+        scheduler = SendScheduler(rate=1000, chat_rate=10, chat_burst=10)
+        method = SendChatAction(chat_id=1, action="typing")
+        attempts = []
+
+        async def flooded(bot, request):
+            attempts.append(request)
+            if len(attempts) == 1:
+                raise TelegramRetryAfter(method=request, message="Too Many Requests", retry_after=0)
+            return True
+
+        result = await asyncio.wait_for(scheduler(flooded, None, method), timeout=5)
+        await scheduler.stop()
+        return result, attempts, scheduler.global_bucket.blocked_until
+
+    result, attempts, blocked_until = run(scenario())
+
+    assert result is True
+    assert len(attempts) == 2
+    assert blocked_until > 0
+
+
+def test_flood_wait_in_one_chat_blocks_only_that_chat():
+    async def scenario():
+        scheduler = SendScheduler(rate=1000, chat_rate=10, chat_burst=10)
+        attempts = []
+
+        async def flooded(bot, request):
+            attempts.append(request)
+            if len(attempts) == 1:
+                raise TelegramRetryAfter(method=request, message="Too Many Requests", retry_after=0)
+            return True
+
+        await asyncio.wait_for(scheduler(flooded, None, SendMessage(chat_id=7, text="hi")), timeout=5)
+        await scheduler.stop()
+        return scheduler.global_bucket.blocked_until, scheduler.chat_buckets[7].blocked_until
+
+    global_blocked, chat_blocked = run(scenario())
+
+    assert global_blocked == 0
+    assert chat_blocked > 0
+
+
+def test_stop_cancels_in_flight_requests():
+    async def scenario():
+        scheduler = SendScheduler(rate=1000, chat_rate=10, chat_burst=10)
+        request = asyncio.create_task(scheduler(FakeSession(delay=30), None, SendMessage(chat_id=1, text="slow")))
+        await asyncio.sleep(0.1)
+        in_flight = len(scheduler.executing)
+
+        await asyncio.wait_for(scheduler.stop(), timeout=5)
+        try:
+            await asyncio.wait_for(request, timeout=5)
+        except asyncio.CancelledError:
+            cancelled = True
+        else:
+            cancelled = False
+        return in_flight, cancelled, scheduler.executing
+
+    in_flight, cancelled, executing = run(scenario())
+
+    assert in_flight == 1
+    assert cancelled
+    assert not executing
@@ -0,0 +1,27 @@
+import os
+import asyncio
+from core.artifacts import artifacts
+from core.storage import storage_manager
+from utils.helpers import create_workspace
+
+
+def test_delivered_artifact_releases_its_reservation(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+    async def scenario():
+        workspace = await create_workspace()
+        await storage_manager.reserve(workspace, 1000)
+        reserved = storage_manager.reserved_bytes
+
+        file_path = os.path.join(workspace, "video.mp4")
+        with open(file_path, 'wb') as f:
+            f.write(b'x' * 100)
+        artifacts.acquire(file_path)
+        await artifacts.release(file_path)
+        return workspace, reserved
+
+    workspace, reserved = asyncio.run(scenario())
+
+    assert reserved == 1000
+    assert storage_manager.reserved_bytes == 0
+    assert not os.path.exists(workspace)
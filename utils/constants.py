@@ -1,7 +1,7 @@
 import os
 from dataclasses import dataclass
 from enum import Enum
-from typing import Dict, Any
+from typing import Dict, Any, Optional, List
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -17,9 +17,35 @@ YOUTUBE_API_KEY = os.getenv("YOUTUBE_API_KEY")
 
 BOT_FILE_LIMIT = 20 * 1024 * 1024
 USER_BOT_FILE_LIMIT = 2 * 1024 * 1024 * 1024
-CONCURRENT_DOWNLOADS = 3
+CONCURRENT_DOWNLOADS = int(os.getenv("CONCURRENT_DOWNLOADS", 3))
+QUEUE_POLL_INTERVAL = 5
+YTDLP_EXECUTOR = os.getenv("YTDLP_EXECUTOR", "thread")
+YTDLP_PROCESS_WORKERS = int(os.getenv("YTDLP_PROCESS_WORKERS", os.cpu_count() or 4))
+INFO_REUSE_TTL = 300
+INFO_REUSE_MARGIN = 60
 TEMP_DIR = "temp"
-DB_PATH = "database/flash_saver.db"
+WORKSPACE_PREFIX = "job_"
+TEMP_DIR_QUOTA = int(os.getenv("TEMP_DIR_QUOTA", 10 * 1024 * 1024 * 1024))
+TEMP_HIGH_WATER_MARK = float(os.getenv("TEMP_HIGH_WATER_MARK", 0.9))
+STORAGE_DEFAULT_RESERVATION = 100 * 1024 * 1024
+STORAGE_WAIT_TIMEOUT = 600
+STORAGE_SWEEP_INTERVAL = 600
+ORPHAN_MAX_AGE = 3600
+EVICTION_MIN_AGE = 120
+CPU_COUNT = os.cpu_count() or 1
+FFMPEG_MAX_JOBS = int(os.getenv("FFMPEG_MAX_JOBS", max(1, CPU_COUNT // 2)))
+FFMPEG_THREADS_PER_JOB = int(os.getenv("FFMPEG_THREADS_PER_JOB", max(1, CPU_COUNT // FFMPEG_MAX_JOBS)))
+FFMPEG_PROBE_TIMEOUT = 15
+FFMPEG_ENCODE_TIMEOUT = 120
+FFMPEG_TIMEOUT_PER_SECOND = 1.5
+FFMPEG_COPY_MIN_THROUGHPUT = 8 * 1024 * 1024
+SEGMENT_MIN_DURATION = 30
+DB_PATH = os.getenv("DB_PATH", "database/flash_saver.db")
+DB_READ_POOL_SIZE = int(os.getenv("DB_READ_POOL_SIZE", 4))
+DB_BUSY_TIMEOUT = 5000
+DB_CACHED_STATEMENTS = 256
+DB_CACHE_SIZE_KB = 16384
+DB_MMAP_SIZE = 128 * 1024 * 1024
 
 class Platform(Enum):
     YOUTUBE = "youtube"
@@ -33,6 +59,16 @@ class DownloadStatus(Enum):
     COMPLETED = "completed"
     FAILED = "failed"
 
+class BroadcastStatus(Enum):
+    RUNNING = "running"
+    COMPLETED = "completed"
+
+class DeliveryStatus(Enum):
+    PENDING = "pending"
+    SENT = "sent"
+    FAILED = "failed"
+    BLOCKED = "blocked"
+
 class Quality(Enum):
     BEST = "best"
     HIGH = "720p"
@@ -47,6 +83,9 @@ class MediaInfo:
     quality_options: Dict[str, Any]
     file_size: int
     platform: Platform
+    info: Optional[Dict[str, Any]] = None
+    info_expires_at: float = 0
+    formats: Optional[List[Dict[str, Any]]] = None
 
 EMOJI = {
     "download": "⬇️",
@@ -77,3 +116,32 @@ DEFAULT_LANGUAGE = "uz"
 DOWNLOAD_TIMEOUT = 300  
 COMPRESSION_TIMEOUT = 300  
 PROGRESS_UPDATE_INTERVAL = 2
+SEND_GLOBAL_RATE = float(os.getenv("SEND_GLOBAL_RATE", 30))
+SEND_CHAT_RATE = 1.0
+SEND_CHAT_BURST = 3
+SEND_MAX_RETRIES = 3
+BROADCAST_CONCURRENCY = int(os.getenv("BROADCAST_CONCURRENCY", 25))
+BROADCAST_PAGE_SIZE = 1000
+BROADCAST_FLUSH_SIZE = 200
+BROADCAST_FLUSH_INTERVAL = 2
+
+WRITE_BUFFER_FLUSH_SIZE = 500
+WRITE_BUFFER_FLUSH_INTERVAL = 2
+ANALYTICS_ROLLUP_INTERVAL = 600
+CHART_RENDER_WORKERS = int(os.getenv("CHART_RENDER_WORKERS", 1))
+CHART_CACHE_SIZE = 32
+
+SYSTEM_SAMPLE_INTERVAL = float(os.getenv("SYSTEM_SAMPLE_INTERVAL", 5))
+SYSTEM_SAMPLE_HISTORY = 120
+SPARKLINE_WIDTH = 24
+
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", 10000))
+USER_ACTIVITY_INTERVAL = 300
+
+METADATA_CACHE_SIZE = int(os.getenv("METADATA_CACHE_SIZE", 2048))
+METADATA_CACHE_PERSIST = os.getenv("METADATA_CACHE_PERSIST", "1") == "1"
+METADATA_CACHE_TTL = {
+    Platform.YOUTUBE: int(os.getenv("METADATA_CACHE_TTL_YOUTUBE", 6 * 3600)),
+    Platform.INSTAGRAM: int(os.getenv("METADATA_CACHE_TTL_INSTAGRAM", 3600)),
+    Platform.UNKNOWN: 600
+}
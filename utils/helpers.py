@@ -1,10 +1,12 @@
 import re
 import os
+import uuid
+import shutil
 import aiofiles
 import asyncio
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from urllib.parse import urlparse
-from .constants import Platform, TEMP_DIR
+from .constants import Platform, TEMP_DIR, WORKSPACE_PREFIX
 
 async def ensure_dir(path: str):
     os.makedirs(path, exist_ok=True)
@@ -52,6 +54,21 @@ def detect_platform(url: str) -> Platform:
             
     return Platform.UNKNOWN
 
+def get_media_id(url: str) -> Optional[str]:
+    youtube_match = re.search(r'(?:youtube\.com/watch\?v=|youtu\.be/|youtube\.com/embed/|youtube\.com/shorts/)([\w-]{6,})', url)
+    if youtube_match:
+        return f"youtube:{youtube_match.group(1)}"
+
+    instagram_match = re.search(r'instagram\.com/(?:p|reel|reels|tv)/([\w-]+)', url)
+    if instagram_match:
+        return f"instagram:{instagram_match.group(1)}"
+
+    story_match = re.search(r'instagram\.com/stories/[\w.]+/(\d+)', url)
+    if story_match:
+        return f"instagram:story:{story_match.group(1)}"
+
+    return None
+
 def validate_url(url: str) -> bool:
     try:
         result = urlparse(url)
@@ -66,6 +83,23 @@ async def cleanup_file(file_path: str):
     except:
         pass
 
+async def create_workspace() -> str:
+    path = os.path.join(TEMP_DIR, f"{WORKSPACE_PREFIX}{uuid.uuid4().hex}")
+    await asyncio.to_thread(os.makedirs, path, exist_ok=True)
+    return path
+
+def get_workspace(file_path: str) -> Optional[str]:
+    parent = os.path.dirname(os.path.abspath(file_path))
+    if os.path.basename(parent).startswith(WORKSPACE_PREFIX) and os.path.dirname(parent) == os.path.abspath(TEMP_DIR):
+        return parent
+    return None
+
+async def cleanup_workspace(path: str):
+    try:
+        await asyncio.to_thread(shutil.rmtree, path, True)
+    except:
+        pass
+
 def sanitize_filename(filename: str) -> str:
     invalid_chars = r'[<>:"/\\|?*]'
     sanitized = re.sub(invalid_chars, '_', filename)
@@ -76,6 +110,15 @@ def get_progress_bar(progress: float, length: int = 10) -> str:
     bar = '█' * filled + '░' * (length - filled)
     return f"{bar} {progress:.1f}%"
 
+def sparkline(values: List[float]) -> str:
+    if not values:
+        return ''
+    low, high = min(values), max(values)
+    blocks = '▁▂▃▄▅▆▇█'
+    if high == low:
+        return blocks[0] * len(values)
+    return ''.join(blocks[int((value - low) / (high - low) * (len(blocks) - 1))] for value in values)
+
 async def get_file_size(file_path: str) -> int:
     try:
         stat = await asyncio.to_thread(os.stat, file_path)